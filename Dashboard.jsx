@@ -20,6 +20,12 @@ const Dashboard = () => {
   const [loading, setLoading] = useState(true);
 
   useEffect(() => {
+    let source = null;
+    let retryTimer = null;
+    let retryDelay = 3000;
+    let loaded = false;
+    let closed = false;
+
     const fetchDashboardData = async () => {
       try {
         const [summaryRes, chartRes, productsRes] = await Promise.all([
@@ -31,6 +37,7 @@ const Dashboard = () => {
         setSummary(summaryRes.data);
         setSalesChart(chartRes.data);
         setTopProducts(productsRes.data);
+        loaded = true;
       } catch (error) {
         console.error('Erro ao carregar dados do dashboard:', error);
       } finally {
@@ -38,7 +45,66 @@ const Dashboard = () => {
       }
     };
 
-    fetchDashboardData();
+    const scheduleReconnect = () => {
+      if (closed) return;
+      // Sem o stream, carrega uma vez pelos endpoints normais
+      if (!loaded) fetchDashboardData();
+      retryTimer = setTimeout(connect, retryDelay);
+      retryDelay = Math.min(retryDelay * 2, 60000);
+    };
+
+    // Atualizações em tempo real: o servidor envia o estado completo ao
+    // conectar e depois só o que mudou a cada venda, despesa, produção ou
+    // alteração de estoque
+    const connect = async () => {
+      try {
+        const { data } = await api.post('/dashboard/stream-ticket');
+        if (closed) return;
+
+        source = new EventSource(
+          `${api.defaults.baseURL}/dashboard/stream?ticket=${encodeURIComponent(data.ticket)}`
+        );
+        source.addEventListener('snapshot', (event) => {
+          const state = JSON.parse(event.data);
+          setSummary(state.summary);
+          setSalesChart(state.sales_chart);
+          setTopProducts(state.top_products);
+          setLoading(false);
+          loaded = true;
+          retryDelay = 3000;
+        });
+        source.addEventListener('delta', (event) => {
+          const delta = JSON.parse(event.data);
+          if (delta.summary) setSummary((current) => ({ ...current, ...delta.summary }));
+          if (delta.sales_chart) setSalesChart(delta.sales_chart);
+          if (delta.top_products) setTopProducts(delta.top_products);
+        });
+        source.onerror = () => {
+          // O servidor encerra o stream periodicamente; reconecta com um ticket novo
+          source.close();
+          scheduleReconnect();
+        };
+      } catch (error) {
+        if (error.response?.status === 503) {
+          // Tempo real desativado no servidor
+          if (!loaded) fetchDashboardData();
+          return;
+        }
+        scheduleReconnect();
+      }
+    };
+
+    if (typeof EventSource === 'undefined') {
+      fetchDashboardData();
+    } else {
+      connect();
+    }
+
+    return () => {
+      closed = true;
+      clearTimeout(retryTimer);
+      if (source) source.close();
+    };
   }, []);
 
   if (loading) {
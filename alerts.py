@@ -0,0 +1,99 @@
+from datetime import datetime
+from itertools import chain
+from sqlalchemy import and_, delete, event, insert, select, update
+from sqlalchemy.orm import Session
+from src.models.database import Material, StockAlert
+
+# Alertas de estoque baixo (stock_quantity <= min_stock_alert) mantidos a
+# cada alteração de estoque. Toda transação que mexe em materiais tem o
+# estado dos materiais tocados reavaliado no commit: quem passou do limite
+# ganha um alerta aberto, quem voltou acima dele tem o alerta encerrado.
+# A lista de alertas atuais vira uma leitura pelo índice parcial de
+# alertas abertos, e o histórico registra quando cada limite foi cruzado.
+
+_TOUCHED = 'stock_alert_materials'
+
+
+def track_stock_changes(session, material_ids):
+    """Marca materiais alterados por UPDATE em lote (o flush não os enxerga)"""
+    session.info.setdefault(_TOUCHED, set()).update(material_ids)
+
+
+def is_low_stock(stock_quantity, min_stock_alert):
+    return stock_quantity is not None and min_stock_alert is not None and stock_quantity <= min_stock_alert
+
+
+def open_alert_filter():
+    """Condição de junção de Material com o seu alerta aberto"""
+    return and_(StockAlert.material_id == Material.id, StockAlert.resolved_at.is_(None))
+
+
+def sync_stock_alerts(session, material_ids=None, now=None):
+    """Abre e encerra alertas conforme o estoque atual dos materiais
+
+    Sem ``material_ids`` reavalia todos os materiais. Retorna a quantidade
+    de alertas abertos e encerrados.
+    """
+    now = now or datetime.utcnow()
+    query = select(
+        Material.id, Material.stock_quantity, Material.min_stock_alert, StockAlert.id
+    ).outerjoin(StockAlert, open_alert_filter())
+    if material_ids is not None:
+        query = query.where(Material.id.in_(sorted(material_ids)))
+
+    opened = []
+    resolved = []
+    for material_id, stock_quantity, min_stock_alert, alert_id in session.execute(query):
+        low = is_low_stock(stock_quantity, min_stock_alert)
+        if low and alert_id is None:
+            opened.append({
+                'material_id': material_id,
+                'started_at': now,
+                'stock_quantity': stock_quantity,
+                'min_stock_alert': min_stock_alert
+            })
+        elif not low and alert_id is not None:
+            resolved.append(alert_id)
+
+    if opened:
+        session.execute(insert(StockAlert), opened)
+    if resolved:
+        session.execute(
+            update(StockAlert).where(StockAlert.id.in_(resolved)).values(resolved_at=now)
+            .execution_options(synchronize_session=False)
+        )
+    return len(opened), len(resolved)
+
+
+@event.listens_for(Session, 'before_flush')
+def _drop_alerts_of_deleted_materials(session, flush_context, instances):
+    deleted = [obj.id for obj in session.deleted if isinstance(obj, Material)]
+    if deleted:
+        session.execute(
+            delete(StockAlert).where(StockAlert.material_id.in_(deleted))
+            .execution_options(synchronize_session=False)
+        )
+
+
+@event.listens_for(Session, 'after_flush')
+def _track_flushed_materials(session, flush_context):
+    touched = [
+        obj.id for obj in chain(session.new, session.dirty)
+        if isinstance(obj, Material) and obj not in session.deleted
+    ]
+    if touched:
+        track_stock_changes(session, touched)
+
+
+@event.listens_for(Session, 'before_commit')
+def _sync_on_commit(session):
+    # Mesmo cuidado do contador de versões: o flush final ainda não aconteceu
+    session.flush()
+    touched = session.info.pop(_TOUCHED, None)
+    if touched:
+        sync_stock_alerts(session, touched)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard(session):
+    session.info.pop(_TOUCHED, None)
@@ -0,0 +1,93 @@
+"""Tempo de partida a frio de um worker: até a primeira requisição e memória
+
+Cada rodada sobe um interpretador novo que importa ``src.wsgi`` (cria a
+aplicação como o gunicorn faz) e atende uma primeira requisição que vai ao
+banco. Mede o tempo de parede desde o lançamento do processo, o tempo de
+import e o RSS máximo. Falha (código de saída 1) se a mediana passar do
+orçamento.
+
+Uso (a partir da pasta que contém src/):
+    python -m benchmarks.cold_start
+    python -m benchmarks.cold_start --runs 10 --max-seconds 1.5 --max-rss-mb 80
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Executado em cada processo novo
+WORKER = '''
+import json, resource, sys, time
+started = time.perf_counter()
+from src.wsgi import app
+imported = time.perf_counter()
+response = app.test_client().post('/api/auth/login', json={'username': 'benchmark', 'password': 'x'})
+assert response.status_code in (400, 401), response.status_code
+finished = time.perf_counter()
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({
+    'import': imported - started,
+    'first_request': finished - imported,
+    'rss_mb': rss / 1024 if sys.platform != 'darwin' else rss / 1024 / 1024,
+    'reportlab': 'reportlab' in sys.modules,
+    'alembic': 'alembic' in sys.modules,
+}))
+'''
+
+INIT = '''
+from src.main import create_app
+from src.models.database import db
+app = create_app()
+with app.app_context():
+    db.create_all()
+'''
+
+
+def run_once(env):
+    launched = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, '-c', WORKER], cwd=ROOT, env=env, check=True, capture_output=True, text=True
+    ).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    result['total'] = time.perf_counter() - launched
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--max-seconds', type=float, default=1.5, help='orçamento para a primeira resposta')
+    parser.add_argument('--max-rss-mb', type=float, default=80, help='orçamento de memória por worker')
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix='rm-papel-cold-')
+    env = dict(os.environ, DATABASE_URL='sqlite:///' + os.path.join(workdir, 'cold.db'))
+    subprocess.run([sys.executable, '-c', INIT], cwd=ROOT, env=env, check=True, capture_output=True)
+
+    # Uma rodada de aquecimento para o cache de bytecode e do sistema de arquivos
+    run_once(env)
+    results = [run_once(env) for _ in range(args.runs)]
+
+    def median(key):
+        return statistics.median(result[key] for result in results)
+
+    print(f'{args.runs} rodadas (mediana)')
+    print(f'  até a primeira resposta: {median("total"):.3f}s (orçamento {args.max_seconds:.3f}s)')
+    print(f'  import da aplicação:     {median("import"):.3f}s')
+    print(f'  primeira requisição:     {median("first_request"):.3f}s')
+    print(f'  RSS máximo:              {median("rss_mb"):.1f} MB (orçamento {args.max_rss_mb:.0f} MB)')
+    print(f'  ReportLab carregado: {results[0]["reportlab"]}  Alembic carregado: {results[0]["alembic"]}')
+
+    over_budget = median('total') > args.max_seconds or median('rss_mb') > args.max_rss_mb
+    print('Fora do orçamento' if over_budget else 'Dentro do orçamento')
+    return 1 if over_budget else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,136 @@
+"""Vazão de leitura/escrita concorrente: engine padrão x engine ajustado
+
+Roda a mesma carga (threads lendo o resumo de vendas e threads gravando
+vendas com baixa de estoque) duas vezes, primeiro com ``create_engine(url)``
+sem opções e depois com ``engine_options()`` + pragmas do SQLite, e imprime
+operações por segundo e erros (ex.: "database is locked") de cada perfil.
+
+Uso (a partir da pasta que contém src/):
+    python -m benchmarks.engine_throughput
+    python -m benchmarks.engine_throughput --readers 16 --writers 4 --seconds 10
+    python -m benchmarks.engine_throughput --database-url postgresql://.../rm_papel_bench
+
+Com PostgreSQL, use um banco vazio só para isso: as tabelas são recriadas.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import create_engine, func, insert, select, update
+from sqlalchemy.engine import make_url
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.engine_config import engine_options, install_sqlite_pragmas
+from src.models.database import db, Product, Sale
+
+
+def build_engine(url, tuned):
+    if not tuned:
+        # SQLite precisa aceitar conexões entre threads nos dois perfis
+        connect_args = {'check_same_thread': False} if url.startswith('sqlite') else {}
+        return create_engine(url, connect_args=connect_args)
+    engine = create_engine(url, **engine_options(url))
+    install_sqlite_pragmas(engine)
+    return engine
+
+
+def seed(engine, rows):
+    db.metadata.drop_all(engine)
+    db.metadata.create_all(engine)
+    today = date.today()
+    with engine.begin() as connection:
+        connection.execute(insert(Product), [
+            {'id': i, 'name': f'Produto {i}', 'profit_margin': 50, 'stock_quantity': 10 ** 9}
+            for i in range(1, 101)
+        ])
+        connection.execute(insert(Sale), [
+            {'sale_date': today - timedelta(days=i % 365), 'payment_method': 'pix', 'total_amount': 10}
+            for i in range(rows)
+        ])
+
+
+def read(connection, today):
+    connection.execute(
+        select(func.count(Sale.id), func.sum(Sale.total_amount))
+        .where(Sale.sale_date >= today - timedelta(days=30))
+    ).one()
+
+
+def write(connection, today):
+    with connection.begin():
+        connection.execute(insert(Sale), {'sale_date': today, 'payment_method': 'pix', 'total_amount': 10})
+        connection.execute(
+            update(Product).where(Product.id == random.randint(1, 100))
+            .values(stock_quantity=Product.stock_quantity - 1)
+        )
+
+
+def run(engine, readers, writers, seconds):
+    today = date.today()
+    counts = {'read': 0, 'write': 0, 'errors': 0}
+    lock = threading.Lock()
+    deadline = time.monotonic() + seconds
+
+    def worker(operation, kind):
+        done = errors = 0
+        while time.monotonic() < deadline:
+            try:
+                with engine.connect() as connection:
+                    operation(connection, today)
+                    connection.commit()
+                done += 1
+            except Exception:
+                errors += 1
+        with lock:
+            counts[kind] += done
+            counts['errors'] += errors
+
+    threads = [threading.Thread(target=worker, args=(read, 'read')) for _ in range(readers)]
+    threads += [threading.Thread(target=worker, args=(write, 'write')) for _ in range(writers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database-url', help='banco descartável (padrão: SQLite temporário)')
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--rows', type=int, default=20000, help='vendas pré-existentes')
+    args = parser.parse_args(argv)
+
+    workdir = None if args.database_url else tempfile.mkdtemp(prefix='rm-papel-bench-')
+    print(f'{args.readers} leitores, {args.writers} escritores, {args.seconds:g}s por perfil')
+    print(f'{"perfil":10} {"leituras/s":>12} {"escritas/s":>12} {"erros":>8}')
+
+    for profile, tuned in (('padrao', False), ('ajustado', True)):
+        if args.database_url:
+            url = args.database_url
+        else:
+            # Arquivo novo por perfil: o journal_mode WAL fica gravado no arquivo
+            url = 'sqlite:///' + os.path.join(workdir, f'{profile}.db')
+        engine = build_engine(url, tuned)
+        try:
+            seed(engine, args.rows)
+            counts = run(engine, args.readers, args.writers, args.seconds)
+        finally:
+            engine.dispose()
+        print(f'{profile:10} {counts["read"] / args.seconds:12.1f} '
+              f'{counts["write"] / args.seconds:12.1f} {counts["errors"]:8}')
+
+    print(f'backend: {make_url(url).get_backend_name()}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
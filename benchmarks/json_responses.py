@@ -0,0 +1,103 @@
+"""Tempo de serialização JSON e bytes trafegados nos maiores endpoints
+
+Popula um banco descartável (mesmos dados sintéticos do
+``src.query_plans``), busca as respostas dos endpoints mais pesados e compara:
+
+- tempo de encode com o json da biblioteca padrão (como o Flask fazia:
+  ``sort_keys`` e ``ensure_ascii``) x orjson;
+- bytes da resposta sem compressão, com gzip e com brotli.
+
+Uso (a partir da pasta que contém src/):
+    python -m benchmarks.json_responses
+    python -m benchmarks.json_responses --rows 20000 --repeat 20
+"""
+import argparse
+import gzip
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def endpoints(today):
+    month_ago = (today - timedelta(days=30)).isoformat()
+    return [
+        '/api/products',
+        '/api/materials',
+        '/api/sales?per_page=100&with_total=0',
+        '/api/stock-movements?per_page=100&with_total=0',
+        f'/api/reports/sales?start_date={month_ago}&end_date={today.isoformat()}',
+    ]
+
+
+def best_time(encode, payload, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        encode(payload)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=5000, help='quantidade de vendas sintéticas')
+    parser.add_argument('--repeat', type=int, default=10, help='repetições de cada encode (vale a melhor)')
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix='rm-papel-json-')
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(workdir, 'json.db')
+
+    from flask_jwt_extended import create_access_token
+    from src.main import create_app
+    from src.models.database import db
+    from src.query_plans import seed
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        seed(db, args.rows)
+        token = create_access_token(identity='1')
+
+    client = app.test_client()
+    headers = {'Authorization': f'Bearer {token}', 'Accept-Encoding': 'identity'}
+
+    def stdlib_encode(payload):
+        return json.dumps(payload, sort_keys=True, separators=(',', ':')).encode()
+
+    print(f'encode: melhor de {args.repeat}; orjson {"instalado" if orjson else "ausente"}, '
+          f'brotli {"instalado" if brotli else "ausente"}')
+    print(f'{"endpoint":48} {"json ms":>8} {"orjson ms":>10} {"bytes":>10} {"gzip":>9} {"br":>9}')
+
+    for url in endpoints(date.today()):
+        response = client.get(url, headers=headers)
+        if response.status_code != 200:
+            print(f'{url[:48]:48} HTTP {response.status_code}')
+            continue
+        payload = json.loads(response.data)
+        body = stdlib_encode(payload)
+
+        stdlib_ms = best_time(stdlib_encode, payload, args.repeat) * 1000
+        orjson_ms = best_time(orjson.dumps, payload, args.repeat) * 1000 if orjson else float('nan')
+        gzip_bytes = len(gzip.compress(body, compresslevel=6))
+        br_bytes = len(brotli.compress(body, quality=4)) if brotli else float('nan')
+
+        print(f'{url[:48]:48} {stdlib_ms:8.2f} {orjson_ms:10.2f} {len(body):10} {gzip_bytes:9} {br_bytes:9}')
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,116 @@
+import hashlib
+import json
+import threading
+import time
+from functools import wraps
+from flask import current_app, make_response, request
+from src.compression import ETAG_SUFFIXES
+from src.models.database import db
+from src.models.versions import table_versions
+
+
+class TTLCache:
+    """Cache em memória com expiração curta e stale-while-revalidate
+
+    Depois de ``ttl`` segundos o valor é considerado velho: continua sendo
+    servido por até ``stale_ttl`` segundos enquanto uma thread em segundo
+    plano recalcula. ``invalidate()`` descarta tudo imediatamente.
+
+    O cache é por processo; em servidores com vários workers a invalidação
+    vale só para o worker que fez a alteração e os demais dependem do TTL.
+    """
+
+    def __init__(self, ttl=30, stale_ttl=300):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._entries = {}
+        self._refreshing = set()
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key, compute):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            generation = self._generation
+            if entry is not None:
+                value, fresh_until, stale_until = entry
+                if now < fresh_until:
+                    return value
+                if now < stale_until:
+                    if key not in self._refreshing:
+                        self._refreshing.add(key)
+                        self._refresh_in_background(key, compute, generation)
+                    return value
+
+        value = compute()
+        self._store(key, value, generation)
+        return value
+
+    def invalidate(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def _store(self, key, value, generation):
+        now = time.monotonic()
+        with self._lock:
+            # Valor calculado antes de uma invalidação não deve ser guardado
+            if generation == self._generation:
+                self._entries[key] = (value, now + self.ttl, now + self.ttl + self.stale_ttl)
+
+    def _refresh_in_background(self, key, compute, generation):
+        app = current_app._get_current_object()
+
+        def refresh():
+            try:
+                with app.app_context():
+                    self._store(key, compute(), generation)
+            except Exception:
+                app.logger.exception('Falha ao atualizar cache: %s', key)
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=refresh, daemon=True).start()
+
+
+def etag_from_tables(*tables):
+    """ETag forte para listagens, derivado das versões das tabelas serializadas
+
+    ``tables`` deve cobrir tudo o que o to_dict() da listagem percorre (ex.:
+    produtos incluem categoria e materiais). Com ``If-None-Match`` igual à
+    versão atual a resposta é 304 sem consultar as linhas: o custo é uma
+    única leitura na tabela de versões.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            try:
+                versions = table_versions(tables)
+            except Exception:
+                # Banco ainda sem a tabela de versões: responde sem ETag
+                db.session.rollback()
+                current_app.logger.exception('Falha ao ler versões das tabelas')
+                return view(*args, **kwargs)
+            
+            key = json.dumps([request.full_path, sorted(versions.items())])
+            etag = hashlib.sha256(key.encode()).hexdigest()[:32]
+            
+            # O cliente pode ter guardado a versão comprimida (ETag com sufixo)
+            matched = next((etag + suffix for suffix in ETAG_SUFFIXES
+                            if request.if_none_match.contains(etag + suffix)), None)
+            if matched:
+                response = current_app.response_class(status=304)
+                response.set_etag(matched)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                response.set_etag(etag)
+            
+            # O navegador guarda a resposta, mas sempre revalida com If-None-Match
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+        return wrapper
+    return decorator
@@ -1,11 +1,13 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required
 from src.models.database import db, Category
+from src.cache import etag_from_tables
 
 categories_bp = Blueprint('categories', __name__)
 
 @categories_bp.route('', methods=['GET'])
 @jwt_required()
+@etag_from_tables('categories')
 def get_categories():
     try:
         categories = Category.query.all()
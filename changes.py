@@ -0,0 +1,50 @@
+from itertools import chain
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+# Rastreia quais tabelas foram alteradas em cada transação e avisa os
+# interessados depois do commit (invalidação de cache, contadores, etc.)
+
+_subscribers = []
+
+
+def subscribe(tables, callback):
+    """Chama callback(tabelas_alteradas) após commits que tocam alguma das tabelas"""
+    _subscribers.append((frozenset(tables), callback))
+
+
+def _changed_tables(session):
+    return session.info.setdefault('changed_tables', set())
+
+
+@event.listens_for(Session, 'after_flush')
+def _track_flush(session, flush_context):
+    changed = _changed_tables(session)
+    for obj in chain(session.new, session.dirty, session.deleted):
+        table = getattr(obj, '__table__', None)
+        if table is not None:
+            changed.add(table.name)
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _track_bulk_statement(orm_execute_state):
+    # UPDATE/INSERT/DELETE em lote não passam pelo flush
+    if orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert:
+        table = getattr(orm_execute_state.statement, 'table', None)
+        if table is not None:
+            _changed_tables(orm_execute_state.session).add(table.name)
+
+
+@event.listens_for(Session, 'after_commit')
+def _notify(session):
+    changed = session.info.pop('changed_tables', None)
+    if not changed:
+        return
+    for tables, callback in _subscribers:
+        if tables & changed:
+            callback(changed)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard(session):
+    session.info.pop('changed_tables', None)
@@ -0,0 +1,97 @@
+from sqlalchemy import case, insert, update
+from src.models.database import db, Product, SaleItem
+
+
+class StockError(Exception):
+    """Venda não pode ser concluída (produto inexistente ou sem estoque)"""
+
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def requested_quantities(items):
+    """Quantidade total pedida por produto (o mesmo produto pode vir em vários itens)"""
+    quantities = {}
+    for item in items:
+        quantity = item.get('quantity')
+        if not isinstance(quantity, int) or isinstance(quantity, bool) or quantity <= 0:
+            raise StockError(f'Quantidade inválida para o produto {item.get("product_id")}')
+        quantities[item['product_id']] = quantities.get(item['product_id'], 0) + quantity
+    return quantities
+
+
+def load_products(product_ids):
+    """Carrega todos os produtos da venda com uma única consulta IN"""
+    return {product.id: product for product in Product.query.filter(Product.id.in_(list(product_ids)))}
+
+
+def check_stock(quantities, products):
+    for product_id, quantity in quantities.items():
+        product = products.get(product_id)
+        if not product:
+            raise StockError(f'Produto {product_id} não encontrado', 404)
+        if product.stock_quantity < quantity:
+            raise StockError(
+                f'Estoque insuficiente do produto {product.name}. '
+                f'Disponível: {product.stock_quantity}, Solicitado: {quantity}'
+            )
+
+
+def price_items(items, products):
+    """Calcula preço unitário e total de cada item uma única vez"""
+    priced = []
+    for item in items:
+        unit_price = item.get('unit_price')
+        if not unit_price:
+            product = products[item['product_id']]
+            unit_price = float(product.final_price) if product.final_price else product.calculate_final_price()
+        priced.append({
+            'product_id': item['product_id'],
+            'quantity': item['quantity'],
+            'unit_price': unit_price,
+            'total_price': unit_price * item['quantity']
+        })
+    return priced
+
+
+def insert_sale_items(sale_id, priced_items):
+    db.session.execute(insert(SaleItem), [dict(item, sale_id=sale_id) for item in priced_items])
+
+
+def _quantity_by_id(quantities):
+    return case(quantities, value=Product.id, else_=0)
+
+
+def reserve_stock(quantities):
+    """Baixa o estoque de todos os produtos com um UPDATE condicional atômico
+
+    O UPDATE só altera produtos que ainda têm a quantidade pedida; se alguma
+    linha ficar de fora (outra venda levou o estoque antes), nada é gravado e
+    a transação deve ser desfeita.
+    """
+    quantity = _quantity_by_id(quantities)
+    result = db.session.execute(
+        update(Product).where(
+            Product.id.in_(list(quantities)),
+            Product.stock_quantity >= quantity
+        ).values(
+            stock_quantity=Product.stock_quantity - quantity
+        ).execution_options(synchronize_session=False, stock_only=True)
+    )
+    if result.rowcount != len(quantities):
+        raise StockError('Estoque alterado por outra venda. Tente novamente.', 409)
+
+
+def release_stock(quantities):
+    """Devolve ao estoque as quantidades de uma venda removida, em lote"""
+    if not quantities:
+        return
+    quantity = _quantity_by_id(quantities)
+    db.session.execute(
+        update(Product).where(
+            Product.id.in_(list(quantities))
+        ).values(
+            stock_quantity=Product.stock_quantity + quantity
+        ).execution_options(synchronize_session=False, stock_only=True)
+    )
@@ -0,0 +1,71 @@
+"""Compressão gzip/brotli das respostas da API
+
+Negocia pelo ``Accept-Encoding``: brotli quando o cliente aceita e o pacote
+``brotli`` está instalado, senão gzip. Só comprime respostas de texto acima
+de ``COMPRESS_MIN_SIZE`` bytes; arquivos (PDF) e respostas em fluxo
+(exportações) passam direto.
+"""
+import gzip
+import os
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # dependência opcional
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = {
+    'application/json', 'application/x-ndjson', 'text/csv', 'text/html',
+    'text/plain', 'text/css', 'application/javascript', 'text/javascript', 'image/svg+xml'
+}
+
+# Sufixos acrescentados ao ETag forte de cada codificação (a representação
+# comprimida é outra sequência de bytes)
+ETAG_SUFFIXES = ('', '-gzip', '-br')
+
+
+def _encoding():
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br']:
+        return 'br'
+    if accepted['gzip']:
+        return 'gzip'
+    return None
+
+
+def _compress(data, encoding, level):
+    if encoding == 'br':
+        return brotli.compress(data, quality=level['br'])
+    return gzip.compress(data, compresslevel=level['gzip'])
+
+
+def init_compression(app):
+    min_size = int(os.getenv('COMPRESS_MIN_SIZE', 1024))
+    level = {
+        'gzip': int(os.getenv('COMPRESS_GZIP_LEVEL', 6)),
+        # Qualidade 4 do brotli comprime melhor que gzip 6 e ainda é rápida
+        'br': int(os.getenv('COMPRESS_BROTLI_QUALITY', 4))
+    }
+
+    @app.after_request
+    def compress_response(response):
+        if (
+            response.status_code < 200 or response.status_code in (204, 206, 304)
+            or response.direct_passthrough or response.is_streamed
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES
+        ):
+            return response
+
+        response.vary.add('Accept-Encoding')
+        encoding = _encoding()
+        if encoding is None or (response.content_length or 0) < min_size:
+            return response
+
+        response.set_data(_compress(response.get_data(), encoding, level))
+        response.headers['Content-Encoding'] = encoding
+
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(f'{etag}-{encoding}')
+        return response
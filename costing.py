@@ -0,0 +1,66 @@
+from sqlalchemy import func, update
+from src.models.database import db, Material, Product, ProductMaterial
+
+
+def product_costs(product_ids=None):
+    """Calcula o custo de vários produtos com uma única consulta agregada"""
+    query = db.session.query(
+        ProductMaterial.product_id,
+        func.sum(ProductMaterial.quantity_needed * Material.purchase_price)
+    ).join(Material, Material.id == ProductMaterial.material_id).group_by(
+        ProductMaterial.product_id
+    )
+
+    if product_ids is not None:
+        product_ids = list(product_ids)
+        if not product_ids:
+            return {}
+        query = query.filter(ProductMaterial.product_id.in_(product_ids))
+
+    return {product_id: float(cost or 0) for product_id, cost in query}
+
+
+def price_from_cost(cost, profit_margin):
+    """Aplica a margem de lucro (em %) sobre o custo"""
+    return cost * (1 + float(profit_margin or 0) / 100)
+
+
+def product_cost(product_id):
+    """Custo de um único produto, sem carregar a lista de materiais"""
+    return product_costs([product_id]).get(product_id, 0.0)
+
+
+def products_using_materials(material_ids):
+    """Produtos cuja lista de materiais contém algum dos materiais informados"""
+    rows = db.session.query(ProductMaterial.product_id).filter(
+        ProductMaterial.material_id.in_(list(material_ids))
+    ).distinct()
+    return [product_id for (product_id,) in rows]
+
+
+def refresh_product_costs(product_ids):
+    """Regrava o custo e, para produtos com preço automático, o preço final
+
+    Tudo em uma passada: uma consulta agregada para os custos, uma para as
+    margens e um único UPDATE em lote por chave primária.
+    """
+    product_ids = list(product_ids)
+    if not product_ids:
+        return 0
+
+    costs = product_costs(product_ids)
+    products = db.session.query(
+        Product.id, Product.profit_margin, Product.auto_price
+    ).filter(Product.id.in_(product_ids)).all()
+
+    updates = []
+    for product_id, profit_margin, auto_price in products:
+        cost = costs.get(product_id, 0.0)
+        values = {'id': product_id, 'unit_cost': cost}
+        if auto_price:
+            values['final_price'] = round(price_from_cost(cost, profit_margin), 2)
+        updates.append(values)
+
+    if updates:
+        db.session.execute(update(Product), updates)
+    return len(updates)
@@ -1,11 +1,14 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required
 from src.models.database import db, Customer
+from src.models.search import search_customers
+from src.cache import etag_from_tables
 
 customers_bp = Blueprint('customers', __name__)
 
 @customers_bp.route('', methods=['GET'])
 @jwt_required()
+@etag_from_tables('customers')
 def get_customers():
     try:
         customers = Customer.query.all()
@@ -13,6 +16,27 @@ def get_customers():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@customers_bp.route('/search', methods=['GET'])
+@jwt_required()
+def search_customers_route():
+    """Autocomplete: ?q= em nome, e-mail ou telefone, começos de nome primeiro, com cursor"""
+    try:
+        query = request.args.get('q', '')
+        cursor = request.args.get('cursor')
+        per_page = min(request.args.get('per_page', 20, type=int), 100)
+        
+        customers, next_cursor = search_customers(query, cursor, per_page)
+        
+        return jsonify({
+            'customers': [customer.to_dict() for customer in customers],
+            'next_cursor': next_cursor
+        }), 200
+        
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @customers_bp.route('', methods=['POST'])
 @jwt_required()
 def create_customer():
@@ -1,88 +1,195 @@
-from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required
+import os
+from flask import Blueprint, Response, current_app, request, jsonify
+from flask_jwt_extended import get_jwt_identity, jwt_required
+from itsdangerous import BadSignature, URLSafeTimedSerializer
 from datetime import datetime, timedelta
-from sqlalchemy import func, extract
-from src.models.database import db, Sale, Product, Material, Expense, SaleItem
+from sqlalchemy import func, extract, select
+from src.cache import TTLCache
+from src.events import LiveFeed, broker
+from src.models.changes import subscribe
+from src.models.alerts import open_alert_filter
+from src.models.database import db, Product, Material, Expense, Production, DailySales, DailyProductSales, StockAlert
 
 dashboard_bp = Blueprint('dashboard', __name__)
 
+summary_cache = TTLCache(
+    ttl=int(os.getenv('DASHBOARD_CACHE_TTL', 30)),
+    stale_ttl=int(os.getenv('DASHBOARD_CACHE_STALE_TTL', 300))
+)
+
+DASHBOARD_TABLES = {
+    'sales', 'daily_sales', 'daily_product_sales', 'expenses', 'productions', 'products', 'materials', 'stock_alerts'
+}
+
+# Qualquer commit que altere vendas, despesas, produções, materiais ou alertas
+# invalida o resumo neste worker e avisa os demais pelo broker, que também
+# invalidam o deles e atualizam as conexões do /stream
+subscribe(DASHBOARD_TABLES, lambda tables: summary_cache.invalidate())
+subscribe(DASHBOARD_TABLES, lambda tables: broker.publish('dashboard', sorted(tables)))
+broker.subscribe('dashboard', lambda tables: summary_cache.invalidate())
+
+STREAM_TICKET_SECONDS = 60
+
+def compute_summary(today):
+    """Resumo do dashboard calculado em poucas consultas agregadas"""
+    current_month_start = today.replace(day=1)
+    last_month_start = (current_month_start - timedelta(days=1)).replace(day=1)
+    thirty_days_ago = today - timedelta(days=30)
+    seven_days_ago = today - timedelta(days=7)
+    
+    # Todos os totais em uma única ida ao banco
+    (current_month_revenue, current_month_sales_count, last_month_revenue,
+     current_month_expenses_total, recent_productions, low_stock_count) = db.session.query(
+        select(func.coalesce(func.sum(DailySales.revenue), 0)).where(
+            DailySales.sale_date >= current_month_start
+        ).scalar_subquery(),
+        select(func.coalesce(func.sum(DailySales.sales_count), 0)).where(
+            DailySales.sale_date >= current_month_start
+        ).scalar_subquery(),
+        select(func.coalesce(func.sum(DailySales.revenue), 0)).where(
+            DailySales.sale_date >= last_month_start,
+            DailySales.sale_date < current_month_start
+        ).scalar_subquery(),
+        select(func.coalesce(func.sum(Expense.amount), 0)).where(
+            Expense.expense_date >= current_month_start
+        ).scalar_subquery(),
+        select(func.count(Production.id)).where(
+            Production.production_date >= seven_days_ago
+        ).scalar_subquery(),
+        select(func.count(StockAlert.id)).where(
+            StockAlert.resolved_at.is_(None)
+        ).scalar_subquery()
+    ).one()
+    
+    current_month_revenue = float(current_month_revenue)
+    last_month_revenue = float(last_month_revenue)
+    current_month_expenses_total = float(current_month_expenses_total)
+    
+    # Calcular crescimento
+    revenue_growth = 0
+    if last_month_revenue > 0:
+        revenue_growth = ((current_month_revenue - last_month_revenue) / last_month_revenue) * 100
+    
+    # Produtos mais vendidos (últimos 30 dias)
+    top_products_query = db.session.query(
+        Product.name,
+        func.sum(DailyProductSales.quantity).label('total_sold')
+    ).join(DailyProductSales, DailyProductSales.product_id == Product.id).filter(
+        DailyProductSales.sale_date >= thirty_days_ago
+    ).group_by(Product.id, Product.name).having(
+        func.sum(DailyProductSales.quantity) > 0
+    ).order_by(
+        func.sum(DailyProductSales.quantity).desc()
+    ).limit(5).all()
+    
+    # Materiais com estoque baixo (apenas os campos exibidos)
+    low_stock_materials = db.session.query(
+        Material.id, Material.name, Material.unit, Material.stock_quantity, Material.min_stock_alert
+    ).join(StockAlert, open_alert_filter()).order_by(Material.name).limit(5).all()
+    
+    return {
+        'current_month_revenue': current_month_revenue,
+        'current_month_sales_count': current_month_sales_count,
+        'revenue_growth': round(revenue_growth, 2),
+        # Saldo atual (receitas - despesas do mês)
+        'current_balance': current_month_revenue - current_month_expenses_total,
+        'low_stock_materials_count': low_stock_count,
+        'low_stock_materials': [{
+            'id': material_id,
+            'name': name,
+            'unit': unit,
+            'stock_quantity': float(stock_quantity),
+            'min_stock_alert': float(min_stock_alert)
+        } for material_id, name, unit, stock_quantity, min_stock_alert in low_stock_materials],
+        'top_products': [{'name': name, 'quantity': int(quantity)} for name, quantity in top_products_query],
+        'current_month_expenses': current_month_expenses_total,
+        'recent_productions': recent_productions
+    }
+
+def compute_sales_chart(today):
+    """Vendas por mês dos últimos 12 meses, a partir dos totais diários"""
+    twelve_months_ago = today - timedelta(days=365)
+    
+    monthly_sales = db.session.query(
+        extract('year', DailySales.sale_date).label('year'),
+        extract('month', DailySales.sale_date).label('month'),
+        func.sum(DailySales.revenue).label('total_revenue'),
+        func.sum(DailySales.sales_count).label('total_sales')
+    ).filter(
+        DailySales.sale_date >= twelve_months_ago
+    ).group_by(
+        extract('year', DailySales.sale_date),
+        extract('month', DailySales.sale_date)
+    ).having(
+        func.sum(DailySales.sales_count) > 0
+    ).order_by(
+        extract('year', DailySales.sale_date),
+        extract('month', DailySales.sale_date)
+    ).all()
+    
+    chart_data = []
+    for year, month, revenue, sales_count in monthly_sales:
+        month_name = datetime(int(year), int(month), 1).strftime('%b %Y')
+        chart_data.append({
+            'month': month_name,
+            'revenue': float(revenue),
+            'sales_count': int(sales_count)
+        })
+    return chart_data
+
+def compute_top_products(today, days=30):
+    """Os 10 produtos mais vendidos nos últimos ``days`` dias"""
+    start_date = today - timedelta(days=days)
+    
+    top_products = db.session.query(
+        Product.name,
+        Product.final_price,
+        func.sum(DailyProductSales.quantity).label('total_sold'),
+        func.sum(DailyProductSales.revenue).label('total_revenue')
+    ).join(DailyProductSales, DailyProductSales.product_id == Product.id).filter(
+        DailyProductSales.sale_date >= start_date
+    ).group_by(
+        Product.id, Product.name, Product.final_price
+    ).having(
+        func.sum(DailyProductSales.quantity) > 0
+    ).order_by(
+        func.sum(DailyProductSales.quantity).desc()
+    ).limit(10).all()
+    
+    result = []
+    for name, price, quantity, revenue in top_products:
+        result.append({
+            'name': name,
+            'price': float(price) if price else 0,
+            'quantity_sold': int(quantity),
+            'total_revenue': float(revenue)
+        })
+    return result
+
+def compute_dashboard_state():
+    """Tudo o que a tela do dashboard exibe (enviado pelo /stream)"""
+    today = datetime.now().date()
+    return {
+        'summary': summary_cache.get_or_compute(today, lambda: compute_summary(today)),
+        'sales_chart': compute_sales_chart(today),
+        'top_products': compute_top_products(today)
+    }
+
+# Cada conexão do /stream ocupa uma thread do worker; por padrão no máximo
+# metade das threads do gunicorn fica com o stream (com workers sync, nenhuma)
+dashboard_feed = LiveFeed(
+    'dashboard',
+    compute_dashboard_state,
+    max_clients=int(os.getenv('DASHBOARD_STREAM_MAX_CLIENTS', int(os.getenv('GUNICORN_THREADS', 4)) // 2))
+)
+
 @dashboard_bp.route('/summary', methods=['GET'])
 @jwt_required()
 def get_dashboard_summary():
     try:
-        # Data atual
         today = datetime.now().date()
-        current_month_start = today.replace(day=1)
-        last_month_start = (current_month_start - timedelta(days=1)).replace(day=1)
-        
-        # Vendas do mês atual
-        current_month_sales = Sale.query.filter(
-            Sale.sale_date >= current_month_start
-        ).all()
-        
-        current_month_revenue = sum(float(sale.total_amount) for sale in current_month_sales)
-        current_month_sales_count = len(current_month_sales)
-        
-        # Vendas do mês passado
-        last_month_sales = Sale.query.filter(
-            Sale.sale_date >= last_month_start,
-            Sale.sale_date < current_month_start
-        ).all()
-        
-        last_month_revenue = sum(float(sale.total_amount) for sale in last_month_sales)
-        
-        # Calcular crescimento
-        revenue_growth = 0
-        if last_month_revenue > 0:
-            revenue_growth = ((current_month_revenue - last_month_revenue) / last_month_revenue) * 100
-        
-        # Materiais com estoque baixo
-        low_stock_materials = Material.query.filter(
-            Material.stock_quantity <= Material.min_stock_alert
-        ).all()
-        
-        # Produtos mais vendidos (últimos 30 dias)
-        thirty_days_ago = today - timedelta(days=30)
-        top_products_query = db.session.query(
-            Product.name,
-            func.sum(SaleItem.quantity).label('total_sold')
-        ).join(SaleItem).join(Sale).filter(
-            Sale.sale_date >= thirty_days_ago
-        ).group_by(Product.id, Product.name).order_by(
-            func.sum(SaleItem.quantity).desc()
-        ).limit(5).all()
-        
-        top_products = [{'name': name, 'quantity': int(quantity)} for name, quantity in top_products_query]
-        
-        # Despesas do mês atual
-        current_month_expenses = Expense.query.filter(
-            Expense.expense_date >= current_month_start
-        ).all()
-        
-        current_month_expenses_total = sum(float(expense.amount) for expense in current_month_expenses)
-        
-        # Saldo atual (receitas - despesas do mês)
-        current_balance = current_month_revenue - current_month_expenses_total
-        
-        # Produções recentes (últimos 7 dias)
-        seven_days_ago = today - timedelta(days=7)
-        recent_productions = db.session.query(
-            func.count().label('count')
-        ).select_from(db.session.query().select_from(db.text('productions')).filter(
-            db.text('production_date >= :date')
-        ).params(date=seven_days_ago)).scalar() or 0
-        
-        return jsonify({
-            'current_month_revenue': current_month_revenue,
-            'current_month_sales_count': current_month_sales_count,
-            'revenue_growth': round(revenue_growth, 2),
-            'current_balance': current_balance,
-            'low_stock_materials_count': len(low_stock_materials),
-            'low_stock_materials': [material.to_dict() for material in low_stock_materials[:5]],
-            'top_products': top_products,
-            'current_month_expenses': current_month_expenses_total,
-            'recent_productions': recent_productions
-        }), 200
+        summary = summary_cache.get_or_compute(today, lambda: compute_summary(today))
+        return jsonify(summary), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -92,35 +199,7 @@ def get_dashboard_summary():
 def get_sales_chart():
     try:
         # Últimos 12 meses
-        today = datetime.now().date()
-        twelve_months_ago = today - timedelta(days=365)
-        
-        # Vendas por mês
-        monthly_sales = db.session.query(
-            extract('year', Sale.sale_date).label('year'),
-            extract('month', Sale.sale_date).label('month'),
-            func.sum(Sale.total_amount).label('total_revenue'),
-            func.count(Sale.id).label('total_sales')
-        ).filter(
-            Sale.sale_date >= twelve_months_ago
-        ).group_by(
-            extract('year', Sale.sale_date),
-            extract('month', Sale.sale_date)
-        ).order_by(
-            extract('year', Sale.sale_date),
-            extract('month', Sale.sale_date)
-        ).all()
-        
-        chart_data = []
-        for year, month, revenue, sales_count in monthly_sales:
-            month_name = datetime(int(year), int(month), 1).strftime('%b %Y')
-            chart_data.append({
-                'month': month_name,
-                'revenue': float(revenue),
-                'sales_count': int(sales_count)
-            })
-        
-        return jsonify(chart_data), 200
+        return jsonify(compute_sales_chart(datetime.now().date())), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -130,32 +209,56 @@ def get_sales_chart():
 def get_top_products():
     try:
         days = request.args.get('days', 30, type=int)
-        start_date = datetime.now().date() - timedelta(days=days)
-        
-        top_products = db.session.query(
-            Product.name,
-            Product.final_price,
-            func.sum(SaleItem.quantity).label('total_sold'),
-            func.sum(SaleItem.total_price).label('total_revenue')
-        ).join(SaleItem).join(Sale).filter(
-            Sale.sale_date >= start_date
-        ).group_by(
-            Product.id, Product.name, Product.final_price
-        ).order_by(
-            func.sum(SaleItem.quantity).desc()
-        ).limit(10).all()
+        return jsonify(compute_top_products(datetime.now().date(), days)), 200
         
-        result = []
-        for name, price, quantity, revenue in top_products:
-            result.append({
-                'name': name,
-                'price': float(price) if price else 0,
-                'quantity_sold': int(quantity),
-                'total_revenue': float(revenue)
-            })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def _ticket_serializer():
+    # Assinatura própria (não é um JWT): o ticket vai na URL e pode parar no
+    # log de acesso, então não pode valer como token nos demais endpoints
+    return URLSafeTimedSerializer(current_app.config['SECRET_KEY'], salt='dashboard-stream')
+
+@dashboard_bp.route('/stream-ticket', methods=['POST'])
+@jwt_required()
+def create_stream_ticket():
+    """Token curto para abrir o /stream (o EventSource não envia cabeçalhos)"""
+    try:
+        if dashboard_feed.max_clients <= 0:
+            return jsonify({'error': 'Atualização em tempo real desativada'}), 503
         
-        return jsonify(result), 200
+        ticket = _ticket_serializer().dumps({'sub': get_jwt_identity()})
+        return jsonify({'ticket': ticket, 'expires_in': STREAM_TICKET_SECONDS}), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@dashboard_bp.route('/stream', methods=['GET'])
+def dashboard_stream():
+    """Server-Sent Events: estado completo ao conectar, depois só as diferenças"""
+    try:
+        _ticket_serializer().loads(request.args.get('ticket', ''), max_age=STREAM_TICKET_SECONDS)
+    except BadSignature:
+        return jsonify({'error': 'Ticket inválido ou expirado'}), 401
+    
+    try:
+        client = dashboard_feed.connect(current_app._get_current_object())
+        if client is None:
+            response = jsonify({'error': 'Muitas conexões abertas, tente novamente'})
+            response.headers['Retry-After'] = '10'
+            return response, 503
+        
+        try:
+            initial = compute_dashboard_state()
+        except Exception:
+            dashboard_feed.disconnect(client)
+            raise
+        
+        return Response(
+            dashboard_feed.stream(client, initial, max_seconds=int(os.getenv('DASHBOARD_STREAM_MAX_SECONDS', 300))),
+            mimetype='text/event-stream',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -1,4 +1,5 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import DDL, event
 from datetime import datetime
 
 db = SQLAlchemy()
@@ -104,6 +105,10 @@ class Product(db.Model):
     category_id = db.Column(db.Integer, db.ForeignKey('categories.id'))
     profit_margin = db.Column(db.Numeric(5, 2), nullable=False, default=0)
     final_price = db.Column(db.Numeric(10, 2))
+    # Preço calculado automaticamente a partir do custo (False = preço manual)
+    auto_price = db.Column(db.Boolean, nullable=False, default=True)
+    # Custo armazenado, recalculado quando os materiais ou seus preços mudam
+    unit_cost = db.Column(db.Numeric(12, 4))
     image_url = db.Column(db.String(500))
     stock_quantity = db.Column(db.Integer, default=0)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -121,15 +126,22 @@ class Product(db.Model):
             total_cost += float(pm.quantity_needed) * float(pm.material.purchase_price)
         return total_cost
 
-    def calculate_final_price(self):
+    def current_cost(self):
+        """Custo armazenado; recalcula pelos materiais se ainda não foi gravado"""
+        if self.unit_cost is not None:
+            return float(self.unit_cost)
+        return self.calculate_cost()
+
+    def calculate_final_price(self, cost=None):
         """Calcula o preço final baseado no custo e margem de lucro"""
-        cost = self.calculate_cost()
+        if cost is None:
+            cost = self.current_cost()
         margin = float(self.profit_margin) / 100
         return cost * (1 + margin)
 
     def to_dict(self):
-        cost = self.calculate_cost()
-        calculated_price = self.calculate_final_price()
+        cost = self.current_cost()
+        calculated_price = self.calculate_final_price(cost)
         
         return {
             'id': self.id,
@@ -139,6 +151,7 @@ class Product(db.Model):
             'category': self.category.to_dict() if self.category else None,
             'profit_margin': float(self.profit_margin),
             'final_price': float(self.final_price) if self.final_price else calculated_price,
+            'auto_price': self.auto_price,
             'calculated_cost': cost,
             'calculated_price': calculated_price,
             'image_url': self.image_url,
@@ -148,12 +161,66 @@ class Product(db.Model):
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
 
+def listen_search_ddl(table, statements_by_dialect):
+    """Executa os comandos do dialeto em uso logo depois do CREATE TABLE"""
+    for dialect, statements in statements_by_dialect.items():
+        for statement in statements:
+            event.listen(table, 'after_create', DDL(statement).execute_if(dialect=dialect))
+
+# Índices da busca de produtos (src/models/search.py) sobre nome, descrição e
+# nome da categoria. No PostgreSQL, uma coluna tsvector (fora do modelo)
+# preenchida por trigger e indexada com GIN; no SQLite, uma tabela FTS5
+# paralela. Em ambos os triggers também acompanham a renomeação de categorias.
+PRODUCT_SEARCH_DDL = {
+    'postgresql': [
+        'ALTER TABLE products ADD COLUMN IF NOT EXISTS search_vector tsvector',
+        "CREATE OR REPLACE FUNCTION products_search_vector() RETURNS trigger AS $$ BEGIN "
+        "NEW.search_vector := "
+        "setweight(to_tsvector('portuguese', coalesce(NEW.name, '')), 'A') || "
+        "setweight(to_tsvector('portuguese', coalesce((SELECT name FROM categories WHERE id = NEW.category_id), '')), 'B') || "
+        "setweight(to_tsvector('portuguese', coalesce(NEW.description, '')), 'C'); "
+        "RETURN NEW; END $$ LANGUAGE plpgsql",
+        'DROP TRIGGER IF EXISTS products_search_vector ON products',
+        'CREATE TRIGGER products_search_vector BEFORE INSERT OR UPDATE OF name, description, category_id '
+        'ON products FOR EACH ROW EXECUTE FUNCTION products_search_vector()',
+        "CREATE OR REPLACE FUNCTION categories_products_search() RETURNS trigger AS $$ BEGIN "
+        "UPDATE products SET category_id = category_id WHERE category_id = OLD.id; "
+        "RETURN NULL; END $$ LANGUAGE plpgsql",
+        'DROP TRIGGER IF EXISTS categories_products_search ON categories',
+        'CREATE TRIGGER categories_products_search AFTER UPDATE OF name OR DELETE '
+        'ON categories FOR EACH ROW EXECUTE FUNCTION categories_products_search()',
+        'CREATE INDEX IF NOT EXISTS ix_products_search_vector ON products USING gin (search_vector)',
+    ],
+    'sqlite': [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5("
+        "name, description, category, tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+        'CREATE TRIGGER IF NOT EXISTS products_fts_insert AFTER INSERT ON products BEGIN '
+        'INSERT INTO products_fts (rowid, name, description, category) VALUES (new.id, new.name, new.description, '
+        '(SELECT name FROM categories WHERE id = new.category_id)); END',
+        'CREATE TRIGGER IF NOT EXISTS products_fts_update AFTER UPDATE OF name, description, category_id '
+        'ON products BEGIN DELETE FROM products_fts WHERE rowid = old.id; '
+        'INSERT INTO products_fts (rowid, name, description, category) VALUES (new.id, new.name, new.description, '
+        '(SELECT name FROM categories WHERE id = new.category_id)); END',
+        'CREATE TRIGGER IF NOT EXISTS products_fts_delete AFTER DELETE ON products BEGIN '
+        'DELETE FROM products_fts WHERE rowid = old.id; END',
+        'CREATE TRIGGER IF NOT EXISTS categories_products_fts_update AFTER UPDATE OF name ON categories BEGIN '
+        'UPDATE products_fts SET category = new.name '
+        'WHERE rowid IN (SELECT id FROM products WHERE category_id = new.id); END',
+        'CREATE TRIGGER IF NOT EXISTS categories_products_fts_delete AFTER DELETE ON categories BEGIN '
+        'UPDATE products_fts SET category = NULL '
+        'WHERE rowid IN (SELECT id FROM products WHERE category_id = old.id); END',
+    ],
+}
+
+listen_search_ddl(Product.__table__, PRODUCT_SEARCH_DDL)
+
 class ProductMaterial(db.Model):
     __tablename__ = 'product_materials'
     
     id = db.Column(db.Integer, primary_key=True)
-    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False)
-    material_id = db.Column(db.Integer, db.ForeignKey('materials.id'), nullable=False)
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False, index=True)
+    # Índice reverso material -> produtos, usado no recálculo de custos
+    material_id = db.Column(db.Integer, db.ForeignKey('materials.id'), nullable=False, index=True)
     quantity_needed = db.Column(db.Numeric(10, 3), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
@@ -169,6 +236,11 @@ class ProductMaterial(db.Model):
 
 class StockMovement(db.Model):
     __tablename__ = 'stock_movements'
+    __table_args__ = (
+        db.Index('ix_stock_movements_material_id_created_at', 'material_id', 'created_at'),
+        db.Index('ix_stock_movements_reference', 'reference_type', 'reference_id'),
+        db.Index('ix_stock_movements_created_at_id', 'created_at', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     material_id = db.Column(db.Integer, db.ForeignKey('materials.id'), nullable=False)
@@ -203,7 +275,7 @@ class Production(db.Model):
     product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False)
     quantity_produced = db.Column(db.Integer, nullable=False)
     total_cost = db.Column(db.Numeric(10, 2), nullable=False)
-    production_date = db.Column(db.Date, nullable=False)
+    production_date = db.Column(db.Date, nullable=False, index=True)
     notes = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
@@ -242,12 +314,43 @@ class Customer(db.Model):
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
 
+# Índices da busca de clientes (src/models/search.py), que dependem do banco:
+# trigramas (pg_trgm) no PostgreSQL e uma tabela FTS5 com tokenizador
+# trigram no SQLite, mantida por triggers
+CUSTOMER_SEARCH_DDL = {
+    'postgresql': [
+        'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+        "CREATE INDEX IF NOT EXISTS ix_customers_search_trgm ON customers USING gin "
+        "((lower(name || ' ' || coalesce(email, '') || ' ' || coalesce(phone, ''))) gin_trgm_ops)",
+        'CREATE INDEX IF NOT EXISTS ix_customers_name_prefix ON customers (lower(name) text_pattern_ops)',
+    ],
+    'sqlite': [
+        'CREATE INDEX IF NOT EXISTS ix_customers_name_nocase ON customers (name COLLATE NOCASE)',
+        "CREATE VIRTUAL TABLE IF NOT EXISTS customers_fts USING fts5("
+        "name, email, phone, content='customers', content_rowid='id', tokenize='trigram')",
+        'CREATE TRIGGER IF NOT EXISTS customers_fts_insert AFTER INSERT ON customers BEGIN '
+        'INSERT INTO customers_fts (rowid, name, email, phone) VALUES (new.id, new.name, new.email, new.phone); END',
+        'CREATE TRIGGER IF NOT EXISTS customers_fts_delete AFTER DELETE ON customers BEGIN '
+        "INSERT INTO customers_fts (customers_fts, rowid, name, email, phone) "
+        "VALUES ('delete', old.id, old.name, old.email, old.phone); END",
+        'CREATE TRIGGER IF NOT EXISTS customers_fts_update AFTER UPDATE ON customers BEGIN '
+        "INSERT INTO customers_fts (customers_fts, rowid, name, email, phone) "
+        "VALUES ('delete', old.id, old.name, old.email, old.phone); "
+        'INSERT INTO customers_fts (rowid, name, email, phone) VALUES (new.id, new.name, new.email, new.phone); END',
+    ],
+}
+
+listen_search_ddl(Customer.__table__, CUSTOMER_SEARCH_DDL)
+
 class Sale(db.Model):
     __tablename__ = 'sales'
+    __table_args__ = (
+        db.Index('ix_sales_created_at_id', 'created_at', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
-    customer_id = db.Column(db.Integer, db.ForeignKey('customers.id'))
-    sale_date = db.Column(db.Date, nullable=False)
+    customer_id = db.Column(db.Integer, db.ForeignKey('customers.id'), index=True)
+    sale_date = db.Column(db.Date, nullable=False, index=True)
     payment_method = db.Column(db.String(50), nullable=False)
     total_amount = db.Column(db.Numeric(10, 2), nullable=False)
     notes = db.Column(db.Text)
@@ -273,8 +376,8 @@ class SaleItem(db.Model):
     __tablename__ = 'sale_items'
     
     id = db.Column(db.Integer, primary_key=True)
-    sale_id = db.Column(db.Integer, db.ForeignKey('sales.id'), nullable=False)
-    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False)
+    sale_id = db.Column(db.Integer, db.ForeignKey('sales.id'), nullable=False, index=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False, index=True)
     quantity = db.Column(db.Integer, nullable=False)
     unit_price = db.Column(db.Numeric(10, 2), nullable=False)
     total_price = db.Column(db.Numeric(10, 2), nullable=False)
@@ -294,6 +397,11 @@ class SaleItem(db.Model):
 
 class Expense(db.Model):
     __tablename__ = 'expenses'
+    __table_args__ = (
+        db.Index('ix_expenses_expense_date_category', 'expense_date', 'category'),
+        db.Index('ix_expenses_category_expense_date', 'category', 'expense_date'),
+        db.Index('ix_expenses_expense_date_id', 'expense_date', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     description = db.Column(db.String(255), nullable=False)
@@ -312,3 +420,66 @@ class Expense(db.Model):
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
 
+
+class DailySales(db.Model):
+    """Totais diários de vendas por forma de pagamento (mantidos por create/delete_sale)"""
+    __tablename__ = 'daily_sales'
+    
+    sale_date = db.Column(db.Date, primary_key=True)
+    payment_method = db.Column(db.String(50), primary_key=True)
+    revenue = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+    sales_count = db.Column(db.Integer, nullable=False, default=0)
+    items_sold = db.Column(db.Integer, nullable=False, default=0)
+
+class DailyProductSales(db.Model):
+    """Totais diários de vendas por produto (mantidos por create/delete_sale)"""
+    __tablename__ = 'daily_product_sales'
+    
+    sale_date = db.Column(db.Date, primary_key=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), primary_key=True)
+    quantity = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+
+class TableVersion(db.Model):
+    """Contador de alterações por tabela, incrementado a cada commit que a altera"""
+    __tablename__ = 'table_versions'
+    
+    table_name = db.Column(db.String(64), primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=0)
+
+class StockSnapshot(db.Model):
+    """Saldo de um material (soma das movimentações) no instante snapshot_at"""
+    __tablename__ = 'stock_snapshots'
+    
+    snapshot_at = db.Column(db.DateTime, primary_key=True)
+    material_id = db.Column(db.Integer, db.ForeignKey('materials.id'), primary_key=True)
+    quantity = db.Column(db.Numeric(12, 3), nullable=False, default=0)
+
+class StockAlert(db.Model):
+    """Período em que um material ficou com estoque baixo (resolved_at nulo: alerta aberto)"""
+    __tablename__ = 'stock_alerts'
+    __table_args__ = (
+        # No máximo um alerta aberto por material; também é o índice da lista de alertas atuais
+        db.Index(
+            'ix_stock_alerts_open', 'material_id', unique=True,
+            postgresql_where=db.text('resolved_at IS NULL'), sqlite_where=db.text('resolved_at IS NULL')
+        ),
+        db.Index('ix_stock_alerts_material_id_started_at', 'material_id', 'started_at'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    material_id = db.Column(db.Integer, db.ForeignKey('materials.id'), nullable=False)
+    started_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    resolved_at = db.Column(db.DateTime)
+    stock_quantity = db.Column(db.Numeric(10, 3), nullable=False)
+    min_stock_alert = db.Column(db.Numeric(10, 3), nullable=False)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'material_id': self.material_id,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'resolved_at': self.resolved_at.isoformat() if self.resolved_at else None,
+            'stock_quantity': float(self.stock_quantity),
+            'min_stock_alert': float(self.min_stock_alert)
+        }
@@ -0,0 +1,74 @@
+"""Configuração do engine do SQLAlchemy por banco
+
+SQLite (desenvolvimento e instalações pequenas): pragmas aplicados em toda
+conexão nova para permitir leituras concorrentes com escrita (WAL) e esperar
+por locks em vez de falhar na hora.
+
+PostgreSQL: tamanho do pool e reciclagem de conexões vindos do ambiente.
+Com o gunicorn, cada worker tem seu próprio pool; o total de conexões é
+aproximadamente WEB_CONCURRENCY x (DB_POOL_SIZE + DB_MAX_OVERFLOW).
+"""
+import os
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+
+def _env_int(name, default):
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+def _env_bool(name, default):
+    value = os.getenv(name)
+    return value.lower() in ('1', 'true', 'yes') if value else default
+
+
+def sqlite_pragmas():
+    """Pragmas aplicados a cada conexão SQLite"""
+    return {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': _env_int('SQLITE_BUSY_TIMEOUT_MS', 5000),
+        # Negativo = tamanho em KiB (padrão 64 MiB por conexão)
+        'cache_size': -_env_int('SQLITE_CACHE_SIZE_KB', 64 * 1024),
+        'mmap_size': _env_int('SQLITE_MMAP_SIZE_MB', 256) * 1024 * 1024,
+        'temp_store': 'MEMORY',
+    }
+
+
+def engine_options(database_url):
+    """Opções de create_engine (SQLALCHEMY_ENGINE_OPTIONS) para a URL do banco"""
+    backend = make_url(database_url).get_backend_name()
+
+    if backend == 'postgresql':
+        return {
+            'pool_size': _env_int('DB_POOL_SIZE', 5),
+            'max_overflow': _env_int('DB_MAX_OVERFLOW', 10),
+            'pool_timeout': _env_int('DB_POOL_TIMEOUT', 30),
+            # Conexões derrubadas pelo servidor/proxy são trocadas antes do uso
+            'pool_pre_ping': _env_bool('DB_POOL_PRE_PING', True),
+            'pool_recycle': _env_int('DB_POOL_RECYCLE', 1800),
+        }
+
+    if backend == 'sqlite':
+        # Várias threads do gunicorn compartilham o pool do worker
+        return {'connect_args': {'check_same_thread': False}}
+
+    return {}
+
+
+def install_sqlite_pragmas(engine):
+    """Aplica os pragmas em cada conexão nova do engine (só SQLite)"""
+    if engine.dialect.name != 'sqlite':
+        return
+
+    pragmas = sqlite_pragmas()
+
+    @event.listens_for(engine, 'connect')
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f'PRAGMA {name}={value}')
+        finally:
+            cursor.close()
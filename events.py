@@ -0,0 +1,215 @@
+"""Pub/sub de eventos entre threads e entre workers da mesma máquina
+
+O ``broker`` entrega mensagens pequenas (notificações, não dados) aos
+ouvintes de um canal. Com ``EVENTS_DIR`` definido (o ``gunicorn.conf.py``
+cria uma pasta a cada início do servidor), cada worker escuta num socket
+Unix de datagrama ``<pid>.sock`` dessa pasta e ``publish`` envia para todos,
+inclusive para o próprio processo: faz o papel de um broker local sem
+depender de serviço externo. Sem a pasta (servidor de desenvolvimento) a
+entrega é direta, dentro do processo.
+
+``LiveFeed`` usa o broker para alimentar conexões Server-Sent Events: a cada
+notificação recalcula o estado uma vez por worker e cada cliente recebe só
+o que mudou desde o último envio.
+"""
+import atexit
+import json
+import os
+import queue
+import socket
+import threading
+import time
+
+
+class EventBroker:
+    """Canais de notificação compartilhados pelos workers via sockets Unix"""
+
+    def __init__(self, directory=None):
+        self.directory = directory if hasattr(socket, 'AF_UNIX') else None
+        self._listeners = {}
+        self._lock = threading.Lock()
+        self._pid = None
+        self._sender = None
+
+    def subscribe(self, channel, callback):
+        """Chama ``callback(data)`` a cada mensagem publicada no canal"""
+        with self._lock:
+            self._listeners.setdefault(channel, []).append(callback)
+
+    def publish(self, channel, data=None):
+        message = json.dumps({'channel': channel, 'data': data}).encode()
+        if not self.directory:
+            self._deliver(message)
+            return
+
+        self.start()
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith('.sock'):
+                continue
+            try:
+                self._sender.sendto(message, entry.path)
+            except BlockingIOError:
+                # Fila do destinatário cheia: ele já tem notificações pendentes
+                continue
+            except (ConnectionRefusedError, FileNotFoundError):
+                # Worker que já terminou (reciclado ou derrubado)
+                try:
+                    os.remove(entry.path)
+                except FileNotFoundError:
+                    pass
+
+    def start(self):
+        """Abre o socket deste processo (uma vez por processo, após o fork)"""
+        if not self.directory or self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            os.makedirs(self.directory, exist_ok=True)
+            path = os.path.join(self.directory, f'{os.getpid()}.sock')
+            receiver = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            if os.path.exists(path):
+                os.remove(path)
+            receiver.bind(path)
+            self._sender = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            self._sender.setblocking(False)
+            self._pid = os.getpid()
+        atexit.register(_remove_quietly, path)
+        threading.Thread(target=self._receive, args=(receiver,), daemon=True).start()
+
+    def _receive(self, receiver):
+        while True:
+            self._deliver(receiver.recv(65536))
+
+    def _deliver(self, message):
+        message = json.loads(message)
+        with self._lock:
+            listeners = list(self._listeners.get(message['channel'], ()))
+        for callback in listeners:
+            try:
+                callback(message['data'])
+            except Exception:
+                # Um ouvinte com erro não pode derrubar a entrega aos demais
+                pass
+
+
+def _remove_quietly(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+broker = EventBroker(os.getenv('EVENTS_DIR'))
+
+
+def delta(old, new):
+    """O que mudou de ``old`` para ``new`` (dicionários comparados campo a campo)"""
+    changed = {}
+    for key, value in new.items():
+        previous = old.get(key)
+        if isinstance(value, dict) and isinstance(previous, dict):
+            fields = {field: item for field, item in value.items() if previous.get(field) != item}
+            if fields:
+                changed[key] = fields
+        elif previous != value:
+            changed[key] = value
+    return changed
+
+
+def sse_event(event, data):
+    return f'event: {event}\ndata: {json.dumps(data)}\n\n'
+
+
+class LiveFeed:
+    """Estado recalculado a cada notificação de um canal e repassado aos clientes
+
+    ``compute()`` roda numa thread própria (uma por worker), dentro de um
+    contexto da aplicação, no máximo uma vez a cada ``debounce`` segundos;
+    rajadas de commits viram um único recálculo. ``max_clients`` limita as
+    conexões abertas por worker, já que cada uma ocupa uma thread.
+    """
+
+    def __init__(self, channel, compute, max_clients=2, debounce=0.1, event_broker=broker):
+        self.channel = channel
+        self.compute = compute
+        self.max_clients = max_clients
+        self.debounce = debounce
+        self._broker = event_broker
+        self._clients = set()
+        self._lock = threading.Lock()
+        self._changed = threading.Event()
+        self._thread = None
+        self._app = None
+        event_broker.subscribe(channel, self._notify)
+
+    def _notify(self, data):
+        if self._clients:
+            self._changed.set()
+
+    def connect(self, app):
+        """Fila de estados para um cliente novo, ou None se o worker está cheio"""
+        with self._lock:
+            if len(self._clients) >= self.max_clients:
+                return None
+            client = queue.Queue(maxsize=1)
+            self._clients.add(client)
+            self._app = app
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+        self._broker.start()
+        return client
+
+    def disconnect(self, client):
+        with self._lock:
+            self._clients.discard(client)
+
+    def _run(self):
+        while True:
+            self._changed.wait()
+            time.sleep(self.debounce)
+            self._changed.clear()
+            with self._lock:
+                clients = list(self._clients)
+                app = self._app
+            if not clients:
+                continue
+            try:
+                with app.app_context():
+                    state = self.compute()
+            except Exception:
+                app.logger.exception('Falha ao recalcular o canal %s', self.channel)
+                continue
+            for client in clients:
+                # Só o estado mais recente interessa: descarta o que o
+                # cliente ainda não consumiu
+                try:
+                    client.get_nowait()
+                except queue.Empty:
+                    pass
+                client.put_nowait(state)
+
+    def stream(self, client, initial, heartbeat=15, max_seconds=300, retry=3000):
+        """Gerador SSE: estado completo, depois só as diferenças"""
+        try:
+            yield f'retry: {retry}\n\n'
+            yield sse_event('snapshot', initial)
+            last = initial
+            deadline = time.monotonic() + max_seconds
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    # Encerra para liberar a thread; o cliente reconecta
+                    return
+                try:
+                    state = client.get(timeout=min(heartbeat, remaining))
+                except queue.Empty:
+                    yield ': ping\n\n'
+                    continue
+                changed = delta(last, state)
+                if changed:
+                    yield sse_event('delta', changed)
+                    last = state
+        finally:
+            self.disconnect(client)
@@ -2,6 +2,7 @@ from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required
 from datetime import datetime
 from src.models.database import db, Expense
+from src.models.pagination import keyset_page
 
 expenses_bp = Blueprint('expenses', __name__)
 
@@ -12,23 +13,38 @@ def get_expenses():
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 20, type=int)
         category = request.args.get('category')
+        # ?cursor= (vazio na primeira página) ativa a paginação por cursor
+        cursor = request.args.get('cursor')
+        with_total = request.args.get('with_total', 'false' if cursor is not None else 'true').lower() in ('1', 'true')
         
         query = Expense.query
         
         if category:
             query = query.filter_by(category=category)
         
+        if cursor is not None:
+            expenses, next_cursor = keyset_page(query, (Expense.expense_date, Expense.id), cursor, per_page)
+            result = {
+                'expenses': [expense.to_dict() for expense in expenses],
+                'next_cursor': next_cursor
+            }
+            if with_total:
+                result['total'] = query.count()
+            return jsonify(result), 200
+        
         expenses = query.order_by(Expense.expense_date.desc()).paginate(
-            page=page, per_page=per_page, error_out=False
+            page=page, per_page=per_page, error_out=False, count=with_total
         )
         
         return jsonify({
             'expenses': [expense.to_dict() for expense in expenses.items],
             'total': expenses.total,
-            'pages': expenses.pages,
+            'pages': expenses.pages if with_total else None,
             'current_page': page
         }), 200
         
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -0,0 +1,74 @@
+"""Configuração do gunicorn para produção
+
+Todos os valores podem ser ajustados por variáveis de ambiente, de modo que
+o mesmo container atende de uma máquina pequena a uma com vários núcleos:
+
+- WEB_CONCURRENCY: processos (padrão 2 x núcleos + 1, no máximo 8)
+- GUNICORN_THREADS: threads por processo (padrão 4; 1 usa workers sync)
+- GUNICORN_TIMEOUT: segundos até um worker travado ser reiniciado (padrão 60)
+- GUNICORN_GRACEFUL_TIMEOUT: segundos para terminar requisições no restart (padrão 30)
+- GUNICORN_KEEPALIVE: segundos de keep-alive (padrão 5)
+- GUNICORN_MAX_REQUESTS: requisições antes de reciclar o worker (padrão 1000, 0 desliga)
+- GUNICORN_MAX_REQUESTS_JITTER: variação aleatória da reciclagem (padrão 100)
+- PORT: porta (definida pelo Railway)
+"""
+import multiprocessing
+import os
+import tempfile
+
+
+def _env_int(name, default):
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+
+workers = _env_int('WEB_CONCURRENCY', min(multiprocessing.cpu_count() * 2 + 1, 8))
+threads = _env_int('GUNICORN_THREADS', 4)
+# Com mais de uma thread o gunicorn usa workers gthread; com 1, workers sync
+worker_class = 'gthread' if threads > 1 else 'sync'
+
+# Carrega a aplicação uma vez no processo mestre antes do fork: os workers
+# sobem mais rápido e compartilham a memória do código importado
+preload_app = True
+
+timeout = _env_int('GUNICORN_TIMEOUT', 60)
+graceful_timeout = _env_int('GUNICORN_GRACEFUL_TIMEOUT', 30)
+keepalive = _env_int('GUNICORN_KEEPALIVE', 5)
+
+# Reciclagem periódica dos workers (limita vazamentos de memória); o jitter
+# evita que todos reiniciem ao mesmo tempo
+max_requests = _env_int('GUNICORN_MAX_REQUESTS', 1000)
+max_requests_jitter = _env_int('GUNICORN_MAX_REQUESTS_JITTER', 100)
+
+# Os workers gravam métricas aqui e /api/_metrics soma todos (uma pasta nova
+# a cada início do servidor, para os contadores recomeçarem do zero)
+os.environ.setdefault('METRICS_DIR', tempfile.mkdtemp(prefix='rm-papel-metrics-'))
+# Sockets do broker de eventos entre workers (src/events.py)
+os.environ.setdefault('EVENTS_DIR', tempfile.mkdtemp(prefix='rm-papel-events-'))
+
+accesslog = '-'
+errorlog = '-'
+loglevel = os.getenv('GUNICORN_LOG_LEVEL', 'info')
+# Railway/proxies repassam o IP original nesses cabeçalhos
+forwarded_allow_ips = '*'
+
+
+def post_fork(server, worker):
+    """Cada worker abre suas próprias conexões
+
+    Com preload_app o mestre já conectou ao banco (create_all); conexões
+    herdadas pelo fork não podem ser compartilhadas entre processos.
+    """
+    from src.wsgi import app
+    from src.events import broker
+    from src.models.database import db
+
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+
+    # Cada worker escuta no seu socket desde o início, mesmo sem clientes
+    # do /stream, para invalidar o cache do dashboard quando outro worker grava
+    broker.start()
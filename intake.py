@@ -0,0 +1,167 @@
+from decimal import Decimal, InvalidOperation
+from sqlalchemy import case, insert, select, update
+from src.models.alerts import track_stock_changes
+from src.models.database import db, Material, StockMovement
+
+
+# Maior valor de uma coluna Integer no PostgreSQL
+MAX_REFERENCE_ID = 2**31 - 1
+
+
+class IntakeError(Exception):
+    """Entrada de estoque em lote inválida; ``errors`` traz os problemas por linha"""
+
+    def __init__(self, message, errors=None):
+        super().__init__(message)
+        self.errors = errors or []
+
+
+def _decimal(value, field):
+    """Converte números vindos de JSON ou CSV (aceita vírgula decimal)"""
+    if isinstance(value, str):
+        value = value.strip()
+        if ',' in value and '.' not in value:
+            value = value.replace(',', '.')
+    if value is None or value == '' or isinstance(value, bool):
+        raise ValueError(f'{field} é obrigatório')
+    try:
+        number = Decimal(str(value))
+    except InvalidOperation:
+        raise ValueError(f'{field} inválido: {value}')
+    if not number.is_finite():
+        raise ValueError(f'{field} inválido: {value}')
+    return number
+
+
+def _text(value, field):
+    """Texto opcional; None ou vazio viram None"""
+    if value is None:
+        return None
+    if not isinstance(value, str):
+        raise ValueError(f'{field} deve ser texto')
+    return value.strip() or None
+
+
+def _reference_id(value):
+    """Id opcional do documento de origem (ex.: número da nota de compra)"""
+    if isinstance(value, str):
+        value = value.strip()
+        if value.isdecimal():
+            value = int(value)
+    if value is None or value == '':
+        return None
+    if not isinstance(value, int) or isinstance(value, bool) or not 0 < value <= MAX_REFERENCE_ID:
+        raise ValueError(f'reference_id inválido: {value}')
+    return value
+
+
+def parse_intake_header(description, reference_id):
+    """Valida os campos da entrada como um todo; retorna (description, reference_id)"""
+    try:
+        return _text(description, 'description'), _reference_id(reference_id)
+    except ValueError as e:
+        raise IntakeError(str(e))
+
+
+def parse_intake_lines(rows):
+    """Valida as linhas da entrada (material_id, quantity, unit_price?, description?)
+
+    Todas as linhas são verificadas antes de gravar qualquer coisa; os
+    materiais são conferidos com uma única consulta IN.
+    """
+    lines = []
+    errors = []
+    for index, row in enumerate(rows):
+        try:
+            if not isinstance(row, dict):
+                raise ValueError('Linha inválida')
+            material_id = row.get('material_id')
+            if isinstance(material_id, str) and material_id.strip().isdigit():
+                material_id = int(material_id)
+            if not isinstance(material_id, int) or isinstance(material_id, bool):
+                raise ValueError('material_id é obrigatório')
+            quantity = _decimal(row.get('quantity'), 'quantity')
+            if quantity <= 0:
+                raise ValueError('Quantidade deve ser maior que zero')
+            unit_price = row.get('unit_price')
+            unit_price = _decimal(unit_price, 'unit_price') if unit_price not in (None, '') else None
+            if unit_price is not None and unit_price < 0:
+                raise ValueError('unit_price não pode ser negativo')
+            description = _text(row.get('description'), 'description')
+            lines.append({
+                'index': index,
+                'material_id': material_id,
+                'quantity': quantity,
+                'unit_price': unit_price,
+                'description': description
+            })
+        except ValueError as e:
+            errors.append({'index': index, 'error': str(e)})
+
+    existing = set(db.session.scalars(
+        select(Material.id).where(Material.id.in_({line['material_id'] for line in lines}))
+    ))
+    for line in lines:
+        if line['material_id'] not in existing:
+            errors.append({'index': line['index'], 'error': f'Material {line["material_id"]} não encontrado'})
+
+    if errors:
+        errors.sort(key=lambda error: error['index'])
+        raise IntakeError('Entrada de estoque com linhas inválidas', errors)
+    if not lines:
+        raise IntakeError('Nenhuma linha para dar entrada')
+    return lines
+
+
+def receive_stock(lines, description='Entrada de estoque', reference_id=None):
+    """Registra todas as entradas (IN) com um insert em lote e um UPDATE por CASE
+
+    Não faz commit: a rota decide o fim da transação. Retorna o resumo da
+    entrada com o estoque final de cada material.
+    """
+    db.session.execute(insert(StockMovement), [{
+        'material_id': line['material_id'],
+        'movement_type': 'IN',
+        'quantity': line['quantity'],
+        'unit_price': line['unit_price'],
+        'total_cost': line['quantity'] * line['unit_price'] if line['unit_price'] is not None else None,
+        'description': line['description'] or description,
+        'reference_id': reference_id,
+        'reference_type': 'purchase'
+    } for line in lines])
+
+    quantities = {}
+    for line in lines:
+        quantities[line['material_id']] = quantities.get(line['material_id'], 0) + line['quantity']
+
+    db.session.execute(
+        update(Material).where(
+            Material.id.in_(list(quantities))
+        ).values(
+            stock_quantity=Material.stock_quantity + case(quantities, value=Material.id, else_=0)
+        ).execution_options(synchronize_session=False)
+    )
+    track_stock_changes(db.session, quantities)
+
+    materials = db.session.execute(
+        select(Material.id, Material.name, Material.unit, Material.stock_quantity)
+        .where(Material.id.in_(list(quantities)))
+        .order_by(Material.id)
+    ).all()
+
+    total_cost = sum(
+        (line['quantity'] * line['unit_price'] for line in lines if line['unit_price'] is not None),
+        Decimal(0)
+    )
+    return {
+        'movements': len(lines),
+        'materials_count': len(quantities),
+        'total_cost': float(total_cost),
+        'materials': [{
+            'id': material.id,
+            'name': material.name,
+            'unit': material.unit,
+            'added': float(quantities[material.id]),
+            'stock_quantity': float(material.stock_quantity)
+        } for material in materials]
+    }
@@ -0,0 +1,67 @@
+"""Provider de JSON da aplicação
+
+Usa o orjson quando instalado (bem mais rápido que o json da biblioteca
+padrão) e cai para o encoder padrão do Flask caso contrário. Nos dois casos
+``Decimal`` vira número e ``date``/``datetime`` viram strings ISO 8601, do
+mesmo jeito que os ``to_dict()`` dos modelos já fazem.
+"""
+from datetime import date
+from decimal import Decimal
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # dependência opcional
+    orjson = None
+
+
+def _default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(f'Objeto do tipo {type(value).__name__} não é serializável em JSON')
+
+
+class StdlibJSONProvider(DefaultJSONProvider):
+    """Encoder padrão com as mesmas conversões do orjson (ISO 8601, Decimal como número)"""
+
+    default = staticmethod(_default)
+    ensure_ascii = False
+    sort_keys = False
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """JSON com orjson; datas e horas são serializadas nativamente"""
+
+    default = staticmethod(_default)
+    ensure_ascii = False
+    sort_keys = False
+
+    def _options(self):
+        options = orjson.OPT_NON_STR_KEYS
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            options |= orjson.OPT_INDENT_2
+        return options
+
+    def dumps(self, obj, **kwargs):
+        # Chamadas com opções do json padrão (ex.: indent) ficam com ele
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS).decode()
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            orjson.dumps(obj, default=_default, option=self._options()),
+            mimetype=self.mimetype
+        )
+
+
+def json_provider_class():
+    return OrjsonProvider if orjson is not None else StdlibJSONProvider
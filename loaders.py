@@ -0,0 +1,39 @@
+from sqlalchemy.orm import configure_mappers, joinedload, selectinload
+from src.models.database import (
+    Material, Product, ProductMaterial, Production, Sale, SaleItem, StockMovement
+)
+
+# Os relacionamentos via backref (Sale.customer, SaleItem.product, ...) só
+# existem depois da configuração dos mappers
+configure_mappers()
+
+# Planos de carregamento usados pelos endpoints antes de chamar to_dict().
+# Cada plano cobre toda a árvore percorrida pela serialização, de modo que uma
+# página inteira é carregada em um número fixo de consultas, independente da
+# quantidade de linhas.
+
+MATERIAL_LOAD = (
+    joinedload(Material.supplier),
+)
+
+PRODUCT_LOAD = (
+    joinedload(Product.category),
+    selectinload(Product.product_materials)
+        .joinedload(ProductMaterial.material)
+        .joinedload(Material.supplier),
+)
+
+SALE_LOAD = (
+    joinedload(Sale.customer),
+    selectinload(Sale.sale_items)
+        .selectinload(SaleItem.product)
+        .options(*PRODUCT_LOAD),
+)
+
+PRODUCTION_LOAD = (
+    selectinload(Production.product).options(*PRODUCT_LOAD),
+)
+
+STOCK_MOVEMENT_LOAD = (
+    joinedload(StockMovement.material).options(*MATERIAL_LOAD),
+)
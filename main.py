@@ -3,86 +3,159 @@ import sys
 # DON'T CHANGE THIS !!!
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
+import click
 from flask import Flask, send_from_directory
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
-from flask_migrate import Migrate
 from dotenv import load_dotenv
 
 from src.models.database import db
-from src.routes.auth import auth_bp
-from src.routes.suppliers import suppliers_bp
-from src.routes.materials import materials_bp
-from src.routes.categories import categories_bp
-from src.routes.products import products_bp
-from src.routes.stock_movements import stock_movements_bp
-from src.routes.productions import productions_bp
-from src.routes.customers import customers_bp
-from src.routes.sales import sales_bp
-from src.routes.expenses import expenses_bp
-from src.routes.dashboard import dashboard_bp
-from src.routes.reports import reports_bp
+from src.engine_config import engine_options, install_sqlite_pragmas
+from src.json_provider import json_provider_class
+from src.compression import init_compression
+from src.metrics import init_metrics
 
 # Carregar variáveis de ambiente
 load_dotenv()
 
-app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
+def create_app():
+    """Cria e configura a aplicação
 
-# Configurações
-app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'rm-papel-secret-key-2024')
-app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY', 'jwt-secret-string-rm-papel')
-
-# Configuração do banco de dados
-database_url = os.getenv('DATABASE_URL')
-if database_url:
-    # Para Railway/PostgreSQL
-    app.config['SQLALCHEMY_DATABASE_URI'] = database_url
-else:
-    # Para desenvolvimento local com SQLite
-    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
-
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-
-# Inicializar extensões
-db.init_app(app)
-migrate = Migrate(app, db)
-jwt = JWTManager(app)
-CORS(app)
+    O esquema do banco não é criado aqui: use ``flask init-db`` (ou
+    ``flask db upgrade``) no deploy. Blueprints e comandos são importados
+    dentro da fábrica, e o ReportLab só é carregado pelos processos que
+    geram PDFs.
+    """
+    app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
+    
+    # Configurações
+    app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'rm-papel-secret-key-2024')
+    app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY', 'jwt-secret-string-rm-papel')
+    
+    # Configuração do banco de dados
+    database_url = os.getenv('DATABASE_URL')
+    if database_url:
+        # Para Railway/PostgreSQL
+        app.config['SQLALCHEMY_DATABASE_URI'] = database_url
+    else:
+        # Para desenvolvimento local com SQLite
+        app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
+    
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config['SQLALCHEMY_DATABASE_URI'])
+    
+    # JSON com orjson (quando instalado) e compressão gzip/brotli
+    app.json = json_provider_class()(app)
+    init_compression(app)
+    init_metrics(app)
+    
+    # Inicializar extensões
+    db.init_app(app)
+    with app.app_context():
+        install_sqlite_pragmas(db.engine)
+    JWTManager(app)
+    CORS(app)
+    
+    # Flask-Migrate (Alembic) só é necessário nos comandos do CLI (flask db ...)
+    if click.get_current_context(silent=True) is not None:
+        from flask_migrate import Migrate
+        Migrate(app, db)
+    
+    register_blueprints(app)
+    register_commands(app)
+    register_frontend(app)
+    
+    return app
 
-# Registrar blueprints
-app.register_blueprint(auth_bp, url_prefix='/api/auth')
-app.register_blueprint(suppliers_bp, url_prefix='/api/suppliers')
-app.register_blueprint(materials_bp, url_prefix='/api/materials')
-app.register_blueprint(categories_bp, url_prefix='/api/categories')
-app.register_blueprint(products_bp, url_prefix='/api/products')
-app.register_blueprint(stock_movements_bp, url_prefix='/api/stock-movements')
-app.register_blueprint(productions_bp, url_prefix='/api/productions')
-app.register_blueprint(customers_bp, url_prefix='/api/customers')
-app.register_blueprint(sales_bp, url_prefix='/api/sales')
-app.register_blueprint(expenses_bp, url_prefix='/api/expenses')
-app.register_blueprint(dashboard_bp, url_prefix='/api/dashboard')
-app.register_blueprint(reports_bp, url_prefix='/api/reports')
+def register_blueprints(app):
+    from src.routes.auth import auth_bp
+    from src.routes.suppliers import suppliers_bp
+    from src.routes.materials import materials_bp
+    from src.routes.categories import categories_bp
+    from src.routes.products import products_bp
+    from src.routes.stock_movements import stock_movements_bp
+    from src.routes.productions import productions_bp
+    from src.routes.customers import customers_bp
+    from src.routes.sales import sales_bp
+    from src.routes.expenses import expenses_bp
+    from src.routes.dashboard import dashboard_bp
+    from src.routes.reports import reports_bp
+    
+    app.register_blueprint(auth_bp, url_prefix='/api/auth')
+    app.register_blueprint(suppliers_bp, url_prefix='/api/suppliers')
+    app.register_blueprint(materials_bp, url_prefix='/api/materials')
+    app.register_blueprint(categories_bp, url_prefix='/api/categories')
+    app.register_blueprint(products_bp, url_prefix='/api/products')
+    app.register_blueprint(stock_movements_bp, url_prefix='/api/stock-movements')
+    app.register_blueprint(productions_bp, url_prefix='/api/productions')
+    app.register_blueprint(customers_bp, url_prefix='/api/customers')
+    app.register_blueprint(sales_bp, url_prefix='/api/sales')
+    app.register_blueprint(expenses_bp, url_prefix='/api/expenses')
+    app.register_blueprint(dashboard_bp, url_prefix='/api/dashboard')
+    app.register_blueprint(reports_bp, url_prefix='/api/reports')
 
-# Criar tabelas
-with app.app_context():
+def init_db():
+    """Cria as tabelas que faltam e aplica as migrações pendentes"""
+    from flask_migrate import upgrade
+    
     db.create_all()
+    # As migrações verificam o que já existe, então rodar depois do
+    # create_all só completa bancos antigos (colunas, índices, backfills)
+    upgrade()
 
-@app.route('/', defaults={'path': ''})
-@app.route('/<path:path>')
-def serve(path):
-    static_folder_path = app.static_folder
-    if static_folder_path is None:
-        return "Static folder not configured", 404
+def register_commands(app):
+    @app.cli.command('init-db')
+    def init_db_command():
+        """Cria o esquema do banco (tabelas, índices e migrações)"""
+        init_db()
+        print('Banco de dados inicializado')
+    
+    @app.cli.command('rebuild-daily-sales')
+    def rebuild_daily_sales_command():
+        """Recalcula os totais diários de vendas a partir do histórico"""
+        from src.models.rollups import rebuild_daily_sales
+        
+        rebuild_daily_sales()
+        db.session.commit()
+        print('Totais diários de vendas recalculados')
+    
+    @app.cli.command('snapshot-stock')
+    @click.option('--period', type=click.Choice(['daily', 'monthly']), default='daily',
+                  help='Fotografia no início de cada dia ou de cada mês')
+    @click.option('--since', type=click.DateTime(formats=['%Y-%m-%d']),
+                  help='Refaz as fotografias a partir desta data (padrão: continua da última)')
+    def snapshot_stock_command(period, since):
+        """Grava as fotografias de saldo de materiais que faltam (estoque em data passada)"""
+        from src.models.snapshots import take_snapshots
+        
+        taken = take_snapshots(period, since.date() if since else None)
+        db.session.commit()
+        if taken:
+            print(f'{len(taken)} fotografia(s) de estoque gravada(s), de {taken[0]:%Y-%m-%d} a {taken[-1]:%Y-%m-%d}')
+        else:
+            print('Fotografias de estoque já estão em dia')
 
-    if path != "" and os.path.exists(os.path.join(static_folder_path, path)):
-        return send_from_directory(static_folder_path, path)
-    else:
-        index_path = os.path.join(static_folder_path, 'index.html')
-        if os.path.exists(index_path):
-            return send_from_directory(static_folder_path, 'index.html')
+def register_frontend(app):
+    @app.route('/', defaults={'path': ''})
+    @app.route('/<path:path>')
+    def serve(path):
+        static_folder_path = app.static_folder
+        if static_folder_path is None:
+            return "Static folder not configured", 404
+
+        if path != "" and os.path.exists(os.path.join(static_folder_path, path)):
+            return send_from_directory(static_folder_path, path)
         else:
-            return "index.html not found", 404
+            index_path = os.path.join(static_folder_path, 'index.html')
+            if os.path.exists(index_path):
+                return send_from_directory(static_folder_path, 'index.html')
+            else:
+                return "index.html not found", 404
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True)
-
+    # Servidor de desenvolvimento; em produção use o gunicorn (ver src/gunicorn.conf.py)
+    app = create_app()
+    with app.app_context():
+        # Conveniência local: cria as tabelas do SQLite de desenvolvimento
+        db.create_all()
+    app.run(host='0.0.0.0', port=int(os.getenv('PORT', 5000)), debug=os.getenv('FLASK_DEBUG', '1') == '1')
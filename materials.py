@@ -1,27 +1,91 @@
+import csv
+import io
+from datetime import datetime
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required
-from src.models.database import db, Material, StockMovement
+from src.models.database import db, Material, StockAlert, StockMovement, StockSnapshot
+from src.models.loaders import MATERIAL_LOAD
+from src.models.costing import products_using_materials, refresh_product_costs
+from src.models.intake import IntakeError, parse_intake_header, parse_intake_lines, receive_stock
+from src.models.snapshots import as_of_instant, stock_adjustment, stock_as_of
+from src.models.alerts import open_alert_filter
+from src.cache import etag_from_tables
 
 materials_bp = Blueprint('materials', __name__)
 
 @materials_bp.route('', methods=['GET'])
 @jwt_required()
+@etag_from_tables('materials', 'suppliers')
 def get_materials():
     try:
-        materials = Material.query.all()
+        materials = Material.query.options(*MATERIAL_LOAD).all()
         return jsonify([material.to_dict() for material in materials]), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @materials_bp.route('/low-stock', methods=['GET'])
 @jwt_required()
+@etag_from_tables('materials', 'suppliers')
 def get_low_stock_materials():
     try:
-        materials = Material.query.filter(Material.stock_quantity <= Material.min_stock_alert).all()
+        # Alertas abertos: leitura pelo índice parcial em vez de comparar coluna com coluna
+        materials = Material.query.options(*MATERIAL_LOAD).join(StockAlert, open_alert_filter()).all()
         return jsonify([material.to_dict() for material in materials]), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@materials_bp.route('/<int:material_id>/stock-alerts', methods=['GET'])
+@jwt_required()
+def get_material_stock_alerts(material_id):
+    """Histórico de períodos com estoque baixo do material (mais recentes primeiro)"""
+    try:
+        if not Material.query.get(material_id):
+            return jsonify({'error': 'Material não encontrado'}), 404
+        
+        alerts = StockAlert.query.filter_by(material_id=material_id).order_by(StockAlert.started_at.desc()).all()
+        return jsonify([alert.to_dict() for alert in alerts]), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@materials_bp.route('/stock-as-of', methods=['GET'])
+@jwt_required()
+def get_stock_as_of():
+    """Saldo de cada material no fim de uma data passada (?date=AAAA-MM-DD)"""
+    try:
+        as_of = request.args.get('date')
+        material_id = request.args.get('material_id', type=int)
+        
+        if not as_of:
+            return jsonify({'error': 'date é obrigatório'}), 400
+        
+        day = datetime.strptime(as_of, '%Y-%m-%d').date()
+        
+        query = db.session.query(Material.id, Material.name, Material.unit).order_by(Material.name)
+        if material_id:
+            query = query.filter(Material.id == material_id)
+        materials = query.all()
+        
+        if material_id and not materials:
+            return jsonify({'error': 'Material não encontrado'}), 404
+        
+        balances, snapshot_at = stock_as_of(as_of_instant(day), [material_id] if material_id else None)
+        
+        return jsonify({
+            'date': day.isoformat(),
+            'snapshot_at': snapshot_at.isoformat() if snapshot_at else None,
+            'materials': [{
+                'id': material.id,
+                'name': material.name,
+                'unit': material.unit,
+                'stock_quantity': float(balances.get(material.id, 0))
+            } for material in materials]
+        }), 200
+        
+    except ValueError:
+        return jsonify({'error': 'Data inválida. Use o formato AAAA-MM-DD'}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @materials_bp.route('', methods=['POST'])
 @jwt_required()
 def create_material():
@@ -43,6 +107,12 @@ def create_material():
         )
         
         db.session.add(material)
+        
+        # Estoque inicial entra no histórico como uma movimentação de ajuste
+        adjustment = stock_adjustment(material, 0, material.stock_quantity, 'Estoque inicial')
+        if adjustment:
+            db.session.add(adjustment)
+        
         db.session.commit()
         
         return jsonify({
@@ -63,6 +133,8 @@ def update_material(material_id):
             return jsonify({'error': 'Material não encontrado'}), 404
         
         data = request.get_json()
+        old_price = material.purchase_price
+        old_stock = material.stock_quantity
         
         material.name = data.get('name', material.name)
         material.unit = data.get('unit', material.unit)
@@ -71,6 +143,15 @@ def update_material(material_id):
         material.min_stock_alert = data.get('min_stock_alert', material.min_stock_alert)
         material.supplier_id = data.get('supplier_id', material.supplier_id)
         
+        if 'stock_quantity' in data:
+            adjustment = stock_adjustment(material, old_stock, material.stock_quantity, 'Ajuste manual de estoque')
+            if adjustment:
+                db.session.add(adjustment)
+        
+        # Preço mudou: recalcular apenas os produtos que usam este material
+        if 'purchase_price' in data and float(data['purchase_price']) != float(old_price):
+            refresh_product_costs(products_using_materials([material_id]))
+        
         db.session.commit()
         
         return jsonify({
@@ -90,6 +171,9 @@ def delete_material(material_id):
         if not material:
             return jsonify({'error': 'Material não encontrado'}), 404
         
+        # O histórico de estoque do material sai junto com ele
+        StockMovement.query.filter_by(material_id=material_id).delete(synchronize_session=False)
+        StockSnapshot.query.filter_by(material_id=material_id).delete(synchronize_session=False)
         db.session.delete(material)
         db.session.commit()
         
@@ -142,3 +226,80 @@ def add_stock(material_id):
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+
+INTAKE_MAX_LINES = 5000
+
+def _intake(rows, description, reference_id):
+    """Valida e grava uma entrada em lote em uma única transação"""
+    if len(rows) > INTAKE_MAX_LINES:
+        return jsonify({'error': f'Máximo de {INTAKE_MAX_LINES} linhas por entrada'}), 400
+    
+    try:
+        description, reference_id = parse_intake_header(description, reference_id)
+        lines = parse_intake_lines(rows)
+    except IntakeError as e:
+        return jsonify({'error': str(e), 'errors': e.errors}), 400
+    
+    summary = receive_stock(lines, description or 'Entrada de estoque', reference_id)
+    db.session.commit()
+    
+    return jsonify(dict(summary, message='Entrada de estoque registrada com sucesso')), 200
+
+@materials_bp.route('/stock-intake', methods=['POST'])
+@jwt_required()
+def add_stock_batch():
+    """Entrada de uma nota de compra inteira de uma vez
+
+    Corpo: {"items": [{material_id, quantity, unit_price?, description?}, ...],
+    "description"?, "reference_id"?}. Ou entra tudo, ou nada.
+    """
+    try:
+        data = request.get_json() or {}
+        items = data.get('items')
+        
+        if not isinstance(items, list) or not items:
+            return jsonify({'error': 'items deve ser uma lista com pelo menos um item'}), 400
+        
+        return _intake(items, data.get('description'), data.get('reference_id'))
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@materials_bp.route('/stock-intake/csv', methods=['POST'])
+@jwt_required()
+def add_stock_csv():
+    """Entrada de estoque a partir de um CSV (campo de upload "file")
+
+    Colunas: material_id, quantity, unit_price (opcional), description
+    (opcional). Aceita separador vírgula ou ponto e vírgula e vírgula decimal.
+    """
+    try:
+        upload = request.files.get('file')
+        if not upload:
+            return jsonify({'error': 'Arquivo CSV é obrigatório (campo file)'}), 400
+        
+        try:
+            content = upload.read().decode('utf-8-sig')
+        except UnicodeDecodeError:
+            return jsonify({'error': 'O arquivo deve estar em UTF-8'}), 400
+        
+        header = content.split('\n', 1)[0]
+        delimiter = ';' if header.count(';') > header.count(',') else ','
+        reader = csv.DictReader(io.StringIO(content), delimiter=delimiter)
+        
+        if not reader.fieldnames or not {'material_id', 'quantity'} <= {name.strip() for name in reader.fieldnames}:
+            return jsonify({'error': 'O CSV deve ter as colunas material_id e quantity'}), 400
+        
+        rows = [
+            {key.strip(): value for key, value in row.items() if key}
+            for row in reader if any((value or '').strip() for value in row.values() if isinstance(value, str))
+        ]
+        if not rows:
+            return jsonify({'error': 'O CSV não tem linhas'}), 400
+        
+        return _intake(rows, request.form.get('description'), request.form.get('reference_id'))
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
@@ -0,0 +1,228 @@
+"""Métricas por endpoint no formato do Prometheus (/api/_metrics)
+
+Para cada requisição registra latência (histograma), status, quantidade de
+comandos SQL e tempo gasto no banco, usando os eventos do engine do
+SQLAlchemy. Quando um mesmo SELECT parametrizado se repete mais de
+``METRICS_N_PLUS_ONE_THRESHOLD`` vezes em uma requisição (o padrão N+1 de
+``to_dict()`` percorrendo relacionamentos), registra um aviso no log.
+
+Com vários workers do gunicorn cada processo grava periodicamente um resumo
+em ``METRICS_DIR`` e o endpoint soma os resumos de todos, de modo que
+qualquer worker responde com os totais do servidor.
+"""
+import hmac
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import Counter
+from flask import current_app, g, has_request_context, request
+from flask_jwt_extended import verify_jwt_in_request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+STATEMENT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200)
+
+METRICS = {
+    'http_requests_total': ('counter', 'Requisições HTTP por endpoint, método e status'),
+    'http_request_duration_seconds': ('histogram', 'Latência das requisições'),
+    'http_request_sql_statements': ('histogram', 'Comandos SQL por requisição'),
+    'http_sql_statements_total': ('counter', 'Comandos SQL executados'),
+    'http_sql_duration_seconds_total': ('counter', 'Tempo gasto em comandos SQL'),
+    'http_n_plus_one_total': ('counter', 'Requisições que repetiram o mesmo SELECT acima do limite'),
+}
+
+
+class Metrics:
+    """Contadores e histogramas do processo atual"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = Counter()
+        self.histograms = {}
+        self._flushed = 0
+
+    def inc(self, name, labels, value=1):
+        with self._lock:
+            self.counters[(name, labels)] += value
+
+    def observe(self, name, labels, value, buckets):
+        with self._lock:
+            histogram = self.histograms.setdefault((name, labels), [0] * (len(buckets) + 2))
+            for index, bound in enumerate(buckets):
+                if value <= bound:
+                    histogram[index] += 1
+            histogram[-2] += value
+            histogram[-1] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'counters': [[name, list(labels), value] for (name, labels), value in self.counters.items()],
+                'histograms': [[name, list(labels), values] for (name, labels), values in self.histograms.items()]
+            }
+
+    def flush(self, directory, interval=1.0):
+        """Grava o resumo do processo para os outros workers (no máximo a cada ``interval``)"""
+        now = time.monotonic()
+        if not directory or now - self._flushed < interval:
+            return
+        self._flushed = now
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'w') as tmp_file:
+            json.dump(self.snapshot(), tmp_file)
+        os.replace(tmp_path, os.path.join(directory, f'{os.getpid()}.json'))
+
+
+metrics = Metrics()
+
+
+def _merged(directory):
+    """Soma o resumo deste processo com os gravados pelos demais workers"""
+    snapshots = [metrics.snapshot()]
+    if directory and os.path.isdir(directory):
+        own = f'{os.getpid()}.json'
+        for entry in os.scandir(directory):
+            if entry.name.endswith('.json') and entry.name != own:
+                try:
+                    with open(entry.path) as snapshot_file:
+                        snapshots.append(json.load(snapshot_file))
+                except (OSError, ValueError):
+                    continue
+
+    counters = Counter()
+    histograms = {}
+    for snapshot in snapshots:
+        for name, labels, value in snapshot['counters']:
+            counters[(name, tuple(labels))] += value
+        for name, labels, values in snapshot['histograms']:
+            key = (name, tuple(labels))
+            if key in histograms:
+                histograms[key] = [a + b for a, b in zip(histograms[key], values)]
+            else:
+                histograms[key] = list(values)
+    return counters, histograms
+
+
+LABEL_NAMES = {
+    'http_requests_total': ('endpoint', 'method', 'status'),
+    'http_request_duration_seconds': ('endpoint', 'method'),
+    'http_request_sql_statements': ('endpoint',),
+    'http_sql_statements_total': ('endpoint',),
+    'http_sql_duration_seconds_total': ('endpoint',),
+    'http_n_plus_one_total': ('endpoint',),
+}
+BUCKETS = {
+    'http_request_duration_seconds': LATENCY_BUCKETS,
+    'http_request_sql_statements': STATEMENT_BUCKETS,
+}
+
+
+def _labels(name, values, extra=None):
+    pairs = list(zip(LABEL_NAMES[name], values))
+    if extra:
+        pairs.append(extra)
+    escaped = (
+        (key, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for key, value in pairs
+    )
+    return '{' + ','.join(f'{key}="{value}"' for key, value in escaped) + '}'
+
+
+def render_prometheus(directory):
+    counters, histograms = _merged(directory)
+    lines = []
+    for name, (kind, description) in METRICS.items():
+        lines.append(f'# HELP {name} {description}')
+        lines.append(f'# TYPE {name} {kind}')
+        if kind == 'counter':
+            for (metric, labels), value in sorted(counters.items()):
+                if metric == name:
+                    lines.append(f'{name}{_labels(name, labels)} {value:g}')
+            continue
+        for (metric, labels), values in sorted(histograms.items()):
+            if metric != name:
+                continue
+            for bound, count in zip(BUCKETS[name], values):
+                lines.append(f'{name}_bucket{_labels(name, labels, ("le", f"{bound:g}"))} {count:g}')
+            lines.append(f'{name}_bucket{_labels(name, labels, ("le", "+Inf"))} {values[-1]:g}')
+            lines.append(f'{name}_sum{_labels(name, labels)} {values[-2]:g}')
+            lines.append(f'{name}_count{_labels(name, labels)} {values[-1]:g}')
+    return '\n'.join(lines) + '\n'
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context() and 'sql_metrics' in g:
+        conn.info.setdefault('metrics_started', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if not (has_request_context() and 'sql_metrics' in g):
+        return
+    started = conn.info.get('metrics_started')
+    if not started:
+        return
+    sql = g.sql_metrics
+    sql['seconds'] += time.perf_counter() - started.pop()
+    sql['statements'] += 1
+    if not executemany and statement.lstrip()[:6].upper() == 'SELECT':
+        sql['selects'][statement] += 1
+
+
+def init_metrics(app):
+    directory = os.getenv('METRICS_DIR')
+    threshold = int(os.getenv('METRICS_N_PLUS_ONE_THRESHOLD', 10))
+    token = os.getenv('METRICS_TOKEN')
+
+    @app.before_request
+    def start_request_metrics():
+        g.request_started = time.perf_counter()
+        g.sql_metrics = {'statements': 0, 'seconds': 0.0, 'selects': Counter()}
+
+    @app.after_request
+    def record_request_metrics(response):
+        if 'request_started' not in g or request.endpoint == 'metrics':
+            return response
+
+        endpoint = request.endpoint or 'unmatched'
+        elapsed = time.perf_counter() - g.request_started
+        sql = g.sql_metrics
+
+        metrics.inc('http_requests_total', (endpoint, request.method, str(response.status_code)))
+        metrics.observe('http_request_duration_seconds', (endpoint, request.method), elapsed, LATENCY_BUCKETS)
+        metrics.observe('http_request_sql_statements', (endpoint,), sql['statements'], STATEMENT_BUCKETS)
+        metrics.inc('http_sql_statements_total', (endpoint,), sql['statements'])
+        metrics.inc('http_sql_duration_seconds_total', (endpoint,), sql['seconds'])
+
+        if sql['selects']:
+            statement, repeats = sql['selects'].most_common(1)[0]
+            if repeats > threshold:
+                metrics.inc('http_n_plus_one_total', (endpoint,))
+                current_app.logger.warning(
+                    'Possível N+1 em %s %s: mesmo SELECT executado %d vezes: %s',
+                    request.method, request.path, repeats, ' '.join(statement.split())[:300]
+                )
+
+        try:
+            metrics.flush(directory)
+        except OSError:
+            current_app.logger.exception('Falha ao gravar métricas em %s', directory)
+        return response
+
+    def metrics_view():
+        if token:
+            supplied = request.headers.get('Authorization', '').removeprefix('Bearer ')
+            if not hmac.compare_digest(supplied, token):
+                return {'error': 'Não autorizado'}, 401
+        else:
+            verify_jwt_in_request()
+        return current_app.response_class(
+            render_prometheus(directory), content_type='text/plain; version=0.0.4; charset=utf-8'
+        )
+
+    app.add_url_rule('/api/_metrics', 'metrics', metrics_view)
@@ -0,0 +1,56 @@
+"""custo armazenado dos produtos e índice reverso material -> produtos
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 19:10:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Bancos criados por db.create_all() já podem ter as colunas novas
+    inspector = sa.inspect(op.get_bind())
+    columns = {column['name'] for column in inspector.get_columns('products')}
+    indexes = {index['name'] for index in inspector.get_indexes('product_materials')}
+
+    with op.batch_alter_table('products') as batch_op:
+        if 'auto_price' not in columns:
+            batch_op.add_column(sa.Column('auto_price', sa.Boolean(), nullable=False, server_default=sa.true()))
+        if 'unit_cost' not in columns:
+            batch_op.add_column(sa.Column('unit_cost', sa.Numeric(12, 4), nullable=True))
+
+    if 'ix_product_materials_material_id' not in indexes:
+        op.create_index('ix_product_materials_material_id', 'product_materials', ['material_id'])
+
+    # Preencher o custo a partir da lista de materiais
+    op.execute("""
+        UPDATE products SET unit_cost = COALESCE((
+            SELECT SUM(pm.quantity_needed * m.purchase_price)
+            FROM product_materials pm JOIN materials m ON m.id = pm.material_id
+            WHERE pm.product_id = products.id
+        ), 0)
+    """)
+
+    # Preços gravados que não batem com o custo atual foram definidos à mão
+    op.execute("""
+        UPDATE products SET auto_price = (
+            final_price IS NULL
+            OR ABS(final_price - unit_cost * (1 + profit_margin / 100.0)) < 0.01
+        )
+    """)
+
+
+def downgrade():
+    op.drop_index('ix_product_materials_material_id', table_name='product_materials')
+    with op.batch_alter_table('products') as batch_op:
+        batch_op.drop_column('unit_cost')
+        batch_op.drop_column('auto_price')
@@ -0,0 +1,66 @@
+"""totais diários de vendas (daily_sales e daily_product_sales)
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 19:40:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    tables = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if 'daily_sales' not in tables:
+        op.create_table(
+            'daily_sales',
+            sa.Column('sale_date', sa.Date(), nullable=False),
+            sa.Column('payment_method', sa.String(length=50), nullable=False),
+            sa.Column('revenue', sa.Numeric(12, 2), nullable=False),
+            sa.Column('sales_count', sa.Integer(), nullable=False),
+            sa.Column('items_sold', sa.Integer(), nullable=False),
+            sa.PrimaryKeyConstraint('sale_date', 'payment_method')
+        )
+
+    if 'daily_product_sales' not in tables:
+        op.create_table(
+            'daily_product_sales',
+            sa.Column('sale_date', sa.Date(), nullable=False),
+            sa.Column('product_id', sa.Integer(), nullable=False),
+            sa.Column('quantity', sa.Integer(), nullable=False),
+            sa.Column('revenue', sa.Numeric(12, 2), nullable=False),
+            sa.ForeignKeyConstraint(['product_id'], ['products.id']),
+            sa.PrimaryKeyConstraint('sale_date', 'product_id')
+        )
+
+    # Backfill a partir do histórico (equivalente a `flask rebuild-daily-sales`)
+    op.execute('DELETE FROM daily_product_sales')
+    op.execute('DELETE FROM daily_sales')
+    op.execute("""
+        INSERT INTO daily_sales (sale_date, payment_method, revenue, sales_count, items_sold)
+        SELECT s.sale_date, s.payment_method, SUM(s.total_amount), COUNT(s.id), COALESCE(SUM(i.quantity), 0)
+        FROM sales s
+        LEFT JOIN (
+            SELECT sale_id, SUM(quantity) AS quantity FROM sale_items GROUP BY sale_id
+        ) i ON i.sale_id = s.id
+        GROUP BY s.sale_date, s.payment_method
+    """)
+    op.execute("""
+        INSERT INTO daily_product_sales (sale_date, product_id, quantity, revenue)
+        SELECT s.sale_date, si.product_id, SUM(si.quantity), SUM(si.total_price)
+        FROM sale_items si JOIN sales s ON s.id = si.sale_id
+        GROUP BY s.sale_date, si.product_id
+    """)
+
+
+def downgrade():
+    op.drop_table('daily_product_sales')
+    op.drop_table('daily_sales')
@@ -0,0 +1,48 @@
+"""índices para as colunas filtradas e ordenadas pelos endpoints
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 20:10:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+INDEXES = [
+    ('ix_sales_sale_date', 'sales', ['sale_date']),
+    ('ix_sales_customer_id', 'sales', ['customer_id']),
+    ('ix_sales_created_at_id', 'sales', ['created_at', 'id']),
+    ('ix_sale_items_sale_id', 'sale_items', ['sale_id']),
+    ('ix_sale_items_product_id', 'sale_items', ['product_id']),
+    ('ix_stock_movements_material_id_created_at', 'stock_movements', ['material_id', 'created_at']),
+    ('ix_stock_movements_reference', 'stock_movements', ['reference_type', 'reference_id']),
+    ('ix_stock_movements_created_at_id', 'stock_movements', ['created_at', 'id']),
+    ('ix_expenses_expense_date_category', 'expenses', ['expense_date', 'category']),
+    ('ix_expenses_category_expense_date', 'expenses', ['category', 'expense_date']),
+    ('ix_expenses_expense_date_id', 'expenses', ['expense_date', 'id']),
+    ('ix_product_materials_product_id', 'product_materials', ['product_id']),
+    ('ix_productions_production_date', 'productions', ['production_date']),
+]
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    for name, table, columns in INDEXES:
+        existing = {index['name'] for index in inspector.get_indexes(table)}
+        if name not in existing:
+            op.create_index(name, table, columns)
+    # Atualiza as estatísticas do planejador com os índices novos
+    op.execute('ANALYZE')
+
+
+def downgrade():
+    for name, table, columns in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,40 @@
+"""contadores de versão das tabelas do catálogo (ETags das listagens)
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 21:30:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+VERSIONED_TABLES = ['categories', 'customers', 'materials', 'product_materials', 'products', 'suppliers']
+
+
+def upgrade():
+    bind = op.get_bind()
+
+    if 'table_versions' not in sa.inspect(bind).get_table_names():
+        op.create_table(
+            'table_versions',
+            sa.Column('table_name', sa.String(length=64), nullable=False),
+            sa.Column('version', sa.BigInteger(), nullable=False),
+            sa.PrimaryKeyConstraint('table_name')
+        )
+
+    table_versions = sa.table('table_versions', sa.column('table_name'), sa.column('version'))
+    existing = {row[0] for row in bind.execute(sa.select(table_versions.c.table_name))}
+    missing = [name for name in VERSIONED_TABLES if name not in existing]
+    if missing:
+        op.bulk_insert(table_versions, [{'table_name': name, 'version': 0} for name in missing])
+
+
+def downgrade():
+    op.drop_table('table_versions')
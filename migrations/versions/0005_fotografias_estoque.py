@@ -0,0 +1,34 @@
+"""fotografias periódicas do saldo de materiais (estoque em data passada)
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 23:10:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+
+    if 'stock_snapshots' not in sa.inspect(bind).get_table_names():
+        op.create_table(
+            'stock_snapshots',
+            sa.Column('snapshot_at', sa.DateTime(), nullable=False),
+            sa.Column('material_id', sa.Integer(), nullable=False),
+            sa.Column('quantity', sa.Numeric(precision=12, scale=3), nullable=False),
+            sa.ForeignKeyConstraint(['material_id'], ['materials.id']),
+            sa.PrimaryKeyConstraint('snapshot_at', 'material_id')
+        )
+
+
+def downgrade():
+    op.drop_table('stock_snapshots')
@@ -0,0 +1,58 @@
+"""alertas de estoque baixo mantidos a cada alteração de estoque
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19 00:20:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    if 'stock_alerts' not in inspector.get_table_names():
+        op.create_table(
+            'stock_alerts',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('material_id', sa.Integer(), nullable=False),
+            sa.Column('started_at', sa.DateTime(), nullable=False),
+            sa.Column('resolved_at', sa.DateTime(), nullable=True),
+            sa.Column('stock_quantity', sa.Numeric(precision=10, scale=3), nullable=False),
+            sa.Column('min_stock_alert', sa.Numeric(precision=10, scale=3), nullable=False),
+            sa.ForeignKeyConstraint(['material_id'], ['materials.id']),
+            sa.PrimaryKeyConstraint('id')
+        )
+        inspector = sa.inspect(bind)
+
+    existing = {index['name'] for index in inspector.get_indexes('stock_alerts')}
+    if 'ix_stock_alerts_open' not in existing:
+        op.create_index(
+            'ix_stock_alerts_open', 'stock_alerts', ['material_id'], unique=True,
+            postgresql_where=sa.text('resolved_at IS NULL'), sqlite_where=sa.text('resolved_at IS NULL')
+        )
+    if 'ix_stock_alerts_material_id_started_at' not in existing:
+        op.create_index('ix_stock_alerts_material_id_started_at', 'stock_alerts', ['material_id', 'started_at'])
+
+    # Materiais que já estão abaixo do mínimo ganham um alerta aberto a partir de agora
+    op.execute(
+        'INSERT INTO stock_alerts (material_id, started_at, stock_quantity, min_stock_alert) '
+        'SELECT m.id, CURRENT_TIMESTAMP, m.stock_quantity, m.min_stock_alert FROM materials m '
+        'WHERE m.stock_quantity <= m.min_stock_alert AND NOT EXISTS ('
+        'SELECT 1 FROM stock_alerts a WHERE a.material_id = m.id AND a.resolved_at IS NULL)'
+    )
+
+
+def downgrade():
+    op.drop_index('ix_stock_alerts_material_id_started_at', table_name='stock_alerts')
+    op.drop_index('ix_stock_alerts_open', table_name='stock_alerts')
+    op.drop_table('stock_alerts')
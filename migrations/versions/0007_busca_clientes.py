@@ -0,0 +1,69 @@
+"""índices da busca de clientes (pg_trgm no PostgreSQL, FTS5 no SQLite)
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-19 01:40:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+POSTGRESQL = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    "CREATE INDEX IF NOT EXISTS ix_customers_search_trgm ON customers USING gin "
+    "((lower(name || ' ' || coalesce(email, '') || ' ' || coalesce(phone, ''))) gin_trgm_ops)",
+    'CREATE INDEX IF NOT EXISTS ix_customers_name_prefix ON customers (lower(name) text_pattern_ops)',
+]
+
+SQLITE = [
+    'CREATE INDEX IF NOT EXISTS ix_customers_name_nocase ON customers (name COLLATE NOCASE)',
+    "CREATE VIRTUAL TABLE IF NOT EXISTS customers_fts USING fts5("
+    "name, email, phone, content='customers', content_rowid='id', tokenize='trigram')",
+    'CREATE TRIGGER IF NOT EXISTS customers_fts_insert AFTER INSERT ON customers BEGIN '
+    'INSERT INTO customers_fts (rowid, name, email, phone) VALUES (new.id, new.name, new.email, new.phone); END',
+    'CREATE TRIGGER IF NOT EXISTS customers_fts_delete AFTER DELETE ON customers BEGIN '
+    "INSERT INTO customers_fts (customers_fts, rowid, name, email, phone) "
+    "VALUES ('delete', old.id, old.name, old.email, old.phone); END",
+    'CREATE TRIGGER IF NOT EXISTS customers_fts_update AFTER UPDATE ON customers BEGIN '
+    "INSERT INTO customers_fts (customers_fts, rowid, name, email, phone) "
+    "VALUES ('delete', old.id, old.name, old.email, old.phone); "
+    'INSERT INTO customers_fts (rowid, name, email, phone) VALUES (new.id, new.name, new.email, new.phone); END',
+]
+
+
+def upgrade():
+    bind = op.get_bind()
+
+    if bind.dialect.name == 'postgresql':
+        for statement in POSTGRESQL:
+            op.execute(statement)
+        op.execute('ANALYZE customers')
+
+    elif bind.dialect.name == 'sqlite':
+        created = 'customers_fts' not in sa.inspect(bind).get_table_names()
+        for statement in SQLITE:
+            op.execute(statement)
+        if created:
+            # Indexa os clientes que já existiam
+            op.execute("INSERT INTO customers_fts (customers_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    bind = op.get_bind()
+
+    if bind.dialect.name == 'postgresql':
+        op.execute('DROP INDEX IF EXISTS ix_customers_name_prefix')
+        op.execute('DROP INDEX IF EXISTS ix_customers_search_trgm')
+
+    elif bind.dialect.name == 'sqlite':
+        for trigger in ('customers_fts_update', 'customers_fts_delete', 'customers_fts_insert'):
+            op.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+        op.execute('DROP TABLE IF EXISTS customers_fts')
+        op.execute('DROP INDEX IF EXISTS ix_customers_name_nocase')
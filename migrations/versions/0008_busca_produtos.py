@@ -0,0 +1,98 @@
+"""busca de produtos por texto completo (tsvector no PostgreSQL, FTS5 no SQLite)
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-19 03:10:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+POSTGRESQL = [
+    'ALTER TABLE products ADD COLUMN IF NOT EXISTS search_vector tsvector',
+    "CREATE OR REPLACE FUNCTION products_search_vector() RETURNS trigger AS $$ BEGIN "
+    "NEW.search_vector := "
+    "setweight(to_tsvector('portuguese', coalesce(NEW.name, '')), 'A') || "
+    "setweight(to_tsvector('portuguese', coalesce((SELECT name FROM categories WHERE id = NEW.category_id), '')), 'B') || "
+    "setweight(to_tsvector('portuguese', coalesce(NEW.description, '')), 'C'); "
+    "RETURN NEW; END $$ LANGUAGE plpgsql",
+    'DROP TRIGGER IF EXISTS products_search_vector ON products',
+    'CREATE TRIGGER products_search_vector BEFORE INSERT OR UPDATE OF name, description, category_id '
+    'ON products FOR EACH ROW EXECUTE FUNCTION products_search_vector()',
+    "CREATE OR REPLACE FUNCTION categories_products_search() RETURNS trigger AS $$ BEGIN "
+    "UPDATE products SET category_id = category_id WHERE category_id = OLD.id; "
+    "RETURN NULL; END $$ LANGUAGE plpgsql",
+    'DROP TRIGGER IF EXISTS categories_products_search ON categories',
+    'CREATE TRIGGER categories_products_search AFTER UPDATE OF name OR DELETE '
+    'ON categories FOR EACH ROW EXECUTE FUNCTION categories_products_search()',
+    'CREATE INDEX IF NOT EXISTS ix_products_search_vector ON products USING gin (search_vector)',
+]
+
+SQLITE = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5("
+    "name, description, category, tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    'CREATE TRIGGER IF NOT EXISTS products_fts_insert AFTER INSERT ON products BEGIN '
+    'INSERT INTO products_fts (rowid, name, description, category) VALUES (new.id, new.name, new.description, '
+    '(SELECT name FROM categories WHERE id = new.category_id)); END',
+    'CREATE TRIGGER IF NOT EXISTS products_fts_update AFTER UPDATE OF name, description, category_id '
+    'ON products BEGIN DELETE FROM products_fts WHERE rowid = old.id; '
+    'INSERT INTO products_fts (rowid, name, description, category) VALUES (new.id, new.name, new.description, '
+    '(SELECT name FROM categories WHERE id = new.category_id)); END',
+    'CREATE TRIGGER IF NOT EXISTS products_fts_delete AFTER DELETE ON products BEGIN '
+    'DELETE FROM products_fts WHERE rowid = old.id; END',
+    'CREATE TRIGGER IF NOT EXISTS categories_products_fts_update AFTER UPDATE OF name ON categories BEGIN '
+    'UPDATE products_fts SET category = new.name '
+    'WHERE rowid IN (SELECT id FROM products WHERE category_id = new.id); END',
+    'CREATE TRIGGER IF NOT EXISTS categories_products_fts_delete AFTER DELETE ON categories BEGIN '
+    'UPDATE products_fts SET category = NULL '
+    'WHERE rowid IN (SELECT id FROM products WHERE category_id = old.id); END',
+]
+
+
+def upgrade():
+    bind = op.get_bind()
+
+    if bind.dialect.name == 'postgresql':
+        created = 'search_vector' not in {column['name'] for column in sa.inspect(bind).get_columns('products')}
+        for statement in POSTGRESQL:
+            op.execute(statement)
+        if created:
+            # O trigger preenche o vetor dos produtos que já existiam
+            op.execute('UPDATE products SET category_id = category_id')
+        op.execute('ANALYZE products')
+
+    elif bind.dialect.name == 'sqlite':
+        created = 'products_fts' not in sa.inspect(bind).get_table_names()
+        for statement in SQLITE:
+            op.execute(statement)
+        if created:
+            op.execute(
+                'INSERT INTO products_fts (rowid, name, description, category) '
+                'SELECT products.id, products.name, products.description, categories.name '
+                'FROM products LEFT JOIN categories ON categories.id = products.category_id'
+            )
+
+
+def downgrade():
+    bind = op.get_bind()
+
+    if bind.dialect.name == 'postgresql':
+        op.execute('DROP TRIGGER IF EXISTS categories_products_search ON categories')
+        op.execute('DROP FUNCTION IF EXISTS categories_products_search()')
+        op.execute('DROP TRIGGER IF EXISTS products_search_vector ON products')
+        op.execute('DROP FUNCTION IF EXISTS products_search_vector()')
+        op.execute('DROP INDEX IF EXISTS ix_products_search_vector')
+        op.execute('ALTER TABLE products DROP COLUMN IF EXISTS search_vector')
+
+    elif bind.dialect.name == 'sqlite':
+        for trigger in ('categories_products_fts_delete', 'categories_products_fts_update',
+                        'products_fts_delete', 'products_fts_update', 'products_fts_insert'):
+            op.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+        op.execute('DROP TABLE IF EXISTS products_fts')
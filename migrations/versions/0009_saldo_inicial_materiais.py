@@ -0,0 +1,42 @@
+"""movimentação de saldo inicial para o estoque informado à mão
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-19 04:30:00
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0009'
+down_revision = '0008'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Estoque cadastrado ou editado à mão não gerava movimentação, então o
+    # saldo histórico (soma das movimentações) divergia de stock_quantity. A
+    # diferença de cada material vira um ajuste no início do seu histórico;
+    # quando e em quantas edições ela surgiu não ficou registrado.
+    op.execute(
+        "INSERT INTO stock_movements (material_id, movement_type, quantity, description, reference_type, created_at) "
+        "SELECT id, CASE WHEN difference > 0 THEN 'IN' ELSE 'OUT' END, ABS(difference), "
+        "'Saldo inicial', 'adjustment', opened_at FROM ("
+        "SELECT m.id, m.stock_quantity - COALESCE(SUM(CASE WHEN s.movement_type = 'IN' "
+        "THEN s.quantity ELSE -s.quantity END), 0) AS difference, "
+        "CASE WHEN MIN(s.created_at) < COALESCE(m.created_at, CURRENT_TIMESTAMP) THEN MIN(s.created_at) "
+        "ELSE COALESCE(m.created_at, CURRENT_TIMESTAMP) END AS opened_at "
+        "FROM materials m LEFT JOIN stock_movements s ON s.material_id = m.id "
+        "GROUP BY m.id, m.stock_quantity, m.created_at"
+        ") balances WHERE ABS(difference) >= 0.0005"
+    )
+    # As fotografias foram calculadas sem esses ajustes; o próximo
+    # snapshot-stock refaz o histórico
+    op.execute('DELETE FROM stock_snapshots')
+
+
+def downgrade():
+    # Os ajustes passam a fazer parte do histórico de movimentações
+    pass
@@ -0,0 +1,53 @@
+import base64
+import json
+from datetime import date, datetime
+from sqlalchemy import tuple_
+
+
+def encode_cursor(values):
+    """Cursor opaco com os valores de ordenação da última linha da página"""
+    payload = [value.isoformat() if isinstance(value, (date, datetime)) else value for value in values]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor, columns):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except (ValueError, UnicodeError):
+        raise ValueError('Cursor inválido')
+    if not isinstance(values, list) or len(values) != len(columns):
+        raise ValueError('Cursor inválido')
+
+    decoded = []
+    for column, value in zip(columns, values):
+        python_type = column.type.python_type
+        try:
+            if python_type is datetime:
+                value = datetime.fromisoformat(value)
+            elif python_type is date:
+                value = date.fromisoformat(value)
+            elif python_type is int and (not isinstance(value, int) or isinstance(value, bool)):
+                raise ValueError
+            elif python_type is str and not isinstance(value, str):
+                raise ValueError
+        except (TypeError, ValueError):
+            raise ValueError('Cursor inválido')
+        decoded.append(value)
+    return decoded
+
+
+def keyset_page(query, columns, cursor=None, per_page=20):
+    """Página em ordem decrescente por ``columns`` (ex.: created_at, id)
+
+    Em vez de OFFSET, filtra as linhas depois do cursor, então o custo é o
+    mesmo na primeira página e na milésima. Retorna (itens, próximo cursor).
+    """
+    if cursor:
+        query = query.filter(tuple_(*columns) < tuple_(*decode_cursor(cursor, columns)))
+
+    rows = query.order_by(*[column.desc() for column in columns]).limit(per_page + 1).all()
+    if len(rows) <= per_page:
+        return rows, None
+
+    rows = rows[:per_page]
+    return rows, encode_cursor([getattr(rows[-1], column.key) for column in columns])
@@ -0,0 +1,217 @@
+"""Geração dos relatórios em PDF com ReportLab
+
+Importado apenas pelos processos do pool de relatórios (ver
+``render_pdf_report`` em reports.py), para que os workers web não carreguem
+o ReportLab.
+"""
+from functools import lru_cache
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.units import inch
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+from sqlalchemy import func, select
+from src.models.database import db, Category, Customer, Material, Product, Sale
+from src.routes.reports import EXPORT_BATCH_SIZE, financial_totals
+
+# Altura útil da página: margens padrão do SimpleDocTemplate (1 polegada) e
+# o padding de 6 pt do Frame em cima e embaixo
+PDF_FRAME_HEIGHT = letter[1] - 2 * inch - 12
+
+@lru_cache(maxsize=None)
+def _pdf_styles():
+    """Folha de estilos e estilos das tabelas, criados uma vez por processo"""
+    styles = getSampleStyleSheet()
+    summary_style = TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 14),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black)
+    ])
+    rows_style = TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 8),
+        ('ALIGN', (-1, 0), (-1, -1), 'RIGHT'),
+        ('TOPPADDING', (0, 0), (-1, -1), 2),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 2),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.black)
+    ])
+    return styles, summary_style, rows_style
+
+@lru_cache(maxsize=None)
+def _table_rows_per_page():
+    """Linhas de dados que cabem numa página junto com o cabeçalho"""
+    _, _, rows_style = _pdf_styles()
+    _, header_height = Table([['Cabeçalho']], style=rows_style).wrap(0, 0)
+    _, two_rows_height = Table([['Cabeçalho'], ['Linha']], style=rows_style).wrap(0, 0)
+    return int((PDF_FRAME_HEIGHT - header_height) // (two_rows_height - header_height))
+
+class _StreamingDocTemplate(SimpleDocTemplate):
+    """Documento que puxa os flowables de um gerador conforme monta as páginas
+
+    ``build()`` percorre a lista de flowables chamando ``handle_flowable``
+    para cada um; depois de cada chamada a lista é completada com os próximos
+    itens do gerador (``handle_flowable`` também trata outras listas
+    internas, por isso a lista completada é sempre a do ``build``). Só alguns flowables ficam em memória por vez,
+    independente do tamanho do relatório.
+    """
+
+    def build_streaming(self, flowables, lookahead=4):
+        self._pending = iter(flowables)
+        self._lookahead = lookahead
+        self._story = []
+        self._refill()
+        self.build(self._story)
+
+    def _refill(self):
+        while len(self._story) < self._lookahead:
+            flowable = next(self._pending, None)
+            if flowable is None:
+                break
+            self._story.append(flowable)
+
+    def handle_flowable(self, flowables):
+        super().handle_flowable(flowables)
+        self._refill()
+
+def _stream_rows(statement):
+    """Linhas da consulta em lotes, sem materializar o resultado inteiro"""
+    result = db.session.execute(statement.execution_options(yield_per=EXPORT_BATCH_SIZE))
+    for partition in result.partitions():
+        yield from partition
+
+def _row_tables(header, rows, col_widths):
+    """Divide as linhas em tabelas de no máximo uma página, cada uma com cabeçalho
+
+    Um bloco que começa no meio de uma página é quebrado pelo ReportLab
+    (barato, já que o bloco é pequeno) e a continuação repete o cabeçalho.
+    """
+    _, _, rows_style = _pdf_styles()
+    rows_per_table = _table_rows_per_page()
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == rows_per_table:
+            yield Table([header] + chunk, colWidths=col_widths, style=rows_style, repeatRows=1)
+            chunk = []
+    if chunk:
+        yield Table([header] + chunk, colWidths=col_widths, style=rows_style, repeatRows=1)
+
+def _money(value):
+    return f'R$ {float(value or 0):.2f}'
+
+def _period_paragraph(start_date, end_date):
+    styles, _, _ = _pdf_styles()
+    period_text = f"Período: {start_date.strftime('%d/%m/%Y')} a {end_date.strftime('%d/%m/%Y')}"
+    return Paragraph(period_text, styles['Normal'])
+
+def _financial_story(start_date, end_date):
+    _, summary_style, _ = _pdf_styles()
+    totals = financial_totals(start_date, end_date)
+    
+    yield _period_paragraph(start_date, end_date)
+    yield Spacer(1, 12)
+    
+    # Resumo financeiro
+    summary_data = [
+        ['Receitas', _money(totals['total_revenue'])],
+        ['Despesas', _money(totals['total_expenses'])],
+        ['Lucro Líquido', _money(totals['net_profit'])]
+    ]
+    yield Table(summary_data, style=summary_style)
+
+def _sales_story(start_date, end_date):
+    _, summary_style, _ = _pdf_styles()
+    in_period = (Sale.sale_date >= start_date, Sale.sale_date <= end_date)
+    
+    yield _period_paragraph(start_date, end_date)
+    yield Spacer(1, 12)
+    
+    # Resumo por forma de pagamento, calculado no banco
+    by_method = db.session.execute(
+        select(Sale.payment_method, func.count(Sale.id), func.sum(Sale.total_amount))
+        .where(*in_period)
+        .group_by(Sale.payment_method)
+        .order_by(Sale.payment_method)
+    ).all()
+    summary_data = [['Pagamento', 'Vendas', 'Total']]
+    summary_data += [[method, count, _money(total)] for method, count, total in by_method]
+    summary_data.append([
+        'Total', sum(count for _, count, _ in by_method), _money(sum(float(total) for _, _, total in by_method))
+    ])
+    yield Table(summary_data, style=summary_style)
+    yield Spacer(1, 12)
+    
+    rows = _stream_rows(
+        select(Sale.id, Sale.sale_date, Customer.name, Sale.payment_method, Sale.total_amount)
+        .outerjoin(Customer, Sale.customer_id == Customer.id)
+        .where(*in_period)
+        .order_by(Sale.sale_date, Sale.id)
+    )
+    yield from _row_tables(
+        ['Venda', 'Data', 'Cliente', 'Pagamento', 'Total'],
+        ([sale_id, sale_date.strftime('%d/%m/%Y'), (customer or '-')[:40], method, _money(total)]
+         for sale_id, sale_date, customer, method, total in rows),
+        [50, 70, 210, 90, 80]
+    )
+
+def _inventory_story(start_date, end_date):
+    styles, _, _ = _pdf_styles()
+    
+    yield Paragraph(f"Posição em {end_date.strftime('%d/%m/%Y')}", styles['Normal'])
+    yield Spacer(1, 12)
+    
+    yield Paragraph('Materiais', styles['Heading2'])
+    materials = _stream_rows(
+        select(Material.name, Material.unit, Material.stock_quantity, Material.min_stock_alert, Material.purchase_price)
+        .order_by(Material.name, Material.id)
+    )
+    yield from _row_tables(
+        ['Material', 'Unidade', 'Estoque', 'Mínimo', 'Preço'],
+        ([name[:45], unit, f'{float(stock):.3f}', f'{float(minimum or 0):.3f}', _money(price)]
+         for name, unit, stock, minimum, price in materials),
+        [220, 60, 70, 70, 80]
+    )
+    yield Spacer(1, 12)
+    
+    yield Paragraph('Produtos', styles['Heading2'])
+    products = _stream_rows(
+        select(Product.name, Category.name, Product.stock_quantity, Product.final_price)
+        .outerjoin(Category, Product.category_id == Category.id)
+        .order_by(Product.name, Product.id)
+    )
+    yield from _row_tables(
+        ['Produto', 'Categoria', 'Estoque', 'Preço'],
+        ([name[:45], (category or '-')[:25], stock or 0, _money(price)]
+         for name, category, stock, price in products),
+        [220, 130, 70, 80]
+    )
+
+PDF_STORIES = {
+    'financial': _financial_story,
+    'sales': _sales_story,
+    'inventory': _inventory_story
+}
+
+def render(report_type, start_date, end_date, path):
+    """Gera o PDF do relatório em ``path``
+
+    As linhas vêm do banco em lotes e viram tabelas de uma página conforme o
+    documento é montado, então a memória não cresce com o número de linhas.
+    """
+    styles, _, _ = _pdf_styles()
+    doc = _StreamingDocTemplate(path, pagesize=letter)
+    
+    def story():
+        # Título
+        yield Paragraph(f"Relatório {report_type.title()} - RM Papel", styles['Title'])
+        yield Spacer(1, 12)
+        yield from PDF_STORIES[report_type](start_date, end_date)
+    
+    doc.build_streaming(story())
@@ -1,7 +1,9 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required
 from datetime import datetime
+from decimal import Decimal
 from src.models.database import db, Production, Product, Material, StockMovement
+from src.models.loaders import PRODUCTION_LOAD, PRODUCT_LOAD
 
 productions_bp = Blueprint('productions', __name__)
 
@@ -9,7 +11,7 @@ productions_bp = Blueprint('productions', __name__)
 @jwt_required()
 def get_productions():
     try:
-        productions = Production.query.order_by(Production.created_at.desc()).all()
+        productions = Production.query.options(*PRODUCTION_LOAD).order_by(Production.created_at.desc()).all()
         return jsonify([production.to_dict() for production in productions]), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -18,7 +20,7 @@ def get_productions():
 @jwt_required()
 def get_production(production_id):
     try:
-        production = Production.query.get(production_id)
+        production = Production.query.options(*PRODUCTION_LOAD).filter_by(id=production_id).first()
         if not production:
             return jsonify({'error': 'Produção não encontrada'}), 404
         
@@ -37,7 +39,7 @@ def create_production():
             if not data.get(field):
                 return jsonify({'error': f'{field} é obrigatório'}), 400
         
-        product = Product.query.get(data['product_id'])
+        product = Product.query.options(*PRODUCT_LOAD).filter_by(id=data['product_id']).first()
         if not product:
             return jsonify({'error': 'Produto não encontrado'}), 404
         
@@ -45,7 +47,7 @@ def create_production():
         
         # Verificar se há materiais suficientes
         for product_material in product.product_materials:
-            needed_quantity = float(product_material.quantity_needed) * quantity_produced
+            needed_quantity = product_material.quantity_needed * Decimal(str(quantity_produced))
             if product_material.material.stock_quantity < needed_quantity:
                 return jsonify({
                     'error': f'Estoque insuficiente do material {product_material.material.name}. '
@@ -53,7 +55,7 @@ def create_production():
                 }), 400
         
         # Calcular custo total
-        total_cost = product.calculate_cost() * quantity_produced
+        total_cost = product.current_cost() * quantity_produced
         
         # Criar produção
         production = Production(
@@ -69,7 +71,7 @@ def create_production():
         
         # Deduzir materiais do estoque e registrar movimentações
         for product_material in product.product_materials:
-            needed_quantity = float(product_material.quantity_needed) * quantity_produced
+            needed_quantity = product_material.quantity_needed * Decimal(str(quantity_produced))
             
             # Atualizar estoque do material
             product_material.material.stock_quantity -= needed_quantity
@@ -90,6 +92,8 @@ def create_production():
         
         db.session.commit()
         
+        production = Production.query.options(*PRODUCTION_LOAD).filter_by(id=production.id).first()
+        
         return jsonify({
             'message': 'Produção registrada com sucesso',
             'production': production.to_dict()
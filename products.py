@@ -1,23 +1,41 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required
 from src.models.database import db, Product, ProductMaterial
+from src.models.loaders import PRODUCT_LOAD
+from src.models.costing import product_cost, refresh_product_costs
+from src.models.search import search_products
+from src.cache import etag_from_tables
 
 products_bp = Blueprint('products', __name__)
 
 @products_bp.route('', methods=['GET'])
 @jwt_required()
+@etag_from_tables('products', 'products_stock', 'categories', 'product_materials', 'materials', 'suppliers')
 def get_products():
     try:
-        products = Product.query.all()
+        products = Product.query.options(*PRODUCT_LOAD).all()
         return jsonify([product.to_dict() for product in products]), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@products_bp.route('/search', methods=['GET'])
+@jwt_required()
+@etag_from_tables('products', 'products_stock', 'categories')
+def search_products_route():
+    """Busca do PDV: ?q= em nome, descrição e categoria; resultados compactos"""
+    try:
+        query = request.args.get('q', '')
+        limit = min(request.args.get('limit', 20, type=int), 100)
+        
+        return jsonify({'products': search_products(query, limit)}), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @products_bp.route('/<int:product_id>', methods=['GET'])
 @jwt_required()
 def get_product(product_id):
     try:
-        product = Product.query.get(product_id)
+        product = Product.query.options(*PRODUCT_LOAD).filter_by(id=product_id).first()
         if not product:
             return jsonify({'error': 'Produto não encontrado'}), 404
         
@@ -40,6 +58,7 @@ def create_product():
             category_id=data.get('category_id'),
             profit_margin=data.get('profit_margin', 0),
             final_price=data.get('final_price'),
+            auto_price=not data.get('final_price'),
             image_url=data.get('image_url'),
             stock_quantity=data.get('stock_quantity', 0)
         )
@@ -57,12 +76,13 @@ def create_product():
             )
             db.session.add(product_material)
         
-        # Se não foi definido preço final, calcular automaticamente
-        if not product.final_price:
-            product.final_price = product.calculate_final_price()
+        # Gravar o custo (e o preço final, se não foi definido manualmente)
+        refresh_product_costs([product.id])
         
         db.session.commit()
         
+        product = Product.query.options(*PRODUCT_LOAD).filter_by(id=product.id).first()
+        
         return jsonify({
             'message': 'Produto criado com sucesso',
             'product': product.to_dict()
@@ -86,7 +106,9 @@ def update_product(product_id):
         product.description = data.get('description', product.description)
         product.category_id = data.get('category_id', product.category_id)
         product.profit_margin = data.get('profit_margin', product.profit_margin)
-        product.final_price = data.get('final_price', product.final_price)
+        if 'final_price' in data:
+            product.final_price = data['final_price']
+            product.auto_price = not data['final_price']
         product.image_url = data.get('image_url', product.image_url)
         product.stock_quantity = data.get('stock_quantity', product.stock_quantity)
         
@@ -105,12 +127,13 @@ def update_product(product_id):
                 )
                 db.session.add(product_material)
         
-        # Recalcular preço se necessário
-        if not product.final_price:
-            product.final_price = product.calculate_final_price()
+        # Recalcular custo armazenado e preço automático
+        refresh_product_costs([product.id])
         
         db.session.commit()
         
+        product = Product.query.options(*PRODUCT_LOAD).filter_by(id=product.id).first()
+        
         return jsonify({
             'message': 'Produto atualizado com sucesso',
             'product': product.to_dict()
@@ -145,8 +168,8 @@ def calculate_product_price(product_id):
         if not product:
             return jsonify({'error': 'Produto não encontrado'}), 404
         
-        cost = product.calculate_cost()
-        price = product.calculate_final_price()
+        cost = product_cost(product.id)
+        price = product.calculate_final_price(cost)
         
         return jsonify({
             'cost': cost,
@@ -0,0 +1,250 @@
+"""Verificação de planos de consulta dos endpoints
+
+Popula um banco descartável com um volume grande de dados, chama os
+endpoints de leitura de cada blueprint, captura os SELECTs emitidos e roda
+EXPLAIN em cada um. Falha (código de saída 1) se alguma consulta fizer
+varredura sequencial em uma das tabelas de histórico.
+
+Uso:
+    python -m src.query_plans --rows 20000
+    python -m src.query_plans --database-url postgresql://.../rm_papel_plans
+
+Com PostgreSQL, use um banco vazio só para isso: as tabelas são criadas e
+preenchidas com dados sintéticos.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+from datetime import date, datetime, timedelta
+
+# Tabelas que crescem com o uso; nelas toda leitura precisa passar por índice
+LARGE_TABLES = {'customers', 'sales', 'sale_items', 'stock_movements', 'expenses', 'daily_sales', 'daily_product_sales'}
+
+
+def blueprint_requests(today):
+    """Endpoints de leitura por blueprint, com os parâmetros usados pelo frontend"""
+    month_ago = (today - timedelta(days=30)).isoformat()
+    return {
+        'sales': [
+            '/api/sales?cursor=',
+            '/api/sales?with_total=0',
+            '/api/sales/1',
+        ],
+        'customers': [
+            '/api/customers/search?q=cli',
+            '/api/customers/search?q=cliente%2012',
+            '/api/customers/search?q=cl',
+        ],
+        'products': [
+            '/api/products/search?q=produto',
+            '/api/products/search?q=prod%20categoria',
+        ],
+        'productions': [
+            '/api/productions/1',
+        ],
+        'stock_movements': [
+            '/api/stock-movements?cursor=',
+            '/api/stock-movements?cursor=&material_id=5',
+            f'/api/materials/stock-as-of?date={month_ago}',
+            f'/api/materials/stock-as-of?date={month_ago}&material_id=5',
+        ],
+        'expenses': [
+            '/api/expenses?cursor=',
+            '/api/expenses?cursor=&category=Aluguel',
+        ],
+        'dashboard': [
+            '/api/dashboard/summary',
+            '/api/dashboard/sales-chart',
+            '/api/dashboard/top-products',
+        ],
+        'reports': [
+            f'/api/reports/financial?start_date={month_ago}&end_date={today.isoformat()}',
+            f'/api/reports/sales?start_date={today.isoformat()}&end_date={today.isoformat()}',
+            f'/api/reports/export/sales?start_date={today.isoformat()}&end_date={today.isoformat()}',
+        ],
+    }
+
+
+def seed(db, rows):
+    """Insere dados sintéticos proporcionais a ``rows`` vendas"""
+    from src.models.database import (
+        Category, Customer, Expense, Material, Product, ProductMaterial,
+        Production, Sale, SaleItem, StockMovement, Supplier
+    )
+    from src.models.alerts import sync_stock_alerts
+    from src.models.rollups import rebuild_daily_sales
+
+    random.seed(42)
+    today = date.today()
+    now = datetime.utcnow()
+
+    def bulk(model, values):
+        for start in range(0, len(values), 5000):
+            db.session.execute(db.insert(model), values[start:start + 5000])
+
+    bulk(Supplier, [{'id': i, 'name': f'Fornecedor {i}'} for i in range(1, 21)])
+    bulk(Category, [{'id': i, 'name': f'Categoria {i}'} for i in range(1, 11)])
+    bulk(Customer, [{'id': i, 'name': f'Cliente {i}'} for i in range(1, 1001)])
+    bulk(Material, [{
+        'id': i, 'name': f'Material {i}', 'unit': 'un', 'purchase_price': random.uniform(1, 50),
+        'stock_quantity': random.uniform(0, 500), 'min_stock_alert': 20, 'supplier_id': 1 + i % 20
+    } for i in range(1, 201)])
+    bulk(Product, [{
+        'id': i, 'name': f'Produto {i}', 'category_id': 1 + i % 10, 'profit_margin': 50,
+        'final_price': random.uniform(10, 200), 'stock_quantity': 1000
+    } for i in range(1, 501)])
+    bulk(ProductMaterial, [{
+        'product_id': product_id, 'material_id': 1 + (product_id * 7 + k) % 200, 'quantity_needed': 1
+    } for product_id in range(1, 501) for k in range(3)])
+    bulk(Production, [{
+        'id': i, 'product_id': 1 + i % 500, 'quantity_produced': 10, 'total_cost': 100,
+        'production_date': today - timedelta(days=i % 365)
+    } for i in range(1, 501)])
+
+    bulk(Sale, [{
+        'id': i, 'customer_id': 1 + i % 1000, 'sale_date': today - timedelta(days=(rows - i) * 730 // rows),
+        'payment_method': random.choice(['pix', 'dinheiro', 'cartao']), 'total_amount': 100,
+        'created_at': now - timedelta(minutes=rows - i)
+    } for i in range(1, rows + 1)])
+    bulk(SaleItem, [{
+        'sale_id': sale_id, 'product_id': random.randint(1, 500), 'quantity': 1,
+        'unit_price': 100 / 3, 'total_price': 100 / 3
+    } for sale_id in range(1, rows + 1) for _ in range(3)])
+    bulk(StockMovement, [{
+        'material_id': 1 + i % 200, 'movement_type': 'OUT' if i % 3 else 'IN', 'quantity': 1,
+        'reference_type': 'production', 'reference_id': 1 + i % 500,
+        'created_at': now - timedelta(minutes=2 * rows - i)
+    } for i in range(1, 2 * rows + 1)])
+    bulk(Expense, [{
+        'description': f'Despesa {i}', 'amount': 50, 'category': random.choice(['Aluguel', 'Energia', 'Insumos', None]),
+        'expense_date': today - timedelta(days=i % 730)
+    } for i in range(1, rows // 4 + 1)])
+
+    rebuild_daily_sales()
+    sync_stock_alerts(db.session)
+    db.session.commit()
+    db.session.execute(db.text('ANALYZE'))
+    db.session.commit()
+
+
+def sequential_scans(connection, statement, parameters):
+    """Tabelas de histórico lidas por varredura sequencial no plano da consulta"""
+    dialect = connection.dialect.name
+    if dialect == 'sqlite':
+        plan = [row[-1] for row in connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters)]
+        # Percorrer um índice inteiro só é aceitável quando ele já entrega a
+        # ordem pedida e a consulta tem LIMIT (ex.: primeira página)
+        bounded_index_scan = 'LIMIT' in statement.upper() and not any(
+            detail.startswith('USE TEMP B-TREE FOR') and 'ORDER BY' in detail for detail in plan
+        )
+        scans = []
+        for detail in plan:
+            if not detail.startswith('SCAN '):
+                continue
+            table = detail.split()[1]
+            if table in LARGE_TABLES and (' USING ' not in detail or not bounded_index_scan):
+                scans.append(detail)
+        return scans
+
+    if dialect == 'postgresql':
+        plan = connection.exec_driver_sql('EXPLAIN (FORMAT JSON) ' + statement, parameters).scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        scans = []
+        nodes = [plan[0]['Plan']]
+        while nodes:
+            node = nodes.pop()
+            if node.get('Node Type') == 'Seq Scan' and node.get('Relation Name') in LARGE_TABLES:
+                scans.append(f"Seq Scan on {node['Relation Name']}")
+            nodes.extend(node.get('Plans', []))
+        return scans
+
+    raise RuntimeError(f'Banco não suportado para EXPLAIN: {dialect}')
+
+
+def check(app, db):
+    from flask_jwt_extended import create_access_token
+    from sqlalchemy import event
+
+    captured = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().upper().startswith('SELECT'):
+            captured.append((statement, parameters))
+
+    with app.app_context():
+        token = create_access_token(identity='1')
+        engine = db.engine
+
+    client = app.test_client()
+    headers = {'Authorization': f'Bearer {token}'}
+    failures = 0
+
+    for blueprint, urls in blueprint_requests(date.today()).items():
+        print(f'[{blueprint}]')
+        for url in urls:
+            captured.clear()
+            event.listen(engine, 'before_cursor_execute', capture)
+            try:
+                response = client.get(url, headers=headers)
+                response.get_data()
+            finally:
+                event.remove(engine, 'before_cursor_execute', capture)
+
+            if response.status_code != 200:
+                failures += 1
+                print(f'  FALHA {url}: HTTP {response.status_code}')
+                continue
+
+            problems = []
+            with engine.connect() as connection:
+                statements = {}
+                for statement, parameters in captured:
+                    statements.setdefault(statement, parameters)
+                for statement, parameters in statements.items():
+                    for scan in sequential_scans(connection, statement, parameters):
+                        problems.append((scan, statement))
+
+            if problems:
+                failures += 1
+                print(f'  FALHA {url}')
+                for scan, statement in problems:
+                    print(f'    {scan}: {" ".join(statement.split())[:200]}')
+            else:
+                print(f'  ok    {url} ({len(captured)} consultas)')
+
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=20000, help='quantidade de vendas sintéticas')
+    parser.add_argument('--database-url', help='banco descartável (padrão: SQLite temporário)')
+    args = parser.parse_args(argv)
+
+    workdir = None
+    if args.database_url:
+        os.environ['DATABASE_URL'] = args.database_url
+    else:
+        workdir = tempfile.mkdtemp(prefix='rm-papel-plans-')
+        os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(workdir, 'plans.db')
+
+    from src.main import create_app
+    from src.models.database import db
+
+    app = create_app()
+
+    with app.app_context():
+        db.create_all()
+        seed(db, args.rows)
+
+    failures = check(app, db)
+    print('Todas as consultas usam índices' if not failures else f'{failures} endpoint(s) com problemas')
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,169 @@
+import json
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+
+
+class ReportJobs:
+    """Geração de relatórios em processos separados com cache em disco
+
+    Cada job é identificado por uma chave determinística (tipo, período e
+    uma impressão digital dos dados); o resultado fica em ``<job_id>.pdf``
+    no diretório de cache e pedidos repetidos são atendidos direto do disco.
+
+    O estado dos jobs também fica no disco (``.json`` com os metadados,
+    ``.pending`` enquanto gera, ``.error`` se falhar), de modo que qualquer
+    worker do gunicorn responde status e download, não só o que recebeu o
+    pedido. O pool de processos é criado sob demanda com o contexto
+    ``spawn``: os processos filhos não herdam conexões nem threads do worker.
+    """
+
+    def __init__(self, directory, max_workers=1, timeout=300, max_age=30 * 86400):
+        self.directory = directory
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.max_age = max_age
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _path(self, job_id, suffix):
+        return os.path.join(self.directory, job_id + suffix)
+
+    def path(self, job_id):
+        return self._path(job_id, '.pdf')
+
+    def _pool(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_init_worker
+                )
+            return self._executor
+
+    def status(self, job_id):
+        """Estado do job (pending, done ou failed), ou None se não existe"""
+        try:
+            with open(self._path(job_id, '.json')) as meta_file:
+                job = json.load(meta_file)
+        except (FileNotFoundError, ValueError):
+            return None
+
+        job['job_id'] = job_id
+        if os.path.exists(self.path(job_id)):
+            job['status'] = 'done'
+        elif os.path.exists(self._path(job_id, '.error')):
+            job['status'] = 'failed'
+            with open(self._path(job_id, '.error')) as error_file:
+                lines = error_file.read().strip().splitlines()
+            job['error'] = lines[-1] if lines else 'Erro desconhecido'
+        elif self._pending(job_id):
+            job['status'] = 'pending'
+        else:
+            # O processo que gerava morreu ou passou do tempo limite
+            job['status'] = 'failed'
+            job['error'] = 'Tempo limite excedido na geração do relatório'
+        return job
+
+    def _pending(self, job_id):
+        try:
+            started = os.path.getmtime(self._path(job_id, '.pending'))
+        except FileNotFoundError:
+            return False
+        return time.time() - started < self.timeout
+
+    def submit(self, job_id, meta, func, *args, refresh=False):
+        """Enfileira ``func(*args, caminho_do_pdf)`` se o resultado ainda não existe"""
+        os.makedirs(self.directory, exist_ok=True)
+        job = self.status(job_id)
+        if job and not refresh and job['status'] in ('done', 'pending'):
+            return job
+
+        self._prune()
+        for suffix in ('.pdf', '.error'):
+            try:
+                os.remove(self._path(job_id, suffix))
+            except FileNotFoundError:
+                pass
+
+        _write_atomic(self._path(job_id, '.json'), json.dumps(dict(meta, created_at=time.time())))
+        _write_atomic(self._path(job_id, '.pending'), '')
+
+        try:
+            future = self._pool().submit(_run, func, args, self.path(job_id), self._path(job_id, '.error'))
+        except Exception:
+            self._fail(job_id, traceback.format_exc())
+            raise
+        future.add_done_callback(lambda done: self._finished(job_id, done))
+        return self.status(job_id)
+
+    def _finished(self, job_id, future):
+        error = future.exception()
+        if error is None:
+            return
+        # O processo filho morreu (ex.: falta de memória); recria o pool
+        self._fail(job_id, f'{type(error).__name__}: {error}')
+        with self._lock:
+            if self._executor is not None and getattr(self._executor, '_broken', False):
+                self._executor.shutdown(wait=False)
+                self._executor = None
+
+    def _fail(self, job_id, message):
+        _write_atomic(self._path(job_id, '.error'), message)
+        try:
+            os.remove(self._path(job_id, '.pending'))
+        except FileNotFoundError:
+            pass
+
+    def _prune(self):
+        """Remove artefatos mais velhos que ``max_age``"""
+        limit = time.time() - self.max_age
+        for entry in os.scandir(self.directory):
+            try:
+                if entry.is_file() and entry.stat().st_mtime < limit:
+                    os.remove(entry.path)
+            except FileNotFoundError:
+                pass
+
+
+def _write_atomic(path, content):
+    directory = os.path.dirname(path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    with os.fdopen(fd, 'w') as tmp_file:
+        tmp_file.write(content)
+    os.replace(tmp_path, path)
+
+
+def _init_worker():
+    """Cada processo do pool mantém um contexto de aplicação aberto"""
+    from src.main import create_app
+    create_app().app_context().push()
+
+
+def _run(func, args, path, error_path):
+    """Executa no processo filho: gera em arquivo temporário e publica com rename"""
+    from src.models.database import db
+
+    pending_path = path[:-len('.pdf')] + '.pending'
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    os.close(fd)
+    try:
+        func(*args, tmp_path)
+        os.replace(tmp_path, path)
+    except Exception:
+        _write_atomic(error_path, traceback.format_exc())
+        try:
+            os.remove(tmp_path)
+        except FileNotFoundError:
+            pass
+    finally:
+        db.session.remove()
+        try:
+            os.remove(pending_path)
+        except FileNotFoundError:
+            pass
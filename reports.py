@@ -1,22 +1,66 @@
-from flask import Blueprint, request, jsonify, send_file
+from flask import Blueprint, request, jsonify, send_file, Response, stream_with_context
 from flask_jwt_extended import jwt_required
 from datetime import datetime, timedelta
-from sqlalchemy import func
+from decimal import Decimal
+from sqlalchemy import func, select
+import csv
+import hashlib
 import io
-from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.lib import colors
-from src.models.database import db, Sale, Expense, Material, Product, SaleItem
+import json
+import os
+import tempfile
+from src.models.database import db, Sale, Expense, Material, Product, SaleItem, Customer, StockAlert
+from src.models.loaders import SALE_LOAD, MATERIAL_LOAD, PRODUCT_LOAD
+from src.report_jobs import ReportJobs
 
 reports_bp = Blueprint('reports', __name__)
 
+def financial_totals(start_date, end_date):
+    """Totais, contagens e despesas por categoria calculados no banco"""
+    total_revenue, sales_count = db.session.query(
+        func.coalesce(func.sum(Sale.total_amount), 0),
+        func.count(Sale.id)
+    ).filter(
+        Sale.sale_date >= start_date,
+        Sale.sale_date <= end_date
+    ).one()
+    
+    total_expenses, expenses_count = db.session.query(
+        func.coalesce(func.sum(Expense.amount), 0),
+        func.count(Expense.id)
+    ).filter(
+        Expense.expense_date >= start_date,
+        Expense.expense_date <= end_date
+    ).one()
+    
+    category = func.coalesce(func.nullif(Expense.category, ''), 'Sem categoria')
+    expenses_by_category = db.session.query(
+        category,
+        func.sum(Expense.amount)
+    ).filter(
+        Expense.expense_date >= start_date,
+        Expense.expense_date <= end_date
+    ).group_by(category).all()
+    
+    return {
+        'total_revenue': float(total_revenue),
+        'total_expenses': float(total_expenses),
+        'net_profit': float(total_revenue) - float(total_expenses),
+        'sales_count': sales_count,
+        'expenses_count': expenses_count,
+        'expenses_by_category': {name: float(amount) for name, amount in expenses_by_category}
+    }
+
 @reports_bp.route('/financial', methods=['GET'])
 @jwt_required()
 def get_financial_report():
     try:
         start_date = request.args.get('start_date')
         end_date = request.args.get('end_date')
+        # Listas detalhadas são opcionais: ?include=sales,expenses&page=1&per_page=50
+        include = set(filter(None, request.args.get('include', '').split(',')))
+        page = max(request.args.get('page', 1, type=int), 1)
+        per_page = min(max(request.args.get('per_page', 50, type=int), 1), 500)
         
         if not start_date or not end_date:
             # Padrão: último mês
@@ -27,47 +71,34 @@ def get_financial_report():
             start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
             end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
         
-        # Vendas no período
-        sales = Sale.query.filter(
-            Sale.sale_date >= start_date,
-            Sale.sale_date <= end_date
-        ).all()
-        
-        total_revenue = sum(float(sale.total_amount) for sale in sales)
+        report = financial_totals(start_date, end_date)
+        report['period'] = {
+            'start_date': start_date.isoformat(),
+            'end_date': end_date.isoformat()
+        }
         
-        # Despesas no período
-        expenses = Expense.query.filter(
-            Expense.expense_date >= start_date,
-            Expense.expense_date <= end_date
-        ).all()
+        if 'sales' in include:
+            sales = Sale.query.options(*SALE_LOAD).filter(
+                Sale.sale_date >= start_date,
+                Sale.sale_date <= end_date
+            ).order_by(Sale.sale_date.desc(), Sale.id.desc()).limit(per_page).offset((page - 1) * per_page).all()
+            report['sales'] = [sale.to_dict() for sale in sales]
         
-        total_expenses = sum(float(expense.amount) for expense in expenses)
+        if 'expenses' in include:
+            expenses = Expense.query.filter(
+                Expense.expense_date >= start_date,
+                Expense.expense_date <= end_date
+            ).order_by(Expense.expense_date.desc(), Expense.id.desc()).limit(per_page).offset((page - 1) * per_page).all()
+            report['expenses'] = [expense.to_dict() for expense in expenses]
         
-        # Lucro líquido
-        net_profit = total_revenue - total_expenses
+        if include:
+            report['pagination'] = {
+                'page': page,
+                'per_page': per_page,
+                'pages': -(-max(report['sales_count'], report['expenses_count']) // per_page)
+            }
         
-        # Despesas por categoria
-        expenses_by_category = {}
-        for expense in expenses:
-            category = expense.category or 'Sem categoria'
-            if category not in expenses_by_category:
-                expenses_by_category[category] = 0
-            expenses_by_category[category] += float(expense.amount)
-        
-        return jsonify({
-            'period': {
-                'start_date': start_date.isoformat(),
-                'end_date': end_date.isoformat()
-            },
-            'total_revenue': total_revenue,
-            'total_expenses': total_expenses,
-            'net_profit': net_profit,
-            'sales_count': len(sales),
-            'expenses_count': len(expenses),
-            'expenses_by_category': expenses_by_category,
-            'sales': [sale.to_dict() for sale in sales],
-            'expenses': [expense.to_dict() for expense in expenses]
-        }), 200
+        return jsonify(report), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -77,13 +108,16 @@ def get_financial_report():
 def get_inventory_report():
     try:
         # Todos os materiais
-        materials = Material.query.all()
+        materials = Material.query.options(*MATERIAL_LOAD).all()
         
         # Todos os produtos
-        products = Product.query.all()
+        products = Product.query.options(*PRODUCT_LOAD).all()
         
-        # Materiais com estoque baixo
-        low_stock_materials = [m for m in materials if m.stock_quantity <= m.min_stock_alert]
+        # Materiais com estoque baixo (alertas abertos)
+        low_stock_ids = set(db.session.scalars(
+            select(StockAlert.material_id).where(StockAlert.resolved_at.is_(None))
+        ))
+        low_stock_materials = [m for m in materials if m.id in low_stock_ids]
         
         # Valor total do estoque de materiais
         materials_value = sum(float(m.stock_quantity) * float(m.purchase_price) for m in materials)
@@ -115,7 +149,7 @@ def get_sales_report():
         start_date = request.args.get('start_date')
         end_date = request.args.get('end_date')
         
-        query = Sale.query
+        query = Sale.query.options(*SALE_LOAD)
         
         if start_date:
             query = query.filter(Sale.sale_date >= datetime.strptime(start_date, '%Y-%m-%d').date())
@@ -168,86 +202,257 @@ def get_sales_report():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+EXPORT_BATCH_SIZE = 1000
+
+def _export_query(kind, start_date, end_date):
+    """Consulta apenas com colunas (sem objetos ORM) para exportação em fluxo"""
+    if kind == 'items':
+        query = select(
+            Sale.id.label('sale_id'),
+            Sale.sale_date,
+            Sale.payment_method,
+            SaleItem.id.label('item_id'),
+            SaleItem.product_id,
+            Product.name.label('product_name'),
+            SaleItem.quantity,
+            SaleItem.unit_price,
+            SaleItem.total_price
+        ).join(SaleItem, SaleItem.sale_id == Sale.id).join(
+            Product, Product.id == SaleItem.product_id
+        ).order_by(Sale.sale_date, Sale.id, SaleItem.id)
+    else:
+        query = select(
+            Sale.id,
+            Sale.sale_date,
+            Sale.customer_id,
+            Customer.name.label('customer_name'),
+            Sale.payment_method,
+            Sale.total_amount,
+            Sale.notes,
+            Sale.created_at
+        ).outerjoin(Customer, Customer.id == Sale.customer_id).order_by(Sale.sale_date, Sale.id)
+    
+    if start_date:
+        query = query.where(Sale.sale_date >= start_date)
+    if end_date:
+        query = query.where(Sale.sale_date <= end_date)
+    
+    return query.execution_options(yield_per=EXPORT_BATCH_SIZE)
+
+def _export_value(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+def _export_rows(query, export_format):
+    result = db.session.execute(query)
+    columns = list(result.keys())
+    
+    if export_format == 'csv':
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+        yield buffer.getvalue()
+        for batch in result.partitions():
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerows([[_export_value(value) for value in row] for row in batch])
+            yield buffer.getvalue()
+    else:
+        for batch in result.partitions():
+            yield ''.join(
+                json.dumps({column: _export_value(value) for column, value in zip(columns, row)}, ensure_ascii=False) + '\n'
+                for row in batch
+            )
+
+@reports_bp.route('/export/sales', methods=['GET'])
+@jwt_required()
+def export_sales():
+    """Exporta vendas (kind=sales) ou itens de venda (kind=items) em CSV ou NDJSON
+
+    As linhas são lidas do banco em lotes com cursor no servidor e enviadas
+    conforme são geradas, sem montar o resultado inteiro em memória.
+    """
+    try:
+        export_format = request.args.get('format', 'csv')
+        kind = request.args.get('kind', 'sales')
+        start_date = request.args.get('start_date')
+        end_date = request.args.get('end_date')
+        
+        if export_format not in ('csv', 'ndjson'):
+            return jsonify({'error': 'Formato deve ser csv ou ndjson'}), 400
+        if kind not in ('sales', 'items'):
+            return jsonify({'error': 'Tipo deve ser sales ou items'}), 400
+        
+        if start_date:
+            start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
+        if end_date:
+            end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
+        
+        query = _export_query(kind, start_date, end_date)
+        mimetype = 'text/csv' if export_format == 'csv' else 'application/x-ndjson'
+        filename = f'vendas_{kind}_{datetime.now().strftime("%Y%m%d")}.{export_format}'
+        
+        return Response(
+            stream_with_context(_export_rows(query, export_format)),
+            mimetype=mimetype,
+            headers={'Content-Disposition': f'attachment; filename={filename}'}
+        )
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+PDF_REPORT_TYPES = {'financial', 'sales', 'inventory'}
+
+report_jobs = ReportJobs(
+    os.getenv('REPORT_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'rm-papel-reports')),
+    max_workers=int(os.getenv('REPORT_WORKERS', 1)),
+    timeout=int(os.getenv('REPORT_JOB_TIMEOUT', 300))
+)
+
+def _report_period(report_type, start_date, end_date):
+    """Período do relatório; padrão é o mês corrente (estoque é sempre a posição de hoje)"""
+    today = datetime.now().date()
+    if report_type == 'inventory':
+        return today, today
+    if start_date and end_date:
+        return (
+            datetime.strptime(start_date, '%Y-%m-%d').date(),
+            datetime.strptime(end_date, '%Y-%m-%d').date()
+        )
+    return today.replace(day=1), today
+
+def _report_fingerprint(report_type, start_date, end_date):
+    """Resumo barato dos dados do relatório: muda quando o conteúdo muda"""
+    if report_type == 'inventory':
+        materials = db.session.query(
+            func.count(Material.id), func.max(Material.updated_at), func.sum(Material.stock_quantity)
+        ).one()
+        products = db.session.query(
+            func.count(Product.id), func.max(Product.updated_at), func.sum(Product.stock_quantity)
+        ).one()
+        return [str(value) for value in (*materials, *products)]
+    
+    sales = db.session.query(
+        func.count(Sale.id), func.max(Sale.id), func.sum(Sale.total_amount)
+    ).filter(Sale.sale_date >= start_date, Sale.sale_date <= end_date).one()
+    if report_type == 'sales':
+        return [str(value) for value in sales]
+    expenses = db.session.query(
+        func.count(Expense.id), func.max(Expense.id), func.sum(Expense.amount)
+    ).filter(Expense.expense_date >= start_date, Expense.expense_date <= end_date).one()
+    return [str(value) for value in (*sales, *expenses)]
+
+def render_pdf_report(report_type, start_date, end_date, path):
+    """Gera o PDF do relatório em ``path`` (roda nos processos do pool)
+
+    O ReportLab só é importado aqui, nos processos que geram PDFs.
+    """
+    from src.pdf_reports import render
+    render(report_type, start_date, end_date, path)
+
+def _job_response(job, status_code=None):
+    job = dict(job)
+    job['status_url'] = f"/api/reports/jobs/{job['job_id']}"
+    if job['status'] == 'done':
+        job['download_url'] = f"/api/reports/jobs/{job['job_id']}/download"
+    if status_code is None:
+        status_code = 202 if job['status'] == 'pending' else 200
+    return jsonify(job), status_code
+
+def _submit_pdf_job(report_type, start_date, end_date, refresh=False):
+    start_date, end_date = _report_period(report_type, start_date, end_date)
+    if end_date < start_date:
+        raise ValueError('end_date deve ser posterior a start_date')
+    
+    key = json.dumps([report_type, start_date.isoformat(), end_date.isoformat(),
+                      _report_fingerprint(report_type, start_date, end_date)])
+    job_id = hashlib.sha256(key.encode()).hexdigest()[:32]
+    meta = {
+        'type': report_type,
+        'start_date': start_date.isoformat(),
+        'end_date': end_date.isoformat(),
+        'filename': f'relatorio_{report_type}_{start_date.strftime("%Y%m%d")}_{end_date.strftime("%Y%m%d")}.pdf'
+    }
+    return report_jobs.submit(job_id, meta, render_pdf_report, report_type, start_date, end_date, refresh=refresh)
+
+@reports_bp.route('/jobs', methods=['POST'])
+@jwt_required()
+def create_report_job():
+    """Enfileira a geração de um relatório em PDF
+
+    Corpo: {"type": "financial" | "sales" | "inventory", "start_date"?,
+    "end_date"?, "refresh"?}.
+    Se o mesmo relatório (mesmo período e mesmos dados) já foi gerado, o job
+    volta pronto na hora.
+    """
+    try:
+        data = request.get_json() or {}
+        report_type = data.get('type', 'financial')
+        if report_type not in PDF_REPORT_TYPES:
+            return jsonify({'error': f'Tipo de relatório inválido: {report_type}'}), 400
+        
+        job = _submit_pdf_job(report_type, data.get('start_date'), data.get('end_date'), bool(data.get('refresh')))
+        return _job_response(job)
+        
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@reports_bp.route('/jobs/<job_id>', methods=['GET'])
+@jwt_required()
+def get_report_job(job_id):
+    try:
+        job = report_jobs.status(job_id) if job_id.isalnum() else None
+        if not job:
+            return jsonify({'error': 'Job não encontrado'}), 404
+        return _job_response(job, 200)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@reports_bp.route('/jobs/<job_id>/download', methods=['GET'])
+@jwt_required()
+def download_report_job(job_id):
+    try:
+        job = report_jobs.status(job_id) if job_id.isalnum() else None
+        if not job:
+            return jsonify({'error': 'Job não encontrado'}), 404
+        if job['status'] != 'done':
+            return _job_response(job, 409 if job['status'] == 'failed' else 202)
+        
+        return send_file(
+            report_jobs.path(job_id),
+            as_attachment=True,
+            download_name=job['filename'],
+            mimetype='application/pdf'
+        )
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @reports_bp.route('/export/pdf', methods=['GET'])
 @jwt_required()
 def export_pdf_report():
+    """Baixa o PDF se já estiver em cache; senão enfileira e responde 202 com o job"""
     try:
         report_type = request.args.get('type', 'financial')
-        start_date = request.args.get('start_date')
-        end_date = request.args.get('end_date')
+        if report_type not in PDF_REPORT_TYPES:
+            return jsonify({'error': f'Tipo de relatório inválido: {report_type}'}), 400
         
-        # Criar PDF em memória
-        buffer = io.BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=letter)
-        styles = getSampleStyleSheet()
-        story = []
-        
-        # Título
-        title = Paragraph(f"Relatório {report_type.title()} - RM Papel", styles['Title'])
-        story.append(title)
-        story.append(Spacer(1, 12))
-        
-        if report_type == 'financial':
-            # Dados financeiros
-            if start_date and end_date:
-                start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
-                end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
-            else:
-                today = datetime.now().date()
-                end_date = today
-                start_date = today.replace(day=1)
-            
-            sales = Sale.query.filter(
-                Sale.sale_date >= start_date,
-                Sale.sale_date <= end_date
-            ).all()
-            
-            expenses = Expense.query.filter(
-                Expense.expense_date >= start_date,
-                Expense.expense_date <= end_date
-            ).all()
-            
-            total_revenue = sum(float(sale.total_amount) for sale in sales)
-            total_expenses = sum(float(expense.amount) for expense in expenses)
-            net_profit = total_revenue - total_expenses
-            
-            # Período
-            period_text = f"Período: {start_date.strftime('%d/%m/%Y')} a {end_date.strftime('%d/%m/%Y')}"
-            story.append(Paragraph(period_text, styles['Normal']))
-            story.append(Spacer(1, 12))
-            
-            # Resumo financeiro
-            summary_data = [
-                ['Receitas', f'R$ {total_revenue:.2f}'],
-                ['Despesas', f'R$ {total_expenses:.2f}'],
-                ['Lucro Líquido', f'R$ {net_profit:.2f}']
-            ]
-            
-            summary_table = Table(summary_data)
-            summary_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, 0), 14),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black)
-            ]))
-            
-            story.append(summary_table)
-        
-        # Construir PDF
-        doc.build(story)
-        buffer.seek(0)
+        job = _submit_pdf_job(report_type, request.args.get('start_date'), request.args.get('end_date'))
+        if job['status'] != 'done':
+            return _job_response(job)
         
         return send_file(
-            buffer,
+            report_jobs.path(job['job_id']),
             as_attachment=True,
-            download_name=f'relatorio_{report_type}_{datetime.now().strftime("%Y%m%d")}.pdf',
+            download_name=job['filename'],
             mimetype='application/pdf'
         )
         
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
-
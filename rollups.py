@@ -0,0 +1,128 @@
+from sqlalchemy import func, insert, select
+from src.models.database import db, DailySales, DailyProductSales, Sale, SaleItem
+
+
+def _upsert_increment(model, keys, rows, columns):
+    """INSERT ... ON CONFLICT DO UPDATE somando os valores às linhas existentes"""
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        dialect_insert = None
+
+    if dialect_insert is not None:
+        stmt = dialect_insert(model).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=keys,
+            set_={column: getattr(model, column) + getattr(stmt.excluded, column) for column in columns}
+        )
+        db.session.execute(stmt)
+        return
+
+    # Demais bancos: atualiza e insere o que não existia
+    for row in rows:
+        updated = db.session.query(model).filter_by(**{key: row[key] for key in keys}).update(
+            {column: getattr(model, column) + row[column] for column in columns},
+            synchronize_session=False
+        )
+        if not updated:
+            db.session.execute(insert(model).values(**row))
+
+
+def record_sale(sale, items, sign=1):
+    """Soma (ou subtrai, com sign=-1) uma venda nos totais diários
+
+    Deve ser chamada na mesma transação que cria ou remove a venda.
+    ``items`` é uma sequência de (product_id, quantity, total_price).
+    """
+    record_sales([(sale.sale_date, sale.payment_method, sale.total_amount, items)], sign)
+
+
+def record_sales(sales, sign=1):
+    """Versão em lote de record_sale: um upsert por tabela para várias vendas
+
+    ``sales`` é uma sequência de (sale_date, payment_method, total_amount, items).
+    """
+    by_day = {}
+    by_product = {}
+    for sale_date, payment_method, total_amount, items in sales:
+        revenue, count, items_sold = by_day.get((sale_date, payment_method), (0, 0, 0))
+        items = list(items)
+        by_day[(sale_date, payment_method)] = (
+            revenue + float(total_amount),
+            count + 1,
+            items_sold + sum(quantity for _, quantity, _ in items)
+        )
+        for product_id, quantity, total_price in items:
+            quantity_total, revenue_total = by_product.get((sale_date, product_id), (0, 0))
+            by_product[(sale_date, product_id)] = (quantity_total + quantity, revenue_total + float(total_price))
+
+    if by_day:
+        _upsert_increment(DailySales, ['sale_date', 'payment_method'], [{
+            'sale_date': sale_date,
+            'payment_method': payment_method,
+            'revenue': sign * revenue,
+            'sales_count': sign * count,
+            'items_sold': sign * items_sold
+        } for (sale_date, payment_method), (revenue, count, items_sold) in by_day.items()],
+            ['revenue', 'sales_count', 'items_sold'])
+
+    if by_product:
+        _upsert_increment(DailyProductSales, ['sale_date', 'product_id'], [{
+            'sale_date': sale_date,
+            'product_id': product_id,
+            'quantity': sign * quantity,
+            'revenue': sign * revenue
+        } for (sale_date, product_id), (quantity, revenue) in by_product.items()], ['quantity', 'revenue'])
+
+    if sign < 0:
+        # Linhas que voltaram a zero (todas as vendas removidas) saem da
+        # tabela; a de produtos tem FK para products e impediria a exclusão
+        dates = list({sale_date for sale_date, _ in by_day})
+        db.session.query(DailyProductSales).filter(
+            DailyProductSales.sale_date.in_(dates),
+            DailyProductSales.product_id.in_(list({product_id for _, product_id in by_product})),
+            DailyProductSales.quantity == 0
+        ).delete(synchronize_session=False)
+        db.session.query(DailySales).filter(
+            DailySales.sale_date.in_(dates),
+            DailySales.sales_count == 0
+        ).delete(synchronize_session=False)
+
+
+def rebuild_daily_sales():
+    """Recria os totais diários a partir das tabelas de vendas (backfill)"""
+    db.session.query(DailyProductSales).delete(synchronize_session=False)
+    db.session.query(DailySales).delete(synchronize_session=False)
+
+    items_per_sale = select(
+        SaleItem.sale_id,
+        func.sum(SaleItem.quantity).label('quantity')
+    ).group_by(SaleItem.sale_id).subquery()
+
+    db.session.execute(insert(DailySales).from_select(
+        ['sale_date', 'payment_method', 'revenue', 'sales_count', 'items_sold'],
+        select(
+            Sale.sale_date,
+            Sale.payment_method,
+            func.sum(Sale.total_amount),
+            func.count(Sale.id),
+            func.coalesce(func.sum(items_per_sale.c.quantity), 0)
+        ).outerjoin(items_per_sale, items_per_sale.c.sale_id == Sale.id).group_by(
+            Sale.sale_date, Sale.payment_method
+        )
+    ))
+
+    db.session.execute(insert(DailyProductSales).from_select(
+        ['sale_date', 'product_id', 'quantity', 'revenue'],
+        select(
+            Sale.sale_date,
+            SaleItem.product_id,
+            func.sum(SaleItem.quantity),
+            func.sum(SaleItem.total_price)
+        ).join(Sale, Sale.id == SaleItem.sale_id).group_by(
+            Sale.sale_date, SaleItem.product_id
+        )
+    ))
@@ -1,7 +1,15 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required
 from datetime import datetime
-from src.models.database import db, Sale, SaleItem, Product
+from sqlalchemy import insert
+from src.models.database import db, Customer, Sale, SaleItem
+from src.models.loaders import SALE_LOAD
+from src.models.rollups import record_sale, record_sales
+from src.models.pagination import keyset_page
+from src.models.checkout import (
+    StockError, requested_quantities, load_products, check_stock, price_items,
+    insert_sale_items, reserve_stock, release_stock
+)
 
 sales_bp = Blueprint('sales', __name__)
 
@@ -11,18 +19,35 @@ def get_sales():
     try:
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 20, type=int)
+        # ?cursor= (vazio na primeira página) ativa a paginação por cursor
+        cursor = request.args.get('cursor')
+        with_total = request.args.get('with_total', 'false' if cursor is not None else 'true').lower() in ('1', 'true')
         
-        sales = Sale.query.order_by(Sale.created_at.desc()).paginate(
-            page=page, per_page=per_page, error_out=False
+        query = Sale.query.options(*SALE_LOAD)
+        
+        if cursor is not None:
+            sales, next_cursor = keyset_page(query, (Sale.created_at, Sale.id), cursor, per_page)
+            result = {
+                'sales': [sale.to_dict() for sale in sales],
+                'next_cursor': next_cursor
+            }
+            if with_total:
+                result['total'] = Sale.query.count()
+            return jsonify(result), 200
+        
+        sales = query.order_by(Sale.created_at.desc()).paginate(
+            page=page, per_page=per_page, error_out=False, count=with_total
         )
         
         return jsonify({
             'sales': [sale.to_dict() for sale in sales.items],
             'total': sales.total,
-            'pages': sales.pages,
+            'pages': sales.pages if with_total else None,
             'current_page': page
         }), 200
         
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -30,7 +55,7 @@ def get_sales():
 @jwt_required()
 def get_sale(sale_id):
     try:
-        sale = Sale.query.get(sale_id)
+        sale = Sale.query.options(*SALE_LOAD).filter_by(id=sale_id).first()
         if not sale:
             return jsonify({'error': 'Venda não encontrada'}), 404
         
@@ -52,27 +77,14 @@ def create_sale():
         if not data['items']:
             return jsonify({'error': 'Venda deve ter pelo menos um item'}), 400
         
-        # Verificar estoque dos produtos
-        for item_data in data['items']:
-            product = Product.query.get(item_data['product_id'])
-            if not product:
-                return jsonify({'error': f'Produto {item_data["product_id"]} não encontrado'}), 404
-            
-            if product.stock_quantity < item_data['quantity']:
-                return jsonify({
-                    'error': f'Estoque insuficiente do produto {product.name}. '
-                            f'Disponível: {product.stock_quantity}, Solicitado: {item_data["quantity"]}'
-                }), 400
-        
-        # Calcular total da venda
-        total_amount = 0
-        for item_data in data['items']:
-            unit_price = item_data.get('unit_price')
-            if not unit_price:
-                product = Product.query.get(item_data['product_id'])
-                unit_price = float(product.final_price) if product.final_price else product.calculate_final_price()
-            
-            total_amount += unit_price * item_data['quantity']
+        # Carregar todos os produtos de uma vez e verificar estoque
+        quantities = requested_quantities(data['items'])
+        products = load_products(quantities)
+        check_stock(quantities, products)
+        
+        # Calcular preços e total da venda
+        items = price_items(data['items'], products)
+        total_amount = sum(item['total_price'] for item in items)
         
         # Criar venda
         sale = Sale(
@@ -86,33 +98,196 @@ def create_sale():
         db.session.add(sale)
         db.session.flush()  # Para obter o ID da venda
         
-        # Criar itens da venda e atualizar estoque
-        for item_data in data['items']:
-            product = Product.query.get(item_data['product_id'])
-            unit_price = item_data.get('unit_price')
-            if not unit_price:
-                unit_price = float(product.final_price) if product.final_price else product.calculate_final_price()
-            
-            sale_item = SaleItem(
-                sale_id=sale.id,
-                product_id=item_data['product_id'],
-                quantity=item_data['quantity'],
-                unit_price=unit_price,
-                total_price=unit_price * item_data['quantity']
-            )
-            
-            # Atualizar estoque do produto
-            product.stock_quantity -= item_data['quantity']
-            
-            db.session.add(sale_item)
+        # Criar itens da venda e baixar estoque de forma atômica
+        insert_sale_items(sale.id, items)
+        reserve_stock(quantities)
+        
+        # Atualizar totais diários na mesma transação
+        record_sale(sale, [(item['product_id'], item['quantity'], item['total_price']) for item in items])
         
         db.session.commit()
         
+        sale = Sale.query.options(*SALE_LOAD).filter_by(id=sale.id).first()
+        
         return jsonify({
             'message': 'Venda registrada com sucesso',
             'sale': sale.to_dict()
         }), 201
         
+    except StockError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), e.status_code
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+BULK_MAX_SALES = 10000
+BULK_CHUNK_SIZE = 500
+
+def _is_id(value):
+    """Inteiro positivo que cabe numa coluna INTEGER (bool não conta)"""
+    return isinstance(value, int) and not isinstance(value, bool) and 0 < value <= 2 ** 31 - 1
+
+def _validate_bulk_sale(data, customers):
+    """Confere os tipos da linha antes que ela chegue a um bloco de inserts
+
+    Um valor inválido que só falhasse no banco derrubaria o bloco inteiro;
+    aqui ele vira o erro só desta linha.
+    """
+    for field in ['sale_date', 'payment_method', 'items']:
+        if not data.get(field):
+            raise StockError(f'{field} é obrigatório')
+    
+    if not isinstance(data['sale_date'], str):
+        raise StockError('sale_date deve estar no formato AAAA-MM-DD')
+    if not isinstance(data['payment_method'], str) or len(data['payment_method']) > 50:
+        raise StockError('payment_method deve ser um texto de até 50 caracteres')
+    if data.get('notes') is not None and not isinstance(data['notes'], str):
+        raise StockError('notes deve ser um texto')
+    
+    customer_id = data.get('customer_id')
+    if customer_id is not None:
+        if not _is_id(customer_id):
+            raise StockError('customer_id inválido')
+        if customer_id not in customers:
+            raise StockError(f'Cliente {customer_id} não encontrado', 404)
+    
+    if not isinstance(data['items'], list):
+        raise StockError('items deve ser uma lista')
+    for item in data['items']:
+        if not isinstance(item, dict) or not _is_id(item.get('product_id')):
+            raise StockError('Item com product_id inválido')
+        unit_price = item.get('unit_price')
+        if unit_price is not None and (
+            not isinstance(unit_price, (int, float)) or isinstance(unit_price, bool) or unit_price < 0
+        ):
+            raise StockError(f'Preço unitário inválido para o produto {item["product_id"]}')
+
+def _prepare_bulk_sale(index, data, products, customers, remaining):
+    """Valida uma venda do lote e reserva o estoque na contagem do lote"""
+    _validate_bulk_sale(data, customers)
+    
+    sale_date = datetime.strptime(data['sale_date'], '%Y-%m-%d').date()
+    quantities = requested_quantities(data['items'])
+    
+    for product_id, quantity in quantities.items():
+        product = products.get(product_id)
+        if not product:
+            raise StockError(f'Produto {product_id} não encontrado', 404)
+        if remaining[product_id] < quantity:
+            raise StockError(
+                f'Estoque insuficiente do produto {product.name}. '
+                f'Disponível: {remaining[product_id]}, Solicitado: {quantity}'
+            )
+    
+    for product_id, quantity in quantities.items():
+        remaining[product_id] -= quantity
+    
+    items = price_items(data['items'], products)
+    return {
+        'index': index,
+        'ref': data.get('ref'),
+        'quantities': quantities,
+        'items': items,
+        'sale': {
+            'customer_id': data.get('customer_id'),
+            'sale_date': sale_date,
+            'payment_method': data['payment_method'],
+            'total_amount': sum(item['total_price'] for item in items),
+            'notes': data.get('notes')
+        }
+    }
+
+def _import_chunk(chunk):
+    """Grava um bloco de vendas já validadas em uma transação, com inserts em lote"""
+    sale_ids = db.session.scalars(
+        insert(Sale).returning(Sale.id, sort_by_parameter_order=True),
+        [entry['sale'] for entry in chunk]
+    ).all()
+    
+    items = []
+    quantities = {}
+    for sale_id, entry in zip(sale_ids, chunk):
+        items.extend(dict(item, sale_id=sale_id) for item in entry['items'])
+        for product_id, quantity in entry['quantities'].items():
+            quantities[product_id] = quantities.get(product_id, 0) + quantity
+    
+    db.session.execute(insert(SaleItem), items)
+    reserve_stock(quantities)
+    record_sales([(
+        entry['sale']['sale_date'],
+        entry['sale']['payment_method'],
+        entry['sale']['total_amount'],
+        [(item['product_id'], item['quantity'], item['total_price']) for item in entry['items']]
+    ) for entry in chunk])
+    
+    db.session.commit()
+    return sale_ids
+
+@sales_bp.route('/bulk', methods=['POST'])
+@jwt_required()
+def create_sales_bulk():
+    """Importa muitas vendas de uma vez (reenvio dos terminais offline)
+
+    Corpo: {"sales": [{sale_date, payment_method, items, customer_id?, notes?, ref?}, ...]}
+    O estoque é validado para o lote inteiro, na ordem enviada; as vendas
+    válidas são gravadas em blocos, cada bloco em uma transação. A resposta
+    traz um resultado compacto por linha: {index, ref, id} ou {index, ref, error}.
+    """
+    try:
+        data = request.get_json() or {}
+        sales = data.get('sales')
+        
+        if not isinstance(sales, list) or not sales:
+            return jsonify({'error': 'sales deve ser uma lista com pelo menos uma venda'}), 400
+        if len(sales) > BULK_MAX_SALES:
+            return jsonify({'error': f'Máximo de {BULK_MAX_SALES} vendas por lote'}), 400
+        
+        # Todos os produtos e clientes do lote com uma consulta cada; ids de
+        # tipo inválido ficam de fora e a linha é recusada na validação
+        product_ids = {
+            item.get('product_id')
+            for sale in sales if isinstance(sale, dict) and isinstance(sale.get('items'), list)
+            for item in sale['items'] if isinstance(item, dict) and _is_id(item.get('product_id'))
+        }
+        customer_ids = {
+            sale.get('customer_id') for sale in sales if isinstance(sale, dict) and _is_id(sale.get('customer_id'))
+        }
+        products = load_products(product_ids)
+        customers = set(db.session.scalars(
+            db.select(Customer.id).where(Customer.id.in_(list(customer_ids)))
+        )) if customer_ids else set()
+        remaining = {product_id: product.stock_quantity for product_id, product in products.items()}
+        
+        results = []
+        valid = []
+        for index, sale_data in enumerate(sales):
+            try:
+                if not isinstance(sale_data, dict):
+                    raise StockError('Venda inválida')
+                valid.append(_prepare_bulk_sale(index, sale_data, products, customers, remaining))
+            except (StockError, ValueError, KeyError, TypeError) as e:
+                ref = sale_data.get('ref') if isinstance(sale_data, dict) else None
+                results.append({'index': index, 'ref': ref, 'error': str(e)})
+        
+        for start in range(0, len(valid), BULK_CHUNK_SIZE):
+            chunk = valid[start:start + BULK_CHUNK_SIZE]
+            try:
+                sale_ids = _import_chunk(chunk)
+                results.extend({'index': entry['index'], 'ref': entry['ref'], 'id': sale_id} for sale_id, entry in zip(sale_ids, chunk))
+            except Exception as e:
+                db.session.rollback()
+                results.extend({'index': entry['index'], 'ref': entry['ref'], 'error': str(e)} for entry in chunk)
+        
+        results.sort(key=lambda result: result['index'])
+        created = sum(1 for result in results if 'id' in result)
+        
+        return jsonify({
+            'created': created,
+            'failed': len(results) - created,
+            'results': results
+        }), 200
+        
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -125,10 +300,19 @@ def delete_sale(sale_id):
         if not sale:
             return jsonify({'error': 'Venda não encontrada'}), 404
         
-        # Reverter estoque dos produtos
-        for item in sale.sale_items:
-            item.product.stock_quantity += item.quantity
+        items = db.session.query(
+            SaleItem.product_id, SaleItem.quantity, SaleItem.total_price
+        ).filter_by(sale_id=sale_id).all()
+        
+        # Reverter estoque dos produtos em lote
+        quantities = {}
+        for product_id, quantity, _ in items:
+            quantities[product_id] = quantities.get(product_id, 0) + quantity
+        release_stock(quantities)
+        
+        record_sale(sale, items, sign=-1)
         
+        SaleItem.query.filter_by(sale_id=sale_id).delete(synchronize_session=False)
         db.session.delete(sale)
         db.session.commit()
         
@@ -145,7 +329,7 @@ def get_sales_reports():
         start_date = request.args.get('start_date')
         end_date = request.args.get('end_date')
         
-        query = Sale.query
+        query = Sale.query.options(*SALE_LOAD)
         
         if start_date:
             query = query.filter(Sale.sale_date >= datetime.strptime(start_date, '%Y-%m-%d').date())
@@ -0,0 +1,200 @@
+import re
+from sqlalchemy import and_, column, func, literal_column, not_, or_, table, text
+from src.models.costing import price_from_cost
+from src.models.database import db, Category, Customer, Product
+from src.models.pagination import decode_cursor, encode_cursor
+
+# Busca de clientes para o autocomplete da venda. O resultado vem em duas
+# faixas, cada uma lida na ordem de um índice para que a primeira página
+# custe o mesmo com 10 ou com 10 mil correspondências:
+#   0. nomes que começam com a consulta, em ordem alfabética (índice
+#      NOCASE no SQLite, lower(name) text_pattern_ops no PostgreSQL);
+#   1. demais clientes com todos os termos de 3 letras ou mais em nome,
+#      e-mail ou telefone (FTS5 trigram no SQLite, pg_trgm no PostgreSQL),
+#      dos mais recentes para os mais antigos.
+# Consultas só com termos curtos usam apenas a faixa 0.
+
+MIN_TERM_LENGTH = 3
+
+NAME_PREFIX, SUBSTRING = 0, 1
+
+_customers_fts = table('customers_fts', column('rowid'))
+_products_fts = table('products_fts', column('rowid'))
+
+
+def _escape_like(value):
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def customer_document():
+    """Texto pesquisável do cliente; igual à expressão do índice de trigramas"""
+    space = literal_column("' '")
+    empty = literal_column("''")
+    return func.lower(
+        Customer.name + space + func.coalesce(Customer.email, empty) + space + func.coalesce(Customer.phone, empty)
+    )
+
+
+def _fts_quote(term):
+    return '"' + term.replace('"', '""') + '"'
+
+
+def _sort_name(dialect):
+    if dialect == 'sqlite':
+        return Customer.name.collate('NOCASE')
+    return func.lower(Customer.name)
+
+
+def _name_prefix(dialect, prefix):
+    if dialect == 'sqlite':
+        # Faixa no índice NOCASE; LIKE com ESCAPE não usaria o índice no SQLite
+        upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+        name = _sort_name(dialect)
+        return and_(name >= prefix, name < upper)
+    return func.lower(Customer.name).like(f'{_escape_like(prefix)}%', escape='\\')
+
+
+def _name_prefix_page(dialect, prefix, last_name, last_id, limit):
+    sort_name = _sort_name(dialect)
+    results = db.session.query(Customer).filter(_name_prefix(dialect, prefix))
+    if last_id is not None:
+        if dialect != 'sqlite':
+            last_name = last_name.lower()
+        results = results.filter(or_(
+            sort_name > last_name,
+            and_(sort_name == last_name, Customer.id > last_id)
+        ))
+    return results.order_by(sort_name, Customer.id).limit(limit).all()
+
+
+def _substring_page(dialect, terms, prefix, last_id, limit):
+    results = db.session.query(Customer).filter(not_(_name_prefix(dialect, prefix)))
+    if dialect == 'sqlite':
+        # Parte da tabela FTS em ordem decrescente de rowid e para no LIMIT;
+        # cada termo entre aspas é uma substring, vários termos = todos presentes
+        match = ' '.join(_fts_quote(term) for term in terms)
+        results = results.join(_customers_fts, _customers_fts.c.rowid == Customer.id).filter(
+            text('customers_fts MATCH :match').bindparams(match=match)
+        )
+        key = _customers_fts.c.rowid
+    else:
+        document = customer_document()
+        results = results.filter(*[document.like(f'%{_escape_like(term)}%', escape='\\') for term in terms])
+        key = Customer.id
+
+    if last_id is not None:
+        results = results.filter(key < last_id)
+    return results.order_by(key.desc()).limit(limit).all()
+
+
+def search_customers(query, cursor=None, per_page=20):
+    """Clientes que correspondem a ``query``, começos de nome primeiro
+
+    Pagina por cursor sobre (faixa, nome, id). Retorna (clientes, próximo
+    cursor).
+    """
+    query = ' '.join(query.lower().split())
+    if not query:
+        return [], None
+
+    terms = [term for term in query.split() if len(term) >= MIN_TERM_LENGTH]
+    dialect = db.session.get_bind().dialect.name
+
+    tier, last_name, last_id = NAME_PREFIX, None, None
+    if cursor:
+        tier, last_name, last_id = decode_cursor(cursor, (Customer.id, Customer.name, Customer.id))
+        if tier not in (NAME_PREFIX, SUBSTRING) or not isinstance(last_id, int):
+            raise ValueError('Cursor inválido')
+
+    found = []
+    if tier == NAME_PREFIX:
+        found += [(NAME_PREFIX, customer) for customer in _name_prefix_page(
+            dialect, query, last_name, last_id, per_page + 1
+        )]
+        last_id = None
+    if len(found) <= per_page and terms:
+        found += [(SUBSTRING, customer) for customer in _substring_page(
+            dialect, terms, query, last_id, per_page + 1 - len(found)
+        )]
+
+    if len(found) <= per_page:
+        return [customer for _, customer in found], None
+
+    found = found[:per_page]
+    tier, customer = found[-1]
+    return [customer for _, customer in found], encode_cursor([tier, customer.name, customer.id])
+
+
+# Busca de produtos para o PDV: texto completo sobre nome, descrição e nome
+# da categoria (tsvector com GIN no PostgreSQL, FTS5 no SQLite, ambos
+# mantidos por triggers). Cada palavra da consulta vale como prefixo e todas
+# precisam aparecer; o nome pesa mais que a categoria, que pesa mais que a
+# descrição. Um número sozinho também encontra o produto com esse código.
+
+_WORD = re.compile(r'\w+')
+
+# Maior valor de uma coluna INTEGER no PostgreSQL; números maiores não são um
+# código de produto e estourariam o parâmetro da consulta
+MAX_PRODUCT_ID = 2 ** 31 - 1
+
+
+def _product_match(dialect, words):
+    """Condição de texto completo e expressão de ordenação (menor = melhor)"""
+    if dialect == 'sqlite':
+        match = ' '.join(f'"{word}"*' for word in words)
+        # Pesos por coluna: nome, descrição, categoria
+        rank = func.bm25(literal_column('products_fts'), 10.0, 1.0, 4.0)
+        return text('products_fts MATCH :match').bindparams(match=match), rank
+
+    search_vector = literal_column('products.search_vector')
+    tsquery = func.to_tsquery('portuguese', ' & '.join(f'{word}:*' for word in words))
+    return search_vector.op('@@')(tsquery), -func.ts_rank(search_vector, tsquery)
+
+
+def product_hit(row):
+    """Resultado compacto: o necessário para vender, sem materiais nem custos"""
+    if row.final_price:
+        price = float(row.final_price)
+    elif row.unit_cost is not None:
+        price = price_from_cost(float(row.unit_cost), row.profit_margin)
+    else:
+        price = None
+    return {
+        'id': row.id,
+        'name': row.name,
+        'category': row.category,
+        'price': price,
+        'stock_quantity': row.stock_quantity,
+        'image_url': row.image_url
+    }
+
+
+def _product_hits(joined_fts=False):
+    results = db.session.query(
+        Product.id, Product.name, Product.final_price, Product.unit_cost, Product.profit_margin,
+        Product.stock_quantity, Product.image_url, Category.name.label('category')
+    )
+    if joined_fts:
+        results = results.select_from(_products_fts).join(Product, Product.id == _products_fts.c.rowid)
+    return results.outerjoin(Category, Category.id == Product.category_id)
+
+
+def search_products(query, limit=20):
+    """Produtos que correspondem a ``query``, do mais relevante ao menos"""
+    words = _WORD.findall(query.lower())
+    if not words:
+        return []
+
+    dialect = db.session.get_bind().dialect.name
+    condition, rank = _product_match(dialect, words)
+
+    rows = []
+    if len(words) == 1 and words[0].isdecimal() and int(words[0]) <= MAX_PRODUCT_ID:
+        rows = _product_hits().filter(Product.id == int(words[0])).all()
+
+    matches = _product_hits(joined_fts=dialect == 'sqlite').filter(condition)
+    rows += [
+        row for row in matches.order_by(rank, Product.name, Product.id).limit(limit).all()
+        if not rows or row.id != rows[0].id
+    ]
+    return [product_hit(row) for row in rows[:limit]]
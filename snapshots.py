@@ -0,0 +1,154 @@
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from itertools import chain
+from sqlalchemy import case, delete, event, func, inspect, insert, select
+from sqlalchemy.orm import Session
+from src.models.database import db, StockMovement, StockSnapshot
+
+# Saldo histórico dos materiais. O saldo num instante é a soma das
+# movimentações anteriores a ele (IN soma, OUT subtrai). Em vez de somar o
+# histórico inteiro, a consulta parte da fotografia mais recente até o
+# instante pedido e soma só as movimentações entre as duas; com fotografias
+# diárias (ou mensais) o custo não cresce com o tamanho de stock_movements.
+
+SNAPSHOT_PERIODS = ('daily', 'monthly')
+
+_signed_quantity = case(
+    (StockMovement.movement_type == 'IN', StockMovement.quantity),
+    else_=-StockMovement.quantity
+)
+
+
+def stock_as_of(at, material_ids=None):
+    """Saldo de cada material em ``at`` (movimentações com created_at < at)
+
+    Retorna ``(saldos, instante da fotografia usada ou None)``. Materiais sem
+    nenhuma movimentação até ``at`` ficam fora de ``saldos``.
+    """
+    snapshot_at = db.session.scalar(
+        select(func.max(StockSnapshot.snapshot_at)).where(StockSnapshot.snapshot_at <= at)
+    )
+
+    balances = {}
+    if snapshot_at is not None:
+        query = select(StockSnapshot.material_id, StockSnapshot.quantity).where(
+            StockSnapshot.snapshot_at == snapshot_at
+        )
+        if material_ids is not None:
+            query = query.where(StockSnapshot.material_id.in_(material_ids))
+        balances.update(db.session.execute(query).all())
+
+    query = select(StockMovement.material_id, func.sum(_signed_quantity)).where(
+        StockMovement.created_at < at
+    ).group_by(StockMovement.material_id)
+    if snapshot_at is not None:
+        query = query.where(StockMovement.created_at >= snapshot_at)
+    if material_ids is not None:
+        query = query.where(StockMovement.material_id.in_(material_ids))
+    for material_id, delta in db.session.execute(query):
+        balances[material_id] = balances.get(material_id, 0) + delta
+
+    return balances, snapshot_at
+
+
+def stock_adjustment(material, previous, quantity, description):
+    """Movimentação que leva o saldo de ``material`` de ``previous`` a ``quantity``
+
+    Para o estoque informado à mão (cadastro, correção de inventário): sem ela
+    o saldo histórico, que só soma movimentações, não veria a mudança.
+    Retorna None quando o saldo não muda.
+    """
+    difference = Decimal(str(quantity)) - Decimal(str(previous or 0))
+    if not difference:
+        return None
+    return StockMovement(
+        material=material,
+        movement_type='IN' if difference > 0 else 'OUT',
+        quantity=abs(difference),
+        description=description,
+        reference_type='adjustment'
+    )
+
+
+def take_snapshot(at):
+    """Grava a fotografia dos saldos em ``at`` (substitui a existente)"""
+    # A fotografia antiga sai antes do cálculo, senão ela mesma seria o ponto de partida
+    db.session.execute(
+        delete(StockSnapshot).where(StockSnapshot.snapshot_at == at)
+        .execution_options(synchronize_session=False)
+    )
+    balances, _ = stock_as_of(at)
+    if balances:
+        db.session.execute(insert(StockSnapshot), [
+            {'snapshot_at': at, 'material_id': material_id, 'quantity': quantity}
+            for material_id, quantity in balances.items()
+        ])
+    return len(balances)
+
+
+def period_start(day, period):
+    """Início do dia (ou do mês) que contém ``day``"""
+    if period == 'monthly':
+        day = day.replace(day=1)
+    return datetime.combine(day, time.min)
+
+
+def as_of_instant(day):
+    """Fim do dia ``day``: o saldo inclui todas as movimentações da data"""
+    return datetime.combine(day + timedelta(days=1), time.min)
+
+
+def _next_boundary(boundary, period):
+    if period == 'monthly':
+        return period_start((boundary + timedelta(days=32)).date(), period)
+    return boundary + timedelta(days=1)
+
+
+def take_snapshots(period='daily', since=None, today=None):
+    """Tira as fotografias que faltam até o início do período atual
+
+    Sem ``since``, continua a partir da última fotografia gravada (ou da
+    primeira movimentação, se ainda não há nenhuma). Cada fotografia é
+    calculada a partir da anterior, então preencher o histórico inteiro
+    percorre stock_movements uma única vez. Retorna os instantes gravados.
+    """
+    if period not in SNAPSHOT_PERIODS:
+        raise ValueError(f'Período deve ser um de: {", ".join(SNAPSHOT_PERIODS)}')
+
+    until = period_start(today or datetime.utcnow().date(), period)
+    if since is not None:
+        boundary = period_start(since, period)
+    else:
+        last = db.session.scalar(select(func.max(StockSnapshot.snapshot_at)))
+        start = last or db.session.scalar(select(func.min(StockMovement.created_at)))
+        if start is None:
+            return []
+        boundary = _next_boundary(period_start(start.date(), period), period)
+
+    taken = []
+    while boundary <= until:
+        take_snapshot(boundary)
+        taken.append(boundary)
+        boundary = _next_boundary(boundary, period)
+    return taken
+
+
+@event.listens_for(Session, 'before_flush')
+def _invalidate_snapshots(session, flush_context, instances):
+    # Alterar ou remover uma movimentação antiga (ex.: excluir uma produção)
+    # muda todos os saldos a partir dela; as fotografias posteriores são
+    # descartadas e refeitas no próximo take_snapshots
+    earliest = []
+    for movement in chain(session.dirty, session.deleted):
+        if not isinstance(movement, StockMovement):
+            continue
+        if movement not in session.deleted and not session.is_modified(movement):
+            continue
+        created = [value for value in chain(*inspect(movement).attrs.created_at.history) if value]
+        earliest.append(min(created) if created else datetime.min)
+
+    if earliest:
+        session.execute(
+            delete(StockSnapshot).where(StockSnapshot.snapshot_at > min(earliest))
+            .execution_options(synchronize_session=False)
+        )
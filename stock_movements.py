@@ -1,6 +1,8 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required
 from src.models.database import db, StockMovement
+from src.models.loaders import STOCK_MOVEMENT_LOAD
+from src.models.pagination import keyset_page
 
 stock_movements_bp = Blueprint('stock_movements', __name__)
 
@@ -11,23 +13,38 @@ def get_stock_movements():
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 50, type=int)
         material_id = request.args.get('material_id', type=int)
+        # ?cursor= (vazio na primeira página) ativa a paginação por cursor
+        cursor = request.args.get('cursor')
+        with_total = request.args.get('with_total', 'false' if cursor is not None else 'true').lower() in ('1', 'true')
         
-        query = StockMovement.query
+        query = StockMovement.query.options(*STOCK_MOVEMENT_LOAD)
         
         if material_id:
             query = query.filter_by(material_id=material_id)
         
+        if cursor is not None:
+            movements, next_cursor = keyset_page(query, (StockMovement.created_at, StockMovement.id), cursor, per_page)
+            result = {
+                'movements': [movement.to_dict() for movement in movements],
+                'next_cursor': next_cursor
+            }
+            if with_total:
+                result['total'] = query.order_by(None).count()
+            return jsonify(result), 200
+        
         movements = query.order_by(StockMovement.created_at.desc()).paginate(
-            page=page, per_page=per_page, error_out=False
+            page=page, per_page=per_page, error_out=False, count=with_total
         )
         
         return jsonify({
             'movements': [movement.to_dict() for movement in movements.items],
             'total': movements.total,
-            'pages': movements.pages,
+            'pages': movements.pages if with_total else None,
             'current_page': page
         }), 200
         
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -59,6 +76,8 @@ def create_stock_movement():
         db.session.add(movement)
         db.session.commit()
         
+        movement = StockMovement.query.options(*STOCK_MOVEMENT_LOAD).filter_by(id=movement.id).first()
+        
         return jsonify({
             'message': 'Movimentação registrada com sucesso',
             'movement': movement.to_dict()
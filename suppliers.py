@@ -1,11 +1,13 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required
 from src.models.database import db, Supplier
+from src.cache import etag_from_tables
 
 suppliers_bp = Blueprint('suppliers', __name__)
 
 @suppliers_bp.route('', methods=['GET'])
 @jwt_required()
+@etag_from_tables('suppliers')
 def get_suppliers():
     try:
         suppliers = Supplier.query.all()
@@ -0,0 +1,67 @@
+"""Fixtures dos testes: aplicação com um SQLite novo por teste
+
+tests/ fica ao lado de src/; rodar na raiz do projeto com:
+    pytest
+"""
+import os
+import sys
+import pytest
+from flask_jwt_extended import create_access_token
+# Mesmo ajuste de caminho do main.py, para importar o pacote src
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    # Arquivo (e não :memory:) para que outra conexão enxergue os mesmos
+    # dados, como um segundo caixa vendendo ao mesmo tempo
+    monkeypatch.setenv('DATABASE_URL', f"sqlite:///{tmp_path / 'test.db'}")
+    from src.main import create_app
+    from src.models.database import db
+
+    app = create_app()
+    app.config['TESTING'] = True
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def auth(app):
+    return {'Authorization': f"Bearer {create_access_token(identity='1')}"}
+
+
+@pytest.fixture
+def make_product(app):
+    from src.models.database import db, Product
+
+    def make(name='Caderno', stock_quantity=10, final_price=10, **fields):
+        product = Product(
+            name=name, stock_quantity=stock_quantity, final_price=final_price,
+            profit_margin=0, auto_price=False, **fields
+        )
+        db.session.add(product)
+        db.session.commit()
+        return product.id
+    return make
+
+
+@pytest.fixture
+def make_material(app):
+    from src.models.database import db, Material
+
+    def make(name='Papel', stock_quantity=100, min_stock_alert=10, **fields):
+        material = Material(
+            name=name, unit='un', purchase_price=1,
+            stock_quantity=stock_quantity, min_stock_alert=min_stock_alert, **fields
+        )
+        db.session.add(material)
+        db.session.commit()
+        return material.id
+    return make
@@ -0,0 +1,82 @@
+from sqlalchemy import update
+from src.models.alerts import sync_stock_alerts
+from src.models.database import db, Material, StockAlert
+
+
+def _alerts(material_id):
+    db.session.expire_all()
+    return StockAlert.query.filter_by(material_id=material_id).order_by(StockAlert.id).all()
+
+
+def test_material_created_below_minimum_opens_alert(make_material):
+    material = make_material(stock_quantity=5, min_stock_alert=10)
+
+    alerts = _alerts(material)
+
+    assert len(alerts) == 1
+    assert alerts[0].resolved_at is None
+
+
+def test_alert_resolves_and_reopens_as_stock_crosses_minimum(make_material):
+    material_id = make_material(stock_quantity=50, min_stock_alert=10)
+    assert _alerts(material_id) == []
+
+    material = db.session.get(Material, material_id)
+    material.stock_quantity = 8
+    db.session.commit()
+    material.stock_quantity = 9
+    db.session.commit()
+    assert [alert.resolved_at is None for alert in _alerts(material_id)] == [True]
+
+    material.stock_quantity = 30
+    db.session.commit()
+    material.stock_quantity = 2
+    db.session.commit()
+
+    assert [alert.resolved_at is None for alert in _alerts(material_id)] == [False, True]
+
+
+def test_production_consuming_materials_opens_alert(client, auth, make_material, make_product):
+    material = make_material(stock_quantity=12, min_stock_alert=10)
+    product = make_product()
+    client.put(f'/api/products/{product}', headers=auth, json={
+        'materials': [{'material_id': material, 'quantity_needed': 1}]
+    })
+
+    response = client.post('/api/productions', headers=auth, json={
+        'product_id': product, 'quantity_produced': 3, 'production_date': '2026-10-18'
+    })
+
+    assert response.status_code == 201
+    assert [alert.resolved_at is None for alert in _alerts(material)] == [True]
+
+
+def test_bulk_update_is_synced_on_commit(make_material):
+    material = make_material(stock_quantity=50, min_stock_alert=10)
+
+    # UPDATE em lote não passa pelo flush; sync_stock_alerts cobre o caso
+    db.session.execute(update(Material).where(Material.id == material).values(stock_quantity=1))
+    sync_stock_alerts(db.session, [material])
+    db.session.commit()
+
+    assert [alert.resolved_at is None for alert in _alerts(material)] == [True]
+
+
+def test_rollback_discards_alert_changes(make_material):
+    material_id = make_material(stock_quantity=50, min_stock_alert=10)
+
+    material = db.session.get(Material, material_id)
+    material.stock_quantity = 1
+    db.session.flush()
+    db.session.rollback()
+
+    assert _alerts(material_id) == []
+
+
+def test_deleting_material_removes_its_alerts(client, auth, make_material):
+    material = make_material(stock_quantity=1, min_stock_alert=10)
+
+    response = client.delete(f'/api/materials/{material}', headers=auth)
+
+    assert response.status_code == 200
+    assert _alerts(material) == []
@@ -0,0 +1,45 @@
+from src.models.versions import table_versions
+
+
+def _sell(client, auth, product_id, quantity):
+    return client.post('/api/sales', headers=auth, json={
+        'sale_date': '2026-10-18', 'payment_method': 'pix',
+        'items': [{'product_id': product_id, 'quantity': quantity}]
+    })
+
+
+def test_sales_bump_only_the_stock_version(client, auth, make_product):
+    product = make_product(stock_quantity=10)
+    before = table_versions(['products', 'products_stock'])
+
+    _sell(client, auth, product, 2)
+
+    after = table_versions(['products', 'products_stock'])
+    assert after['products'] == before['products']
+    assert after['products_stock'] == before['products_stock'] + 1
+
+
+def test_product_listings_revalidate_after_a_sale(client, auth, make_product):
+    product = make_product(name='Caneca', stock_quantity=10)
+    urls = ['/api/products', '/api/products/search?q=caneca']
+    etags = {url: client.get(url, headers=auth).headers['ETag'] for url in urls}
+    for url in urls:
+        assert client.get(url, headers=dict(auth, **{'If-None-Match': etags[url]})).status_code == 304
+
+    _sell(client, auth, product, 3)
+
+    listing = client.get('/api/products', headers=dict(auth, **{'If-None-Match': etags['/api/products']}))
+    assert listing.status_code == 200
+    assert listing.json[0]['stock_quantity'] == 7
+    search = client.get(urls[1], headers=dict(auth, **{'If-None-Match': etags[urls[1]]}))
+    assert search.status_code == 200
+    assert search.json['products'][0]['stock_quantity'] == 7
+
+
+def test_catalog_changes_bump_the_products_version(client, auth, make_product):
+    product = make_product()
+    before = table_versions(['products'])['products']
+
+    client.put(f'/api/products/{product}', headers=auth, json={'name': 'Caderno A5'})
+
+    assert table_versions(['products'])['products'] == before + 1
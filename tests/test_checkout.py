@@ -0,0 +1,95 @@
+import pytest
+from sqlalchemy import text
+from src.models.checkout import StockError, release_stock, reserve_stock
+from src.models.database import db, Product, Sale
+
+
+def _stock(product_id):
+    db.session.expire_all()
+    return db.session.get(Product, product_id).stock_quantity
+
+
+def _sell(client, auth, product_id, quantity, **fields):
+    return client.post('/api/sales', headers=auth, json=dict({
+        'sale_date': '2026-10-18',
+        'payment_method': 'pix',
+        'items': [{'product_id': product_id, 'quantity': quantity}]
+    }, **fields))
+
+
+def test_reserve_stock_decrements_all_products(make_product):
+    first = make_product(stock_quantity=5)
+    second = make_product(name='Caneta', stock_quantity=3)
+
+    reserve_stock({first: 2, second: 3})
+    db.session.commit()
+
+    assert _stock(first) == 3
+    assert _stock(second) == 0
+
+
+def test_reserve_stock_conflict_raises_409_and_rollback_restores(make_product):
+    first = make_product(stock_quantity=5)
+    second = make_product(name='Caneta', stock_quantity=5)
+
+    # Outro caixa vendeu quase todo o segundo produto depois da conferência
+    with db.engine.begin() as other:
+        other.execute(text('UPDATE products SET stock_quantity = 1 WHERE id = :id'), {'id': second})
+
+    with pytest.raises(StockError) as error:
+        reserve_stock({first: 2, second: 2})
+    assert error.value.status_code == 409
+    db.session.rollback()
+
+    assert _stock(first) == 5
+    assert _stock(second) == 1
+
+
+def test_release_stock_returns_quantities(make_product):
+    product = make_product(stock_quantity=5)
+
+    release_stock({product: 4})
+    release_stock({})
+    db.session.commit()
+
+    assert _stock(product) == 9
+
+
+def test_create_sale_without_stock_is_rejected(client, auth, make_product):
+    product = make_product(stock_quantity=1)
+
+    response = _sell(client, auth, product, 2)
+
+    assert response.status_code == 400
+    assert _stock(product) == 1
+    assert Sale.query.count() == 0
+
+
+def test_delete_sale_releases_stock(client, auth, make_product):
+    product = make_product(stock_quantity=10)
+    sale_id = _sell(client, auth, product, 3).json['sale']['id']
+    assert _stock(product) == 7
+
+    response = client.delete(f'/api/sales/{sale_id}', headers=auth)
+
+    assert response.status_code == 200
+    assert _stock(product) == 10
+
+
+def test_bulk_sales_reports_invalid_rows_and_imports_the_rest(client, auth, make_product):
+    product = make_product(stock_quantity=10)
+    valid = {'sale_date': '2026-10-18', 'payment_method': 'pix', 'items': [{'product_id': product, 'quantity': 1}]}
+
+    response = client.post('/api/sales/bulk', headers=auth, json={'sales': [
+        valid,
+        dict(valid, items=[{'product_id': [product], 'quantity': 1}]),
+        dict(valid, customer_id=999),
+        dict(valid, items=[{'product_id': product, 'quantity': 1, 'unit_price': 'abc'}]),
+        dict(valid, items=[{'product_id': product, 'quantity': 20}]),
+        valid,
+    ]})
+
+    assert response.status_code == 200
+    assert response.json['created'] == 2
+    assert ['id' in result for result in response.json['results']] == [True, False, False, False, False, True]
+    assert _stock(product) == 8
@@ -0,0 +1,49 @@
+from src.models.database import db, Customer
+from src.models.search import search_customers
+
+
+def _customer_ids(query):
+    customers, _ = search_customers(query, per_page=100)
+    return [customer.id for customer in customers]
+
+
+def test_customer_index_follows_insert_update_and_delete(app):
+    customer = Customer(name='Ana Paula', email='ana@exemplo.com.br', phone='(11) 91234-5678')
+    db.session.add(customer)
+    db.session.commit()
+    assert _customer_ids('paula') == [customer.id]
+    assert _customer_ids('1234') == [customer.id]
+
+    customer.name = 'Beatriz Souza'
+    db.session.commit()
+    assert _customer_ids('paula') == []
+    assert _customer_ids('souza') == [customer.id]
+
+    db.session.delete(customer)
+    db.session.commit()
+    assert _customer_ids('souza') == []
+
+
+def test_customer_search_ranks_name_prefix_first_and_pages(app):
+    db.session.add_all([
+        Customer(name='Maria Ana'),
+        Customer(name='Anabela Costa'),
+        Customer(name='Ana Lima'),
+        Customer(name='Joana', email='ana.joana@exemplo.com.br'),
+    ])
+    db.session.commit()
+
+    customers, cursor = search_customers('ana', per_page=2)
+    names = [customer.name for customer in customers]
+    while cursor:
+        customers, cursor = search_customers('ana', cursor, per_page=2)
+        names += [customer.name for customer in customers]
+
+    # Começos de nome em ordem alfabética, depois os demais do mais recente
+    assert names == ['Ana Lima', 'Anabela Costa', 'Joana', 'Maria Ana']
+
+
+def test_customer_search_rejects_bad_cursor(client, auth):
+    response = client.get('/api/customers/search?q=ana&cursor=zzz', headers=auth)
+
+    assert response.status_code == 400
@@ -0,0 +1,10 @@
+def test_stream_ticket_is_not_an_api_token(client, auth):
+    ticket = client.post('/api/dashboard/stream-ticket', headers=auth).json['ticket']
+
+    assert client.get('/api/materials', headers={'Authorization': f'Bearer {ticket}'}).status_code in (401, 422)
+    assert client.get('/api/dashboard/stream?ticket=invalido').status_code == 401
+
+    stream = client.get(f'/api/dashboard/stream?ticket={ticket}', buffered=False)
+    assert stream.status_code == 200
+    assert stream.mimetype == 'text/event-stream'
+    stream.close()
@@ -0,0 +1,59 @@
+import io
+from src.models.database import db, Material, StockMovement
+
+
+def _stock(material_id):
+    db.session.expire_all()
+    return float(db.session.get(Material, material_id).stock_quantity)
+
+
+def test_intake_reports_invalid_lines_and_writes_nothing(client, auth, make_material):
+    material = make_material(stock_quantity=10)
+
+    response = client.post('/api/materials/stock-intake', headers=auth, json={'items': [
+        {'material_id': material, 'quantity': 5},
+        {'material_id': material, 'quantity': 1, 'description': ['nota']},
+        {'material_id': material, 'quantity': 0},
+        {'material_id': 999, 'quantity': 1},
+    ]})
+
+    assert response.status_code == 400
+    assert [error['index'] for error in response.json['errors']] == [1, 2, 3]
+    assert response.json['errors'][0]['error'] == 'description deve ser texto'
+    assert _stock(material) == 10
+
+
+def test_intake_rejects_invalid_reference_id(client, auth, make_material):
+    material = make_material(stock_quantity=10)
+    items = [{'material_id': material, 'quantity': 5}]
+
+    for reference_id in ['abc', {'id': 1}, True, 2**40]:
+        response = client.post('/api/materials/stock-intake', headers=auth, json={
+            'items': items, 'reference_id': reference_id
+        })
+        assert response.status_code == 400
+
+    response = client.post('/api/materials/stock-intake', headers=auth, json={
+        'items': items, 'reference_id': '42', 'description': 'NF 42'
+    })
+    assert response.status_code == 200
+    assert _stock(material) == 15
+    movement = StockMovement.query.filter_by(reference_type='purchase').one()
+    assert (movement.reference_id, movement.description) == (42, 'NF 42')
+
+
+def test_csv_intake_accepts_semicolons_and_decimal_commas(client, auth, make_material):
+    material = make_material(stock_quantity=10)
+    content = f'material_id;quantity;unit_price\n{material};2,5;1,20\n'.encode()
+
+    response = client.post('/api/materials/stock-intake/csv', headers=auth, data={
+        'file': (io.BytesIO(content), 'nota.csv'), 'reference_id': 'x'
+    })
+    assert response.status_code == 400
+
+    response = client.post('/api/materials/stock-intake/csv', headers=auth, data={
+        'file': (io.BytesIO(content), 'nota.csv'), 'reference_id': '7'
+    })
+    assert response.status_code == 200
+    assert response.json['total_cost'] == 3.0
+    assert _stock(material) == 12.5
@@ -0,0 +1,33 @@
+import base64
+import json
+import pytest
+
+
+def _cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+@pytest.mark.parametrize('url', ['/api/sales', '/api/expenses', '/api/stock-movements'])
+@pytest.mark.parametrize('values', [[1, 2], ['2026-10-18T00:00:00', 'abc'], ['2026-10-18T00:00:00', True], {}])
+def test_malformed_cursor_is_rejected(client, auth, url, values):
+    response = client.get(f'{url}?cursor={_cursor(values)}', headers=auth)
+
+    assert response.status_code == 400
+    assert response.json['error'] == 'Cursor inválido'
+
+
+def test_cursor_pages_through_sales(client, auth, make_product):
+    product = make_product(stock_quantity=10)
+    for _ in range(3):
+        client.post('/api/sales', headers=auth, json={
+            'sale_date': '2026-10-18', 'payment_method': 'pix',
+            'items': [{'product_id': product, 'quantity': 1}]
+        })
+
+    ids, cursor = [], ''
+    while cursor is not None:
+        page = client.get(f'/api/sales?cursor={cursor}&per_page=2', headers=auth).json
+        ids += [sale['id'] for sale in page['sales']]
+        cursor = page['next_cursor']
+
+    assert ids == [3, 2, 1]
@@ -0,0 +1,54 @@
+from src.models.database import db, Category, Product
+from src.models.search import search_products
+
+
+def _product_names(query):
+    return [hit['name'] for hit in search_products(query)]
+
+
+def test_product_index_follows_product_and_category_changes(app):
+    category = Category(name='Papelaria')
+    db.session.add(category)
+    db.session.flush()
+    product = Product(name='Caderno Espiral', description='Capa dura', category_id=category.id, profit_margin=0)
+    db.session.add(product)
+    db.session.commit()
+    assert _product_names('papel cad') == ['Caderno Espiral']
+    assert _product_names('capa') == ['Caderno Espiral']
+
+    product.name = 'Agenda Espiral'
+    db.session.commit()
+    assert _product_names('caderno') == []
+    assert _product_names('agenda') == ['Agenda Espiral']
+
+    category.name = 'Escritório'
+    db.session.commit()
+    assert _product_names('papelaria') == []
+    assert _product_names('escritorio agenda') == ['Agenda Espiral']
+
+    db.session.delete(product)
+    db.session.commit()
+    assert _product_names('agenda') == []
+
+
+def test_product_search_hits_are_compact(client, auth, make_product):
+    product = make_product(name='Vela de Lavanda', stock_quantity=4, final_price=12.5)
+
+    response = client.get('/api/products/search?q=lavanda', headers=auth)
+
+    assert response.status_code == 200
+    assert response.json['products'] == [{
+        'id': product, 'name': 'Vela de Lavanda', 'category': None,
+        'price': 12.5, 'stock_quantity': 4, 'image_url': None
+    }]
+
+
+def test_product_search_by_code_ignores_out_of_range_numbers(client, auth, make_product):
+    product = make_product(name='Caneca')
+
+    by_code = client.get(f'/api/products/search?q={product}', headers=auth)
+    too_large = client.get('/api/products/search?q=99999999999999999999999', headers=auth)
+
+    assert [hit['id'] for hit in by_code.json['products']] == [product]
+    assert too_large.status_code == 200
+    assert too_large.json['products'] == []
@@ -0,0 +1,77 @@
+from datetime import date
+from src.models.database import db, DailyProductSales, DailySales
+from src.models.rollups import rebuild_daily_sales, record_sales
+
+
+def _daily_sales():
+    return {
+        (row.sale_date, row.payment_method): (float(row.revenue), row.sales_count, row.items_sold)
+        for row in DailySales.query.all()
+    }
+
+
+def _daily_product_sales():
+    return {
+        (row.sale_date, row.product_id): (row.quantity, float(row.revenue))
+        for row in DailyProductSales.query.all()
+    }
+
+
+def test_record_sales_upserts_into_existing_rows(make_product):
+    product = make_product()
+    day = date(2026, 10, 18)
+
+    record_sales([(day, 'pix', 20, [(product, 2, 20)])])
+    db.session.commit()
+    record_sales([
+        (day, 'pix', 10, [(product, 1, 10)]),
+        (day, 'dinheiro', 30, [(product, 3, 30)]),
+    ])
+    db.session.commit()
+
+    assert _daily_sales() == {(day, 'pix'): (30.0, 2, 3), (day, 'dinheiro'): (30.0, 1, 3)}
+    assert _daily_product_sales() == {(day, product): (6, 60.0)}
+
+
+def test_record_sales_with_negative_sign_removes_emptied_rows(make_product):
+    product = make_product()
+    day = date(2026, 10, 18)
+    sale = [(day, 'pix', 20, [(product, 2, 20)])]
+
+    record_sales(sale)
+    record_sales(sale, sign=-1)
+    db.session.commit()
+
+    assert _daily_sales() == {}
+    assert _daily_product_sales() == {}
+
+
+def test_sales_api_totals_match_rebuild(client, auth, make_product):
+    first = make_product(stock_quantity=20)
+    second = make_product(name='Caneta', stock_quantity=20, final_price=2)
+    sale_ids = []
+    for product, quantity, method in [(first, 2, 'pix'), (second, 5, 'pix'), (first, 1, 'dinheiro')]:
+        response = client.post('/api/sales', headers=auth, json={
+            'sale_date': '2026-10-18', 'payment_method': method,
+            'items': [{'product_id': product, 'quantity': quantity}]
+        })
+        sale_ids.append(response.json['sale']['id'])
+    client.delete(f'/api/sales/{sale_ids[1]}', headers=auth)
+
+    maintained = (_daily_sales(), _daily_product_sales())
+    rebuild_daily_sales()
+    db.session.commit()
+
+    assert maintained == (_daily_sales(), _daily_product_sales())
+
+
+def test_product_with_reverted_sales_can_be_deleted(client, auth, make_product):
+    product = make_product(stock_quantity=5)
+    sale = client.post('/api/sales', headers=auth, json={
+        'sale_date': '2026-10-18', 'payment_method': 'pix',
+        'items': [{'product_id': product, 'quantity': 2}]
+    }).json['sale']['id']
+    client.delete(f'/api/sales/{sale}', headers=auth)
+
+    assert _daily_product_sales() == {}
+    assert client.delete(f'/api/products/{product}', headers=auth).status_code == 200
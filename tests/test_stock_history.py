@@ -0,0 +1,57 @@
+from datetime import datetime, timedelta
+from src.models.database import db, StockMovement, StockSnapshot
+from src.models.snapshots import stock_as_of, take_snapshot
+
+
+def _as_of_today(client, auth):
+    today = datetime.utcnow().date().isoformat()
+    response = client.get(f'/api/materials/stock-as-of?date={today}', headers=auth)
+    return {material['id']: material['stock_quantity'] for material in response.json['materials']}
+
+
+def test_stock_as_of_includes_manual_stock_changes(client, auth):
+    created = client.post('/api/materials', headers=auth, json={
+        'name': 'Papel', 'unit': 'fl', 'purchase_price': 1, 'stock_quantity': 100
+    })
+    material = created.json['material']['id']
+    client.put(f'/api/materials/{material}', headers=auth, json={'stock_quantity': 250})
+    client.post(f'/api/materials/{material}/add-stock', headers=auth, json={'quantity': 5})
+
+    assert _as_of_today(client, auth) == {material: 255.0}
+    assert [
+        (movement.movement_type, float(movement.quantity), movement.reference_type)
+        for movement in StockMovement.query.order_by(StockMovement.id)
+    ] == [('IN', 100.0, 'adjustment'), ('IN', 150.0, 'adjustment'), ('IN', 5.0, 'purchase')]
+
+
+def test_stock_as_of_starts_from_snapshot(make_material):
+    material = make_material(stock_quantity=0)
+    start = datetime(2026, 1, 1)
+    db.session.add_all([
+        StockMovement(material_id=material, movement_type='IN', quantity=10, created_at=start),
+        StockMovement(material_id=material, movement_type='OUT', quantity=3, created_at=start + timedelta(days=2)),
+    ])
+    db.session.commit()
+
+    take_snapshot(start + timedelta(days=1))
+    db.session.commit()
+    balances, snapshot_at = stock_as_of(start + timedelta(days=3), [material])
+
+    assert snapshot_at == start + timedelta(days=1)
+    assert float(balances[material]) == 7
+
+
+def test_deleting_material_removes_its_stock_history(client, auth):
+    created = client.post('/api/materials', headers=auth, json={
+        'name': 'Cola', 'unit': 'un', 'purchase_price': 3, 'stock_quantity': 10
+    })
+    material = created.json['material']['id']
+    client.post(f'/api/materials/{material}/add-stock', headers=auth, json={'quantity': 5})
+    take_snapshot(datetime.utcnow())
+    db.session.commit()
+
+    response = client.delete(f'/api/materials/{material}', headers=auth)
+
+    assert response.status_code == 200
+    assert StockMovement.query.filter_by(material_id=material).count() == 0
+    assert StockSnapshot.query.filter_by(material_id=material).count() == 0
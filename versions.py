@@ -0,0 +1,100 @@
+from itertools import chain
+from sqlalchemy import event, insert, inspect, select, update
+from sqlalchemy.orm import Session
+from src.models.database import db, TableVersion
+
+# Tabelas do catálogo com contador de versão. O contador é incrementado na
+# mesma transação da escrita, então qualquer worker enxerga a versão nova
+# assim que o commit termina.
+VERSIONED_TABLES = frozenset({
+    'products', 'categories', 'product_materials', 'materials', 'suppliers', 'customers'
+})
+
+# Colunas de estoque, com um contador próprio: vendas e produções
+# incrementam só o contador de estoque, e as edições do catálogo o da
+# tabela. As listagens que mostram o estoque colocam os dois no ETag.
+# Comandos em lote que só mexem no estoque usam
+# execution_options(stock_only=True).
+STOCK_ONLY_COLUMNS = {
+    'products': frozenset({'stock_quantity', 'updated_at'})
+}
+STOCK_VERSIONS = {
+    'products': 'products_stock'
+}
+
+_CHANGED = 'versioned_changes'
+
+
+def table_versions(tables):
+    """Versão atual de cada tabela (0 se ainda não houve alteração)"""
+    versions = dict.fromkeys(tables, 0)
+    versions.update(db.session.execute(
+        select(TableVersion.table_name, TableVersion.version)
+        .where(TableVersion.table_name.in_(list(tables)))
+    ).all())
+    return versions
+
+
+def bump_versions(session, tables):
+    tables = sorted(tables)
+    result = session.execute(
+        update(TableVersion)
+        .where(TableVersion.table_name.in_(tables))
+        .values(version=TableVersion.version + 1)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount != len(tables):
+        # Primeira alteração da tabela neste banco: cria os contadores que faltam
+        existing = set(session.scalars(
+            select(TableVersion.table_name).where(TableVersion.table_name.in_(tables))
+        ))
+        session.execute(insert(TableVersion), [
+            {'table_name': table, 'version': 1} for table in tables if table not in existing
+        ])
+
+
+def _modified_columns(obj):
+    return {attr.key for attr in inspect(obj).attrs if attr.history.has_changes()}
+
+
+@event.listens_for(Session, 'after_flush')
+def _track_flush(session, flush_context):
+    changed = session.info.setdefault(_CHANGED, set())
+    for obj in chain(session.new, session.dirty, session.deleted):
+        table = getattr(obj, '__table__', None)
+        if table is None or table.name not in VERSIONED_TABLES:
+            continue
+        stock_columns = STOCK_ONLY_COLUMNS.get(table.name)
+        if (stock_columns and obj in session.dirty and obj not in session.deleted
+                and _modified_columns(obj) <= stock_columns):
+            changed.add(STOCK_VERSIONS[table.name])
+        else:
+            changed.add(table.name)
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _track_bulk_statement(orm_execute_state):
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert):
+        return
+    table = getattr(orm_execute_state.statement, 'table', None)
+    if table is None or table.name not in VERSIONED_TABLES:
+        return
+    name = table.name
+    if orm_execute_state.execution_options.get('stock_only') and name in STOCK_VERSIONS:
+        name = STOCK_VERSIONS[name]
+    orm_execute_state.session.info.setdefault(_CHANGED, set()).add(name)
+
+
+@event.listens_for(Session, 'before_commit')
+def _bump_on_commit(session):
+    # O commit ainda não fez o flush final; sem ele as alterações pendentes
+    # não apareceriam no conjunto de tabelas alteradas
+    session.flush()
+    changed = session.info.pop(_CHANGED, None)
+    if changed:
+        bump_versions(session, changed)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard(session):
+    session.info.pop(_CHANGED, None)
@@ -0,0 +1,14 @@
+"""Ponto de entrada WSGI para produção
+
+    gunicorn --config src/gunicorn.conf.py src.wsgi:app
+"""
+import os
+import sys
+# Mesmo ajuste de caminho do main.py, para importar o pacote src
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.main import create_app
+
+app = create_app()
+
+__all__ = ['app']